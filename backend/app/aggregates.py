@@ -0,0 +1,223 @@
+"""
+Incrementally maintained competence scores.
+
+The HOW MANY/HOW OFTEN grades only depend on how many observations of a
+(session, student, competence) are checked out of how many, and the report
+lists the distinct observations of each competence. Write endpoints keep the
+competence_scores table up to date so reports read one row per student and
+competence instead of scanning observations.
+
+Verify or rebuild the table from the observations with:
+
+    cd backend && python -m app.aggregates check
+    cd backend && python -m app.aggregates rebuild
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from .database import DBCompetenceScore, DBExercise, DBObCatalog, DBObservation, SessionLocal
+
+# (student_id, competence) -> (checked delta, total delta)
+CountDeltas = Dict[Tuple[int, str], Tuple[int, int]]
+# (session_id, student_id, competence) -> (checked, total, [(text, ob_code), ...])
+Scores = Dict[Tuple[int, int, str], Tuple[int, int, List[Tuple[str, Optional[str]]]]]
+
+
+def _insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(DBCompetenceScore)
+
+
+def apply_count_deltas(db: Session, session_id: int, deltas: CountDeltas) -> None:
+    """
+    Add checked/total deltas to the scores of a session in one upsert.
+    Observations without a competence are not graded and must not be passed.
+    """
+    rows = [{
+        "session_id": session_id,
+        "student_id": student_id,
+        "competence": competence,
+        "checked": checked,
+        "total": total
+    } for (student_id, competence), (checked, total) in deltas.items() if checked or total]
+    if not rows:
+        return
+    stmt = _insert(db).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["session_id", "student_id", "competence"],
+        set_={
+            "checked": DBCompetenceScore.checked + stmt.excluded.checked,
+            "total": DBCompetenceScore.total + stmt.excluded.total
+        }
+    ))
+
+
+def add_observations(
+    db: Session,
+    session_id: int,
+    student_id: int,
+    observations: Dict[str, List[Tuple[str, Optional[str]]]]
+) -> None:
+    """
+    Count newly created observations of a student and add their texts to the
+    competence listings. Listings only change the first time a competence is
+    evaluated for the student, so the JSON rewrite is rare.
+    """
+    if not observations:
+        return
+    apply_count_deltas(db, session_id, {
+        (student_id, competence): (0, len(rows)) for competence, rows in observations.items()
+    })
+    scores = db.query(DBCompetenceScore).filter(
+        DBCompetenceScore.session_id == session_id,
+        DBCompetenceScore.student_id == student_id,
+        DBCompetenceScore.competence.in_(list(observations))
+    )
+    for score in scores:
+        listed = [tuple(pair) for pair in json.loads(score.observations or "[]")]
+        count = len(listed)
+        seen = set(listed)
+        for pair in observations[score.competence]:
+            if pair not in seen:
+                listed.append(pair)
+                seen.add(pair)
+        if len(listed) != count:
+            score.observations = json.dumps(listed)
+
+
+def compute_scores(db: Session, session_id: Optional[int] = None) -> Scores:
+    """Rebuild the scores from scratch out of the observations."""
+    counts = (
+        db.query(
+            DBExercise.session_id,
+            DBObservation.student_id,
+            DBObCatalog.competence,
+            func.sum(case((DBObservation.is_checked, 1), else_=0)),
+            func.count(DBObservation.id)
+        )
+        .join(DBExercise, DBObservation.exercise_id == DBExercise.id)
+        .join(DBObCatalog, DBObservation.ob_id == DBObCatalog.id)
+        .filter(DBObCatalog.competence.isnot(None), DBObCatalog.competence != "")
+        .group_by(DBExercise.session_id, DBObservation.student_id, DBObCatalog.competence)
+    )
+    listings = (
+        db.query(
+            DBExercise.session_id,
+            DBObservation.student_id,
+            DBObCatalog.competence,
+            DBObCatalog.text,
+            DBObCatalog.ob_code
+        )
+        .join(DBExercise, DBObservation.exercise_id == DBExercise.id)
+        .join(DBObCatalog, DBObservation.ob_id == DBObCatalog.id)
+        .filter(DBObCatalog.competence.isnot(None), DBObCatalog.competence != "")
+        .group_by(
+            DBExercise.session_id,
+            DBObservation.student_id,
+            DBObCatalog.competence,
+            DBObCatalog.text,
+            DBObCatalog.ob_code
+        )
+        .order_by(func.min(DBObservation.id))
+    )
+    if session_id is not None:
+        counts = counts.filter(DBExercise.session_id == session_id)
+        listings = listings.filter(DBExercise.session_id == session_id)
+
+    scores: Scores = {
+        (row_session_id, student_id, competence): (int(checked or 0), total, [])
+        for row_session_id, student_id, competence, checked, total in counts
+    }
+    for row_session_id, student_id, competence, text, ob_code in listings:
+        scores[(row_session_id, student_id, competence)][2].append((text, ob_code))
+    return scores
+
+
+def stored_scores(db: Session, session_id: Optional[int] = None) -> Scores:
+    query = db.query(
+        DBCompetenceScore.session_id,
+        DBCompetenceScore.student_id,
+        DBCompetenceScore.competence,
+        DBCompetenceScore.checked,
+        DBCompetenceScore.total,
+        DBCompetenceScore.observations
+    )
+    if session_id is not None:
+        query = query.filter(DBCompetenceScore.session_id == session_id)
+    # Rows without observations are equivalent to missing rows
+    return {
+        (row_session_id, student_id, competence): (checked, total, [tuple(pair) for pair in json.loads(observations)])
+        for row_session_id, student_id, competence, checked, total, observations in query if total
+    }
+
+
+def check_scores(db: Session, session_id: Optional[int] = None) -> List[dict]:
+    """
+    Compare the stored scores with scores rebuilt from the observations.
+    Returns one entry per mismatching (session, student, competence).
+    """
+    expected = compute_scores(db, session_id)
+    stored = stored_scores(db, session_id)
+    return [{
+        "session_id": key[0],
+        "student_id": key[1],
+        "competence": key[2],
+        "expected": expected.get(key),
+        "stored": stored.get(key)
+    } for key in sorted(expected.keys() | stored.keys()) if expected.get(key) != stored.get(key)]
+
+
+def rebuild_scores(db: Session, session_id: Optional[int] = None) -> int:
+    """
+    Replace the stored scores with scores rebuilt from the observations.
+    Returns the number of rows written; the caller commits.
+    """
+    query = db.query(DBCompetenceScore)
+    if session_id is not None:
+        query = query.filter(DBCompetenceScore.session_id == session_id)
+    query.delete(synchronize_session=False)
+    scores = compute_scores(db, session_id)
+    if scores:
+        db.bulk_insert_mappings(DBCompetenceScore, [{
+            "session_id": row_session_id,
+            "student_id": student_id,
+            "competence": competence,
+            "checked": checked,
+            "total": total,
+            "observations": json.dumps(observations)
+        } for (row_session_id, student_id, competence), (checked, total, observations) in scores.items()])
+    return len(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or rebuild the competence_scores table.")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--session", type=int, help="only this session")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            count = rebuild_scores(db, args.session)
+            db.commit()
+            print(f"rebuilt {count} competence scores")
+            return
+        mismatches = check_scores(db, args.session)
+        for mismatch in mismatches:
+            print(
+                f"session {mismatch['session_id']} student {mismatch['student_id']} {mismatch['competence']}: "
+                f"stored {mismatch['stored']}, expected {mismatch['expected']}"
+            )
+        print(f"{len(mismatches)} mismatching competence scores")
+        sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
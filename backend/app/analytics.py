@@ -0,0 +1,351 @@
+"""
+Cohort-wide competence analytics.
+
+The checked/total counts of every (student, session, competence), and of
+every (student, session, OB), are loaded into parallel NumPy arrays, one
+entry per evaluated triple. A dense student x session x competence cube
+would be almost empty, since each student only sits a few sessions. Grades
+are banded with vectorized thresholds. Distributions, trends and OB rates
+are grouped sums (bincount, reduceat) over those arrays, so filtering and
+aggregating a cohort of thousands of students takes milliseconds.
+
+The counts are cached per engine and per session. Every write bumps its
+session's version, so each call reads the (date, version) of every session
+and reloads the counts of the sessions whose pair changed, or that appeared,
+before the arrays are assembled again. A write therefore costs the next
+call one session's counts rather than a pass over every observation.
+
+Archived sessions are counted from their documents, read once when they
+are archived, and flagged so that include_archived=False can leave them out.
+"""
+import threading
+import weakref
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from .database import DBArchivedSession, DBCompetenceScore, DBExercise, DBObservation, DBSession, DBStudent
+from .ob_catalog import get_catalog
+from .ob_detector import GRADE_THRESHOLDS
+from .snapshots import iter_archived_sessions
+from .taxonomy import TAXONOMY
+
+_thresholds = np.array(GRADE_THRESHOLDS)
+
+
+def band_grades(checked: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """grade_from_counts over whole arrays: 1 to 5, and 1 without observations."""
+    ratio = np.divide(checked, total, out=np.zeros(len(total)), where=total > 0)
+    return 1 + np.searchsorted(_thresholds, ratio, side="right")
+
+
+class Cohort:
+    """Counts of one database as parallel arrays; sessions and students are array indexes."""
+
+    def __init__(self, student_names: Sequence[str], session_ids: Sequence[int],
+                 session_dates: Sequence[Optional[datetime]], session_archived: Sequence[bool],
+                 competences: Sequence[str], scores: np.ndarray, ob_counts: np.ndarray):
+        self.student_names = list(student_names)
+        self.student_index = {name: index for index, name in enumerate(self.student_names)}
+        self.session_ids = np.array(session_ids, dtype=np.int64)
+        self.session_dates = np.array(
+            [date or datetime.min for date in session_dates], dtype="datetime64[us]"
+        )
+        self.session_archived = np.array(session_archived, dtype=bool)
+        # Chronological position of each session, ties broken by id
+        self.session_rank = np.empty(len(self.session_ids), dtype=np.int64)
+        self.session_rank[np.lexsort((self.session_ids, self.session_dates))] = np.arange(len(self.session_ids))
+        self.competences = list(competences)
+
+        columns = np.asarray(scores, dtype=np.int64).reshape(-1, 5).T
+        self.score_student, self.score_session, self.score_competence, self.score_checked, self.score_total = columns
+        columns = np.asarray(ob_counts, dtype=np.int64).reshape(-1, 5).T
+        self.ob_student, self.ob_session, self.ob_id, self.ob_checked, self.ob_total = columns
+
+
+class SessionCounts(NamedTuple):
+    # (date, version) of the session when its counts were read, or
+    # (date, archived_at) for an archived session
+    token: Tuple[Optional[datetime], Any]
+    date: Optional[datetime]
+    archived: bool
+    # (student_id, competence position, checked, total) rows
+    scores: np.ndarray
+    # (student_id, ob_id, checked, total) rows
+    obs: np.ndarray
+
+
+class CohortCache:
+    """
+    Counts of every session of one database, read again only for the
+    sessions whose version or creation date changed since the last call.
+    """
+
+    def __init__(self):
+        self.sessions: Dict[int, SessionCounts] = {}
+        self.competences = list(TAXONOMY.competences)
+        self.competence_position = {competence: index for index, competence in enumerate(self.competences)}
+        self.cohort: Optional[Cohort] = None
+        self.lock = threading.Lock()
+
+    def refresh(self, db: Session) -> Cohort:
+        current = {
+            session_id: (date, version or 0)
+            for session_id, date, version in db.execute(select(DBSession.id, DBSession.date, DBSession.version))
+        }
+        archived = {
+            session_id: (date, archived_at) for session_id, date, archived_at in
+            db.execute(select(DBArchivedSession.session_id, DBArchivedSession.date, DBArchivedSession.archived_at))
+        }
+        changed = [
+            session_id for session_id, token in current.items()
+            if session_id not in self.sessions or self.sessions[session_id].token != token
+        ]
+        changed_archived = [
+            session_id for session_id, token in archived.items()
+            if session_id not in self.sessions or self.sessions[session_id].token != token
+        ]
+        removed = [session_id for session_id in self.sessions if session_id not in current and session_id not in archived]
+        if self.cohort is not None and not changed and not changed_archived and not removed:
+            return self.cohort
+
+        for session_id in removed:
+            del self.sessions[session_id]
+        # A cold cache reads every session in one pass rather than by batches of ids
+        batches = [None] if not self.sessions else [changed[start:start + 500] for start in range(0, len(changed), 500)]
+        for batch in batches:
+            scores, obs = (_by_session(rows) for rows in self._load(db, batch))
+            for session_id in batch or changed:
+                self.sessions[session_id] = SessionCounts(
+                    current[session_id], current[session_id][0], False,
+                    scores.get(session_id, _no_rows), obs.get(session_id, _no_rows)
+                )
+        for document in iter_archived_sessions(db, changed_archived):
+            scores, obs = self._archived_counts(document)
+            self.sessions[document["id"]] = SessionCounts(
+                archived[document["id"]], archived[document["id"]][0], True, scores, obs
+            )
+        self.cohort = self._assemble(db)
+        return self.cohort
+
+    def _load(self, db: Session, session_ids: Optional[List[int]]) -> Tuple[list, list]:
+        """Score and OB count rows of the given sessions, or of every session."""
+        scores_query = db.query(
+            DBCompetenceScore.session_id,
+            DBCompetenceScore.student_id,
+            DBCompetenceScore.competence,
+            DBCompetenceScore.checked,
+            DBCompetenceScore.total
+        ).filter(DBCompetenceScore.total > 0)
+        obs_query = (
+            db.query(
+                DBExercise.session_id,
+                DBObservation.student_id,
+                DBObservation.ob_id,
+                func.sum(case((DBObservation.is_checked, 1), else_=0)),
+                func.count(DBObservation.id)
+            )
+            .join(DBExercise, DBObservation.exercise_id == DBExercise.id)
+            .group_by(DBExercise.session_id, DBObservation.student_id, DBObservation.ob_id)
+        )
+        if session_ids is not None:
+            scores_query = scores_query.filter(DBCompetenceScore.session_id.in_(session_ids))
+            obs_query = obs_query.filter(DBExercise.session_id.in_(session_ids))
+
+        scores = []
+        for session_id, student_id, competence, checked, total in scores_query:
+            if competence not in self.competence_position:
+                self.competence_position[competence] = len(self.competences)
+                self.competences.append(competence)
+            scores.append((session_id, student_id, self.competence_position[competence], checked, total))
+        obs = [(session_id, student_id, ob_id, checked or 0, total)
+               for session_id, student_id, ob_id, checked, total in obs_query]
+        return scores, obs
+
+    def _archived_counts(self, document: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """Score and OB count rows of an archived session, the layout of app.snapshots.archive_session."""
+        scores = []
+        for student_id, competence, checked, total, _ in document["scores"]:
+            if total > 0:
+                if competence not in self.competence_position:
+                    self.competence_position[competence] = len(self.competences)
+                    self.competences.append(competence)
+                scores.append((student_id, self.competence_position[competence], checked, total))
+        obs: Dict[Tuple[int, int], List[int]] = {}
+        for exercise in document["exercises"]:
+            for _, ob_id, _, is_checked, student_id in exercise[5]:
+                count = obs.setdefault((student_id, ob_id), [0, 0])
+                count[0] += 1 if is_checked else 0
+                count[1] += 1
+        return (
+            np.array(scores, dtype=np.int64).reshape(-1, 4),
+            np.array([key + tuple(count) for key, count in obs.items()], dtype=np.int64).reshape(-1, 4)
+        )
+
+    def _assemble(self, db: Session) -> Cohort:
+        students = db.query(DBStudent.id, DBStudent.name).order_by(DBStudent.id).all()
+        student_ids = np.array([student_id for student_id, _ in students], dtype=np.int64)
+        session_ids = sorted(self.sessions)
+        entries = [self.sessions[session_id] for session_id in session_ids]
+
+        def stack(parts: List[np.ndarray]) -> np.ndarray:
+            # Prefix each row with its session position and map student ids to positions
+            rows = np.concatenate(parts) if parts else _no_rows
+            positions = np.repeat(np.arange(len(parts)), [len(part) for part in parts])
+            student = np.searchsorted(student_ids, rows[:, 0])
+            return np.column_stack((student, positions, rows[:, 1:]))
+
+        scores = stack([entry.scores for entry in entries])
+        obs = stack([entry.obs for entry in entries])
+        return Cohort(
+            [name for _, name in students],
+            session_ids,
+            [entry.date for entry in entries],
+            [entry.archived for entry in entries],
+            self.competences,
+            # Cohort columns: student, session, competence, checked, total
+            scores,
+            # and student, session, ob_id, checked, total
+            obs
+        )
+
+
+_no_rows = np.zeros((0, 4), dtype=np.int64)
+
+
+def _by_session(rows: list) -> Dict[int, np.ndarray]:
+    """(session_id, ...) rows as one array of the remaining columns per session."""
+    if not rows:
+        return {}
+    rows = np.array(rows, dtype=np.int64)
+    rows = rows[np.argsort(rows[:, 0], kind="stable")]
+    starts = _group_starts(rows[:, 0])
+    return dict(zip(rows[starts, 0].tolist(), np.split(rows[:, 1:], starts[1:])))
+
+
+def load_cohort(db: Session) -> Cohort:
+    """The cohort arrays of the database behind db, read from scratch."""
+    return CohortCache().refresh(db)
+
+
+_cohorts: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_cohort(db: Session) -> Cohort:
+    """The cohort arrays of the database behind db, updated for the sessions that changed."""
+    with _lock:
+        cache = _cohorts.get(db.get_bind())
+        if cache is None:
+            cache = _cohorts[db.get_bind()] = CohortCache()
+    with cache.lock:
+        return cache.refresh(db)
+
+
+def _group_starts(keys: np.ndarray) -> np.ndarray:
+    """Start index of each run of equal values in sorted keys."""
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+
+
+def cohort_analytics(
+    db: Session,
+    cohort: Cohort,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    student: Optional[str] = None,
+    limit: int = 10,
+    include_archived: bool = True
+) -> Dict[str, Any]:
+    """
+    Grade distribution per competence, the steepest declining student
+    trends and the least checked OBs over the sessions matching the filters.
+    """
+    sessions = np.ones(len(cohort.session_ids), dtype=bool) if include_archived else ~cohort.session_archived
+    if date_from:
+        sessions &= cohort.session_dates >= np.datetime64(date_from, "us")
+    if date_to:
+        sessions &= cohort.session_dates < np.datetime64(date_to, "us")
+    scores = sessions[cohort.score_session]
+    obs = sessions[cohort.ob_session]
+    if student is not None:
+        index = cohort.student_index.get(student, -1)
+        scores &= cohort.score_student == index
+        obs &= cohort.ob_student == index
+
+    student_ids = cohort.score_student[scores]
+    session_ids = cohort.score_session[scores]
+    competence_ids = cohort.score_competence[scores]
+    checked = cohort.score_checked[scores]
+    total = cohort.score_total[scores]
+    grades = band_grades(checked, total)
+
+    # Grade distribution per competence
+    count = len(cohort.competences)
+    distribution = np.bincount(competence_ids * 5 + grades - 1, minlength=count * 5).reshape(count, 5)
+    evaluations = distribution.sum(axis=1)
+    grade_sums = np.bincount(competence_ids, weights=grades, minlength=count)
+    checked_sums = np.bincount(competence_ids, weights=checked, minlength=count)
+    total_sums = np.bincount(competence_ids, weights=total, minlength=count)
+    competences = {
+        competence: {
+            "distribution": distribution[index].tolist(),
+            "evaluations": int(evaluations[index]),
+            "mean_grade": round(float(grade_sums[index] / evaluations[index]), 3),
+            "checked_ratio": round(float(checked_sums[index] / total_sums[index]), 3)
+        }
+        for index, competence in enumerate(cohort.competences) if evaluations[index]
+    }
+
+    # Least-squares slope of each student's grade per competence over their
+    # sessions in chronological order
+    keys = student_ids * count + competence_ids
+    order = np.lexsort((cohort.session_rank[session_ids], keys))
+    keys, y = keys[order], grades[order].astype(np.float64)
+    starts = _group_starts(keys)
+    sizes = np.diff(np.r_[starts, len(keys)])
+    x = np.arange(len(keys)) - np.repeat(starts, sizes)
+    declining = []
+    if len(keys):
+        sum_x, sum_y = np.add.reduceat(x, starts), np.add.reduceat(y, starts)
+        sum_xx, sum_xy = np.add.reduceat(x * x, starts), np.add.reduceat(x * y, starts)
+        denominator = sizes * sum_xx - sum_x * sum_x
+        slopes = np.divide(sizes * sum_xy - sum_x * sum_y, denominator,
+                           out=np.zeros(len(starts)), where=denominator > 0)
+        candidates = np.flatnonzero(slopes < 0)
+        candidates = candidates[np.lexsort((keys[starts[candidates]], slopes[candidates]))][:limit]
+        declining = [{
+            "student_name": cohort.student_names[keys[starts[group]] // count],
+            "competence": cohort.competences[keys[starts[group]] % count],
+            "sessions": int(sizes[group]),
+            "first_grade": int(y[starts[group]]),
+            "last_grade": int(y[starts[group] + sizes[group] - 1]),
+            "slope": round(float(slopes[group]), 3)
+        } for group in candidates]
+
+    # OBs with the lowest share of checked observations
+    ob_ids = cohort.ob_id[obs]
+    ob_checked = np.bincount(ob_ids, weights=cohort.ob_checked[obs])
+    ob_total = np.bincount(ob_ids, weights=cohort.ob_total[obs])
+    evaluated = np.flatnonzero(ob_total)
+    ratios = ob_checked[evaluated] / ob_total[evaluated]
+    weakest = evaluated[np.lexsort((-ob_total[evaluated], ratios))][:limit]
+    entries = get_catalog(db, weakest.tolist()).entries
+    weakest_obs = [{
+        "ob_code": entries[ob_id].ob_code,
+        "competence": entries[ob_id].competence,
+        "text": entries[ob_id].text,
+        "checked": int(ob_checked[ob_id]),
+        "total": int(ob_total[ob_id]),
+        "checked_ratio": round(float(ob_checked[ob_id] / ob_total[ob_id]), 3)
+    } for ob_id in weakest.tolist()]
+
+    return {
+        "students": int(len(np.unique(student_ids))),
+        "sessions": int(len(np.unique(session_ids))),
+        "competences": competences,
+        "declining": declining,
+        "weakest_obs": weakest_obs
+    }
@@ -0,0 +1,229 @@
+"""
+Streaming exports of observations and competence grades across sessions.
+
+Rows are read with yield_per, which makes SQLAlchemy fetch them in
+partitions (a server-side cursor on PostgreSQL), and each partition is
+encoded and handed to the response before the next one is read. Memory
+therefore stays constant however many sessions an export covers.
+
+Archived sessions are exported too, unless include_archived is false:
+their documents are decoded a few at a time, in the same session date
+order, and merged with the rows of the hot tables.
+
+Exports run on their own database session, so they do not depend on the
+request's session outliving the handler.
+"""
+import csv
+import heapq
+import io
+from datetime import datetime
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .database import DBArchivedSession, DBCompetenceScore, DBExercise, DBObservation, DBSession, DBStudent
+from .ob_catalog import get_catalog
+from .ob_detector import grade_from_counts
+from .snapshots import iter_archived_sessions, parse
+
+EXPORT_BATCH_SIZE = 1000
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+OBSERVATION_FIELDS = (
+    "session_id", "session_date", "exercise_id", "exercise_name", "student_name", "observation_id",
+    "ob_code", "competence", "text", "timestamp", "is_checked"
+)
+REPORT_FIELDS = ("session_id", "session_date", "student_name", "competence", "checked", "total", "how_many", "how_often")
+
+
+def _filter_sessions(stmt, date_from: Optional[datetime], date_to: Optional[datetime]):
+    if date_from:
+        stmt = stmt.where(DBSession.date >= date_from)
+    if date_to:
+        stmt = stmt.where(DBSession.date < date_to)
+    return stmt
+
+
+def _archived_ids(db: Session, date_from: Optional[datetime], date_to: Optional[datetime]) -> List[int]:
+    """Archived sessions dated in the range, by date then id."""
+    stmt = select(DBArchivedSession.session_id).order_by(DBArchivedSession.date, DBArchivedSession.session_id)
+    if date_from:
+        stmt = stmt.where(DBArchivedSession.date >= date_from)
+    if date_to:
+        stmt = stmt.where(DBArchivedSession.date < date_to)
+    return list(db.execute(stmt).scalars())
+
+
+def _with_archived(
+    live: Iterator[List[tuple]],
+    archived: Iterator[List[tuple]],
+    batch_size: int
+) -> Iterator[List[tuple]]:
+    """
+    Merge two row streams ordered by (session_date, session_id), the first
+    two columns. A session's rows all come from one stream, so they stay
+    together and in order.
+    """
+    rows = heapq.merge(
+        chain.from_iterable(live), chain.from_iterable(archived),
+        key=lambda row: (row[1] or datetime.min, row[0])
+    )
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def observation_rows(
+    db: Session,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    student: Optional[str] = None,
+    include_archived: bool = True,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[tuple]]:
+    """Observations in session, exercise and observation order, batch by batch."""
+    stmt = (
+        select(
+            DBSession.id,
+            DBSession.date,
+            DBExercise.id,
+            DBExercise.name,
+            DBStudent.name,
+            DBObservation.id,
+            DBObservation.ob_id,
+            DBObservation.timestamp,
+            DBObservation.is_checked
+        )
+        .join(DBExercise, DBExercise.session_id == DBSession.id)
+        .join(DBObservation, DBObservation.exercise_id == DBExercise.id)
+        .join(DBStudent, DBStudent.id == DBObservation.student_id)
+        .order_by(DBSession.date, DBSession.id, DBExercise.id, DBObservation.id)
+    )
+    stmt = _filter_sessions(stmt, date_from, date_to)
+    if student:
+        stmt = stmt.where(DBStudent.name == student)
+
+    def rows(partitions: Iterable[Sequence[tuple]]) -> Iterator[List[tuple]]:
+        for partition in partitions:
+            entries = get_catalog(db, (row[6] for row in partition)).entries
+            batch = []
+            for session_id, session_date, exercise_id, exercise_name, student_name, obs_id, ob_id, timestamp, is_checked in partition:
+                entry = entries[ob_id]
+                batch.append((
+                    session_id, session_date, exercise_id, exercise_name, student_name, obs_id,
+                    entry.ob_code, entry.competence, entry.text, timestamp, is_checked
+                ))
+            yield batch
+
+    def archived_partitions() -> Iterator[List[tuple]]:
+        # Same columns as stmt, one partition per archived session
+        for archived in iter_archived_sessions(db, archived_ids):
+            names = dict(archived["student_names"])
+            session_date = parse(archived["date"])
+            yield [
+                (archived["id"], session_date, exercise_id, name, names[student_id], obs_id, ob_id, parse(timestamp), is_checked)
+                for exercise_id, name, _, _, _, observations in archived["exercises"]
+                for obs_id, ob_id, timestamp, is_checked, student_id in observations
+                if not student or names[student_id] == student
+            ]
+
+    archived_ids = _archived_ids(db, date_from, date_to) if include_archived else []
+    live = rows(db.execute(stmt.execution_options(yield_per=batch_size)).partitions())
+    if not archived_ids:
+        return live
+    return _with_archived(live, rows(archived_partitions()), batch_size)
+
+
+def report_rows(
+    db: Session,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    student: Optional[str] = None,
+    include_archived: bool = True,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[tuple]]:
+    """
+    HOW MANY/HOW OFTEN grades of every student and competence, from the
+    competence_scores counts. Safety scores are not stored, so final grades
+    are left to the per-session report.
+    """
+    stmt = (
+        select(
+            DBSession.id,
+            DBSession.date,
+            DBStudent.name,
+            DBCompetenceScore.competence,
+            DBCompetenceScore.checked,
+            DBCompetenceScore.total
+        )
+        .join(DBCompetenceScore, DBCompetenceScore.session_id == DBSession.id)
+        .join(DBStudent, DBStudent.id == DBCompetenceScore.student_id)
+        .where(DBCompetenceScore.total > 0)
+        .order_by(DBSession.date, DBSession.id, DBStudent.name, DBCompetenceScore.competence)
+    )
+    stmt = _filter_sessions(stmt, date_from, date_to)
+    if student:
+        stmt = stmt.where(DBStudent.name == student)
+
+    def rows(partitions: Iterable[Sequence[tuple]]) -> Iterator[List[tuple]]:
+        for partition in partitions:
+            yield [
+                (session_id, session_date, student_name, competence, checked, total,
+                 grade_from_counts(checked, total), grade_from_counts(checked, total))
+                for session_id, session_date, student_name, competence, checked, total in partition
+            ]
+
+    def archived_partitions() -> Iterator[List[tuple]]:
+        for archived in iter_archived_sessions(db, archived_ids):
+            names = dict(archived["student_names"])
+            session_date = parse(archived["date"])
+            yield sorted(
+                (archived["id"], session_date, names[student_id], competence, checked, total)
+                for student_id, competence, checked, total, _ in archived["scores"]
+                if total > 0 and (not student or names[student_id] == student)
+            )
+
+    archived_ids = _archived_ids(db, date_from, date_to) if include_archived else []
+    live = rows(db.execute(stmt.execution_options(yield_per=batch_size)).partitions())
+    if not archived_ids:
+        return live
+    return _with_archived(live, rows(archived_partitions()), batch_size)
+
+
+def encode_ndjson(fields: Sequence[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in batch)
+
+
+def encode_csv(fields: Sequence[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in batch
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_export(
+    bind,
+    rows: Callable[..., Iterator[List[tuple]]],
+    fields: Sequence[str],
+    export_format: str,
+    **filters
+) -> Iterator[bytes]:
+    """Encoded chunks of an export, read on a session of its own."""
+    encode = encode_csv if export_format == "csv" else encode_ndjson
+    with Session(bind=bind) as db:
+        yield from encode(fields, rows(db, **filters))
@@ -1,118 +1,36 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Header, Response, WebSocket
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from sqlalchemy import insert, select, tuple_, update, func
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional, Dict, Union
 from datetime import datetime
+import asyncio
+import base64
 import json
+import os
 from pydantic import BaseModel
 
-from .database import SessionLocal, DBSession, DBExercise, DBObservation
-from .ob_detector import detect_ob, calculate_how_many, calculate_how_often
-
-# Predefined observations with their competencies
-OBSERVATIONS_BY_COMPETENCY: Dict[str, List[str]] = {
-    "KNO": [
-        "Demonstrates knowledge and understanding of relevant information, operating instructions, aircraft systems and the operating environment",  # OB 0.1
-        "Demonstrates practical and applicable knowledge of limitations and systems and their interaction",  # OB 0.2
-        "Demonstrates the required knowledge of published operating instructions",  # OB 0.3
-        "Demonstrates appropriate knowledge of the air traffic environment and the operational infrastructure (including air traffic routings, weather, and NOTAMs)",  # OB 0.4
-        "Demonstrates appropriate knowledge of applicable legislation",  # OB 0.5
-        "Knows where to source required information",  # OB 0.6
-        "Demonstrates a positive interest in acquiring knowledge",  # OB 0.7
-        "Is able to apply knowledge effectively"  # OB 0.8
-    ],
-    "LTW": [
-        "Influences others to contribute to a shared purpose. Collaborates to accomplish the goals of the team",  # OB 5.1
-        "Encourages team participation and open communication",  # OB 5.2
-        "Engages others in planning",  # OB 5.3
-        "Demonstrates initiative and provides direction when required",  # OB 5.4
-        "Considers inputs from others",  # OB 5.5
-        "Gives and receives feedback constructively and admits mistakes",  # OB 5.6
-        "Addresses and resolves conflicts and disagreements in a constructive manner",  # OB 5.7
-        "Exercises decisive leadership when required",  # OB 5.8
-        "Uses initiative, gives direction and takes responsibility when required. Accepts responsibility for decisions and actions",  # OB 5.9
-        "Carries out instructions when directed",  # OB 5.10
-        "Applies effective intervention strategies to resolve identified deviations",  # OB 5.11
-        "Manages cultural and language challenges, as applicable",  # OB 5.12
-        "Confidently says and does what is important for safety, resolving deviations identified while monitoring using appropriate escalation of communication",  # EY OB 5.13
-        "Demonstrates empathy, respect and tolerance for other people"  # EY OB 5.14
-    ],
-    "PSD": [
-        "Identifies, assesses and manages threats and errors in a timely manner",  # OB 6.1
-        "Seeks accurate and adequate information from appropriate sources",  # OB 6.2
-        "Identifies and verifies what and why things have gone wrong, if appropriate",  # OB 6.3
-        "Perseveres in working through problems whilst prioritising safety",  # OB 6.4
-        "Identifies and considers appropriate options",  # OB 6.5
-        "Applies appropriate and timely decision-making techniques",  # OB 6.6
-        "Monitors, reviews and adapts decisions as required",  # OB 6.7
-        "Adapts when faced with situations where no guidance or procedure exists",  # OB 6.8
-        "Demonstrates resilience when encountering an unexpected event",  # OB 6.9
-        "Considers risks but does not take unnecessary risks"  # EY OB 6.10
-    ],
-    "SAW": [
-        "Monitors and assesses the state of the aeroplane and its systems",  # OB 7.1
-        "Monitors and assesses the aeroplane's energy state, and its anticipated flight path",  # OB 7.2
-        "Monitors and assesses the general environment as it may affect the operation",  # OB 7.3
-        "Validates the accuracy of information and checks for gross errors",  # OB 7.4
-        "Maintains awareness of the people involved in or affected by the operation and their capacity to perform as expected",  # OB 7.5
-        "Develops effective contingency plans for threats, associated risks and potential errors",  # OB 7.6
-        "Responds to indications of reduced situation awareness",  # OB 7.7
-        "Keeps track of time and fuel"  # EY OB 7.8
-    ],
-    "WLM": [
-        "Exercises self-control in all situations",  # OB 8.1
-        "Plans, prioritises and schedules appropriate tasks effectively",  # OB 8.2
-        "Manages time efficiently when carrying out tasks",  # OB 8.3
-        "Offers and gives assistance",  # OB 8.4
-        "Delegates tasks",  # OB 8.5
-        "Seeks and accepts assistance, when appropriate",  # OB 8.6
-        "Monitors, reviews and cross-checks actions conscientiously",  # OB 8.7
-        "Verifies that tasks are completed to the expected outcome",  # OB 8.8
-        "Manages and recovers from interruptions, distractions, variations and failures effectively while performing tasks"  # OB 8.9
-    ],
-    "PRO": [
-        "Identifies where to find procedures and regulations",  # OB 1.1
-        "Applies relevant operating instructions, procedures and techniques in a timely manner",  # OB 1.2
-        "Follows SOPs unless a higher degree of safety dictates an appropriate deviation",  # OB 1.3
-        "Operates aircraft systems and associated equipment correctly",  # OB 1.4
-        "Monitors aircraft systems status",  # OB 1.5
-        "Complies with applicable regulations",  # OB 1.6
-        "Applies relevant procedural knowledge",  # OB 1.7
-        "Safely manages the aircraft to achieve best value for the operation, including fuel, the environment, passenger comfort and punctuality"  # EY OB 1.8
-    ],
-    "COM": [
-        "Determines that the recipient is ready and able to receive information",  # OB 2.1
-        "Selects appropriately what, when, how and with whom to communicate",  # OB 2.2
-        "Conveys messages clearly, accurately, timely and concisely",  # OB 2.3
-        "Confirms that the recipient demonstrates understanding of important information",  # OB 2.4
-        "Listens actively and demonstrates understanding when receiving information",  # OB 2.5
-        "Asks relevant and effective questions",  # OB 2.6
-        "Uses appropriate escalation in communication to resolve identified deviations",  # OB 2.7
-        "Uses and interprets non-verbal communication in a manner appropriate to the organisational and social culture",  # OB 2.8
-        "Adheres to standard radiotelephony phraseology and procedures",  # OB 2.9
-        "Reads, interprets, constructs and responds to datalink messages in English",  # OB 2.10
-        "Is receptive to other people\'s views and is willing to compromise"  # EY OB 2.11
-    ],
-    "FPA": [
-        "Uses appropriate flight management, guidance systems and automation, as installed and applicable to the conditions",  # OB 3.1
-        "Monitors and detects deviations from the intended flight path and takes appropriate action",  # OB 3.2
-        "Manages the flight path to achieve optimum operational performance",  # OB 3.3
-        "Maintains the intended flight path during flight using automation whilst monitoring and managing other tasks and distractions",  # OB 3.4
-        "Selects appropriate level and mode of automation in a timely manner considering phase of flight and workload",  # OB 3.5
-        "Effectively monitors automation, including engagement and automatic mode transitions",  # OB 3.6
-        "Contains the aircraft within the normal flight envelope"  # EY OB 3.7
-    ],
-    "FPM": [
-        "Controls the aircraft manually with accuracy and smoothness as appropriate to the situation",  # OB 4.1
-        "Monitors and detects deviations from the intended flight path and takes appropriate action",  # OB 4.2
-        "Manually controls the aeroplane using the relationship between aeroplane attitude, speed and thrust, and navigation signals or visual information",  # OB 4.3
-        "Manages the flight path to achieve optimum operational performance",  # OB 4.4
-        "Maintains the intended flight path during manual flight whilst monitoring and managing other tasks and distractions",  # OB 4.5
-        "Uses appropriate flight management and guidance systems, as installed and applicable to the conditions",  # OB 4.6
-        "Effectively monitors flight guidance systems including engaging and automatic mode transitions",  # OB 4.7
-        "Contains the aircraft within the normal flight envelope"  # EY OB 4.8
-    ]
-}
+from .database import (
+    SessionLocal, DBArchivedSession, DBSession, DBExercise, DBExerciseSnapshot, DBObservation, DBStudent,
+    session_students, bump_session_version, add_session_students, find_session_student
+)
+from .ob_catalog import get_catalog, serialize_catalog, taxonomy_ob_ids
+from .taxonomy import TAXONOMY
+from .report import load_session_report
+from .report_cache import report_cache, normalize_safety_scores, report_etag
+from .report_jobs import report_jobs
+from .aggregates import add_observations, apply_count_deltas
+from .manage import APP_PREWARM, prepare_database, prewarm
+from .metrics import instrument, metrics
+from .search import search_observations, serialize_hits
+from .session_events import session_hub
+from .snapshots import freeze_exercises, load_archived_session, snapshot_observations
+from .export import (
+    MEDIA_TYPES, OBSERVATION_FIELDS, REPORT_FIELDS, observation_rows, report_rows, stream_export
+)
 
 # New Pydantic model for a student
 class StudentInput(BaseModel):
@@ -131,21 +49,183 @@ class ExerciseCreate(BaseModel):
 class ObservationUpdate(BaseModel):
     is_checked: bool
 
+class ObservationChange(BaseModel):
+    observation_id: int
+    is_checked: bool
+
+class ObservationBatchUpdate(BaseModel):
+    changes: List[ObservationChange]
+
+# Response models. Nullable columns stay Optional so that rows written by
+# older versions of the API still serialize.
+class Message(BaseModel):
+    message: str
+
+class Student(BaseModel):
+    name: str
+
 class Exercise(BaseModel):
     id: int
-    name: str
-    is_completed: bool
-    date: datetime
+    name: Optional[str]
+    is_completed: Optional[bool]
+    date: Optional[datetime]
 
 class Observation(BaseModel):
     id: int
     text: str
-    timestamp: datetime
+    timestamp: Optional[datetime]
     ob_code: Optional[str]
     competence: Optional[str]
-    is_checked: bool
+    is_checked: Optional[bool]
+
+class SessionObservation(Observation):
+    student_name: str
+
+class CompactObservation(BaseModel):
+    id: int
+    ob_id: int
+    timestamp: Optional[datetime]
+    is_checked: Optional[bool]
+    student_name: str
+
+class ExerciseDetail(Exercise):
+    competences: List[str]
+    observations: List[Union[SessionObservation, CompactObservation]]
+
+class SessionListItem(BaseModel):
+    id: int
+    date: Optional[datetime]
+    competences: List[str]
+    students: List[Student]
+
+class SearchResult(SessionObservation):
+    exercise_id: int
+    exercise_name: Optional[str]
+    session_id: int
+    session_date: Optional[datetime]
+
+class SessionSummary(BaseModel):
+    id: int
+    date: Optional[datetime]
+    competences: List[str]
+    student_count: int
+
+class SessionDetail(BaseModel):
+    id: int
+    date: Optional[datetime]
+    students: List[Student]
+    version: int
+    exercises: List[ExerciseDetail]
+
+class ObservationState(BaseModel):
+    id: int
+    exercise_id: int
+    is_checked: Optional[bool]
+
+class ObservationBatchResult(BaseModel):
+    session_id: int
+    version: int
+    observations: List[ObservationState]
+
+class ReportObservation(BaseModel):
+    text: str
+    ob_code: Optional[str]
+
+class UncheckedObservation(ReportObservation):
+    competence: Optional[str]
+
+class CompetenceGrade(BaseModel):
+    how_many: int
+    how_often: int
+    safety_score: float
+    final_grade: float
+    observations: List[ReportObservation]
+
+class StudentReport(BaseModel):
+    report: Dict[str, CompetenceGrade]
+    unchecked_observations: List[UncheckedObservation]
+
+class CatalogEntryOut(BaseModel):
+    id: int
+    text: str
+    ob_code: Optional[str]
+    competence: Optional[str]
+
+class OBMatch(BaseModel):
+    ob_code: str
+    competence: str
+    score: float
+
+class CompetenceStats(BaseModel):
+    distribution: List[int]
+    evaluations: int
+    mean_grade: float
+    checked_ratio: float
+
+class StudentTrend(BaseModel):
+    student_name: str
+    competence: str
+    sessions: int
+    first_grade: int
+    last_grade: int
+    slope: float
+
+class WeakOB(BaseModel):
+    ob_code: Optional[str]
+    competence: Optional[str]
+    text: str
+    checked: int
+    total: int
+    checked_ratio: float
+
+class CohortAnalytics(BaseModel):
+    students: int
+    sessions: int
+    competences: Dict[str, CompetenceStats]
+    declining: List[StudentTrend]
+    weakest_obs: List[WeakOB]
+
+class ReportCacheStats(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    not_modified: int
+    hit_ratio: float
+
+class ReportJobSession(BaseModel):
+    session_id: int
+    safety_scores: Dict[str, int] = {}
+
+class ReportJobCreate(BaseModel):
+    sessions: List[ReportJobSession]
+
+class ReportJob(BaseModel):
+    id: str
+    status: str
+    sessions: int
+    completed: int
+    failed: int
+    created_at: datetime
+    finished_at: Optional[datetime]
 
-app = FastAPI(title="Flight Instructor Evaluation API")
+# Handlers return plain dicts and rows: FastAPI validates them against the
+# response model in pydantic-core and orjson encodes the result, which skips
+# jsonable_encoder's recursive walk over every nested dict and datetime.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Upgrade the database unless it was migrated beforehand, then warm up the
+    # OB matcher in the background so the first /ob/match does not pay for it
+    await run_in_threadpool(prepare_database)
+    if APP_PREWARM:
+        asyncio.get_running_loop().run_in_executor(None, prewarm)
+    yield
+    await session_hub.close()
+    report_jobs.shutdown()
+
+app = FastAPI(
+    title="Flight Instructor Evaluation API", default_response_class=ORJSONResponse, lifespan=lifespan
+)
 
 # CORS configuration
 app.add_middleware(
@@ -154,6 +234,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # Dependency
@@ -164,71 +245,324 @@ def get_db():
     finally:
         db.close()
 
-@app.get("/")
+def serialize_observation(obs, entry, student_name: str, compact: bool = False) -> dict:
+    """
+    Observation as sent to clients, from an ORM object or a row with the same
+    attributes. Compact observations only carry the id of their ob_catalog
+    entry, which clients resolve with GET /ob/catalog.
+    """
+    if compact:
+        return {
+            "id": obs.id,
+            "ob_id": obs.ob_id,
+            "timestamp": obs.timestamp,
+            "is_checked": obs.is_checked,
+            "student_name": student_name
+        }
+    return {
+        "id": obs.id,
+        "text": entry.text,
+        "timestamp": obs.timestamp,
+        "ob_code": entry.ob_code,
+        "competence": entry.competence,
+        "is_checked": obs.is_checked,
+        "student_name": student_name
+    }
+
+# Endpoints using the database are plain functions: FastAPI runs them in its
+# threadpool, so blocking SQLAlchemy calls never stall the event loop.
+
+@app.get("/", response_model=Message)
 async def root():
     return {"message": "Flight Instructor Evaluation API"}
 
-@app.get("/sessions/")
-async def list_sessions(db: Session = Depends(get_db)):
-    sessions = db.query(DBSession).all()
+SESSION_PAGE_SIZE = 50
+MAX_SESSION_PAGE_SIZE = 200
+
+def encode_session_cursor(date: datetime, session_id: int) -> str:
+    """Opaque keyset cursor pointing after a session in (date, id) order."""
+    return base64.urlsafe_b64encode(json.dumps([date.isoformat(), session_id]).encode()).decode()
+
+def decode_session_cursor(cursor: str):
+    try:
+        date, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(date), int(session_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/sessions/", response_model=List[Union[SessionListItem, SessionSummary]])
+def list_sessions(
+    response: Response,
+    limit: int = Query(SESSION_PAGE_SIZE, ge=1, le=MAX_SESSION_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    date_from: Optional[datetime] = Query(None, description="Sessions on or after this date"),
+    date_to: Optional[datetime] = Query(None, description="Sessions before this date"),
+    student: Optional[str] = Query(None, description="Only sessions of this student"),
+    summary: bool = Query(False, description="Student count instead of the student list"),
+    db: Session = Depends(get_db)
+):
+    # Newest first, paginated on (date, id) through ix_sessions_date_id: each
+    # page is an index range scan no matter how many sessions precede it
+    query = db.query(DBSession).order_by(DBSession.date.desc(), DBSession.id.desc())
+    if cursor:
+        query = query.filter(tuple_(DBSession.date, DBSession.id) < decode_session_cursor(cursor))
+    if date_from:
+        query = query.filter(DBSession.date >= date_from)
+    if date_to:
+        query = query.filter(DBSession.date < date_to)
+    if student:
+        query = query.filter(DBSession.id.in_(
+            select(session_students.c.session_id)
+            .join(DBStudent, DBStudent.id == session_students.c.student_id)
+            .where(DBStudent.name == student)
+        ))
+    if summary:
+        student_count = (
+            select(func.count())
+            .where(session_students.c.session_id == DBSession.id)
+            .correlate(DBSession)
+            .scalar_subquery()
+        )
+        query = query.add_columns(student_count)
+    else:
+        query = query.options(selectinload(DBSession.students))
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0] if summary else rows[-1]
+        response.headers["X-Next-Cursor"] = encode_session_cursor(last.date, last.id)
+
+    if summary:
+        return [{
+            "id": session.id,
+            "date": session.date,
+            "competences": session.competences.split(",") if session.competences else [],
+            "student_count": student_count
+        } for session, student_count in rows]
     return [{
         "id": session.id,
         "date": session.date,
         "competences": session.competences.split(",") if session.competences else [],
-        "students": json.loads(session.students_data) if session.students_data else []
-    } for session in sessions]
+        "students": [{"name": student.name} for student in session.students]
+    } for session in rows]
 
-@app.get("/sessions/{session_id}")
-async def get_session(session_id: int, db: Session = Depends(get_db)):
-    session = db.query(DBSession).filter(DBSession.id == session_id).first()
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    exercises = [{
-        "id": ex.id,
-        "name": ex.name,
-        "date": ex.date,
-        "is_completed": ex.is_completed,
-        "competences": json.loads(ex.competences) if ex.competences else [],
-        "observations": [{
-            "id": obs.id,
-            "text": obs.text,
-            "timestamp": obs.timestamp,
-            "ob_code": obs.ob_code,
-            "competence": obs.competence,
-            "is_checked": obs.is_checked,
-            "student_name": obs.student_name
-        } for obs in ex.observations]
-    } for ex in session.exercises]
-    
+@app.get("/search/observations", response_model=List[SearchResult])
+def search(
+    response: Response,
+    q: Optional[str] = Query(None, description="Words of the observation text, OB code or competence"),
+    student: Optional[str] = Query(None, description="Words of the student name"),
+    checked: Optional[bool] = Query(None, description="Only checked or unchecked observations"),
+    limit: int = Query(SESSION_PAGE_SIZE, ge=1, le=MAX_SESSION_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    db: Session = Depends(get_db)
+):
+    """
+    Observations matching q and student, best matching OB first, then newest
+    first. Each word matches as a prefix.
+    """
+    if not (q and q.strip()) and not (student and student.strip()):
+        raise HTTPException(status_code=400, detail="Give q or student")
+    after = None
+    if cursor:
+        try:
+            group, observation_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            after = int(group), int(observation_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    hits = search_observations(db, q, student, checked, limit + 1, after)
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last = hits[-1]
+        group = last.ob_id if q else last.student_id
+        response.headers["X-Next-Cursor"] = base64.urlsafe_b64encode(json.dumps([group, last.id]).encode()).decode()
+    return serialize_hits(db, hits)
+
+@app.get("/archive/sessions", response_model=List[SessionListItem])
+def list_archived_sessions(
+    response: Response,
+    limit: int = Query(SESSION_PAGE_SIZE, ge=1, le=MAX_SESSION_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    db: Session = Depends(get_db)
+):
+    """Sessions moved to the archive, newest first; GET /sessions/{id} still serves them."""
+    query = db.query(
+        DBArchivedSession.session_id, DBArchivedSession.date, DBArchivedSession.competences, DBArchivedSession.students
+    ).order_by(DBArchivedSession.date.desc(), DBArchivedSession.session_id.desc())
+    if cursor:
+        query = query.filter(tuple_(DBArchivedSession.date, DBArchivedSession.session_id) < decode_session_cursor(cursor))
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_session_cursor(rows[-1].date, rows[-1].session_id)
+    return [{
+        "id": session_id,
+        "date": date,
+        "competences": competences.split(",") if competences else [],
+        "students": [{"name": name} for name in json.loads(students)]
+    } for session_id, date, competences, students in rows]
+
+def session_detail(
+    db: Session,
+    session,
+    students: List[tuple],
+    exercise_rows: List[tuple],
+    observation_rows: Dict[int, List[tuple]],
+    student_names: Dict[int, str],
+    compact: bool
+) -> dict:
+    """
+    Session as sent to clients from plain rows: session (id, date, version),
+    roster (id, name), exercises (id, name, date, is_completed, competences)
+    and per exercise observations (id, ob_id, timestamp, is_checked, student_id).
+    """
+    # Same fields as serialize_observation, unpacking the rows positionally
+    # since named access on thousands of rows dominates the request
+    entries = get_catalog(db, (row[1] for rows in observation_rows.values() for row in rows)).entries
+    observations: Dict[int, list] = {}
+    for exercise_id, rows in observation_rows.items():
+        if compact:
+            observations[exercise_id] = [{
+                "id": obs_id,
+                "ob_id": ob_id,
+                "timestamp": timestamp,
+                "is_checked": is_checked,
+                "student_name": student_names[student_id]
+            } for obs_id, ob_id, timestamp, is_checked, student_id in rows]
+        else:
+            serialized = observations[exercise_id] = []
+            for obs_id, ob_id, timestamp, is_checked, student_id in rows:
+                entry = entries[ob_id]
+                serialized.append({
+                    "id": obs_id,
+                    "text": entry.text,
+                    "timestamp": timestamp,
+                    "ob_code": entry.ob_code,
+                    "competence": entry.competence,
+                    "is_checked": is_checked,
+                    "student_name": student_names[student_id]
+                })
+
+    session_id, date, version = session
     return {
-        "id": session.id,
-        "date": session.date,
-        "students": json.loads(session.students_data) if session.students_data else [],
-        "exercises": exercises
+        "id": session_id,
+        "date": date,
+        "students": [{"name": name} for _, name in students],
+        "version": version or 0,
+        "exercises": [{
+            "id": exercise_id,
+            "name": name,
+            "date": exercise_date,
+            "is_completed": is_completed,
+            "competences": json.loads(competences) if competences else [],
+            "observations": observations.get(exercise_id, [])
+        } for exercise_id, name, exercise_date, is_completed, competences in exercise_rows]
     }
 
-@app.post("/sessions/")
-async def create_session(session: SessionCreate, db: Session = Depends(get_db)):
-    db_session = DBSession(
-        date=datetime.utcnow(),
-        students_data=json.dumps([s.dict() for s in session.students]) # Store student data as JSON string
+@app.get("/sessions/{session_id}", response_model=SessionDetail)
+def get_session(
+    session_id: int,
+    compact: bool = Query(False, description="Send observations as ob_catalog ids"),
+    db: Session = Depends(get_db)
+):
+    # One query per level, selecting plain columns: rows come back as tuples
+    # without building ORM objects or tracking them in the identity map
+    session = db.query(DBSession.id, DBSession.date, DBSession.version).filter(DBSession.id == session_id).first()
+    if not session:
+        archived = load_archived_session(db, session_id)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return archived_session_detail(db, archived, compact)
+
+    students = (
+        db.query(DBStudent.id, DBStudent.name)
+        .join(session_students, session_students.c.student_id == DBStudent.id)
+        .filter(session_students.c.session_id == session_id)
+        .order_by(session_students.c.position)
+        .all()
+    )
+    exercises = (
+        db.query(
+            DBExercise.id,
+            DBExercise.name,
+            DBExercise.date,
+            DBExercise.is_completed,
+            DBExercise.competences,
+            DBExerciseSnapshot.observations
+        )
+        .outerjoin(DBExerciseSnapshot, DBExerciseSnapshot.exercise_id == DBExercise.id)
+        .filter(DBExercise.session_id == session_id)
+        .order_by(DBExercise.id)
+        .all()
+    )
+    # Completed exercises come from their snapshot, the others from their rows
+    observation_rows: Dict[int, list] = {}
+    open_ids = []
+    for exercise in exercises:
+        if exercise[5] is None:
+            open_ids.append(exercise[0])
+        else:
+            observation_rows[exercise[0]] = snapshot_observations(exercise[5])
+    if open_ids:
+        for exercise_id, *row in (
+            db.query(
+                DBObservation.exercise_id,
+                DBObservation.id,
+                DBObservation.ob_id,
+                DBObservation.timestamp,
+                DBObservation.is_checked,
+                DBObservation.student_id
+            )
+            .filter(DBObservation.exercise_id.in_(open_ids))
+            .order_by(DBObservation.exercise_id, DBObservation.id)
+        ):
+            observation_rows.setdefault(exercise_id, []).append(row)
+
+    student_names = {student_id: name for student_id, name in students}
+    # Observations of students since removed from the roster
+    missing = {row[4] for rows in observation_rows.values() for row in rows if row[4] not in student_names}
+    if missing:
+        student_names.update(db.query(DBStudent.id, DBStudent.name).filter(DBStudent.id.in_(missing)).all())
+
+    return session_detail(
+        db, session, students, [exercise[:5] for exercise in exercises], observation_rows, student_names, compact
     )
+
+def archived_session_detail(db: Session, archived: dict, compact: bool) -> dict:
+    student_names = dict(archived["student_names"])
+    return session_detail(
+        db,
+        (archived["id"], archived["date"], archived["version"]),
+        [(student_id, student_names[student_id]) for student_id in archived["students"]],
+        [exercise[:5] for exercise in archived["exercises"]],
+        {exercise[0]: exercise[5] for exercise in archived["exercises"]},
+        student_names,
+        compact
+    )
+
+@app.post("/sessions/", response_model=SessionDetail)
+def create_session(session: SessionCreate, db: Session = Depends(get_db)):
+    db_session = DBSession(date=datetime.utcnow())
     db.add(db_session)
+    db.flush()
+    students = add_session_students(db, db_session.id, [s.name for s in session.students])
     db.commit()
     db.refresh(db_session)
     
     return {
         "id": db_session.id,
         "date": db_session.date,
-        "students": session.students,
+        "students": [{"name": student.name} for student in students],
+        "version": db_session.version,
         "exercises": []
     }
 
-@app.post("/sessions/{session_id}/exercises/")
-async def create_exercise(
+@app.post("/sessions/{session_id}/exercises/", response_model=ExerciseDetail)
+def create_exercise(
     session_id: int,
     exercise: ExerciseCreate,
+    compact: bool = Query(False, description="Send observations as ob_catalog ids"),
     db: Session = Depends(get_db)
 ):
     session = db.query(DBSession).filter(DBSession.id == session_id).first()
@@ -236,11 +570,13 @@ async def create_exercise(
         raise HTTPException(status_code=404, detail="Session not found")
 
     # Verify student exists in session
-    students_data = json.loads(session.students_data)
-    student_exists = any(student["name"] == exercise.student_name for student in students_data)
-    if not student_exists:
+    student = find_session_student(db, session_id, exercise.student_name)
+    if not student:
         raise HTTPException(status_code=400, detail=f"Student {exercise.student_name} not found in this session.")
 
+    selected_obs = [ob for competency in exercise.competences for ob in TAXONOMY.by_competence.get(competency, ())]
+    ob_ids = taxonomy_ob_ids(db)
+
     db_exercise = DBExercise(
         name=exercise.name,
         session_id=session_id,
@@ -248,44 +584,79 @@ async def create_exercise(
         competences=json.dumps(exercise.competences)  # Store selected competencies
     )
     
-    # Create observations only for the selected competencies
-    for competency in exercise.competences:
-        if competency in OBSERVATIONS_BY_COMPETENCY:
-            for obs_text in OBSERVATIONS_BY_COMPETENCY[competency]:
-                ob_result = detect_ob(obs_text)
-                db_observation = DBObservation(
-                    text=obs_text,
-                    timestamp=datetime.utcnow(),
-                    ob_code=ob_result["ob_code"] if ob_result else None,
-                    competence=competency,
-                    student_name=exercise.student_name,
-                    exercise=db_exercise
-                )
-                db.add(db_observation)
-    
     db.add(db_exercise)
+    db.flush()
+
+    # Create observations only for the selected competencies, in a single bulk INSERT
+    now = datetime.utcnow()
+    rows = [{
+        "ob_id": ob_ids[ob.id],
+        "timestamp": now,
+        "student_id": student.id,
+        "exercise_id": db_exercise.id,
+        "is_checked": False
+    } for ob in selected_obs]
+    observations = db.execute(
+        insert(DBObservation).returning(
+            DBObservation.id,
+            DBObservation.ob_id,
+            DBObservation.timestamp,
+            DBObservation.is_checked
+        ),
+        rows
+    ).all() if rows else []
+    # Ids follow insertion order within the single INSERT; RETURNING order is not guaranteed
+    observations.sort(key=lambda obs: obs.id)
+
+    created: Dict[str, list] = {}
+    for ob in selected_obs:
+        created.setdefault(ob.competence, []).append((ob.text, ob.code))
+    add_observations(db, session_id, student.id, created)
+
+    version = bump_session_version(db, session_id)
     db.commit()
     db.refresh(db_exercise)
-    
-    return {
-        "id": db_exercise.id,
-        "name": db_exercise.name,
-        "date": db_exercise.date,
-        "is_completed": db_exercise.is_completed,
-        "competences": exercise.competences,
-        "observations": [{
-            "id": obs.id,
-            "text": obs.text,
-            "timestamp": obs.timestamp,
-            "ob_code": obs.ob_code,
-            "competence": obs.competence,
-            "is_checked": obs.is_checked,
-            "student_name": obs.student_name
-        } for obs in db_exercise.observations]
-    }
+    catalog = get_catalog(db)
+
+    def serialize(compact: bool) -> dict:
+        return {
+            "id": db_exercise.id,
+            "name": db_exercise.name,
+            "date": db_exercise.date,
+            "is_completed": db_exercise.is_completed,
+            "competences": exercise.competences,
+            "observations": [
+                serialize_observation(obs, catalog.entries[obs.ob_id], student.name, compact)
+                for obs in observations
+            ]
+        }
 
-@app.put("/exercises/{exercise_id}/observations/{observation_id}")
-async def update_observation(
+    created_exercise = serialize(compact)
+    session_hub.publish(session_id, {
+        "type": "exercise_created",
+        "version": version,
+        "exercise": serialize(False) if compact else created_exercise
+    })
+    return created_exercise
+
+def open_exercise_ids():
+    """Exercises whose observations can still be toggled, as a subquery for UPDATE guards."""
+    return select(DBExercise.id).where(DBExercise.is_completed.is_not(True))
+
+def frozen_observations(db: Session, observation_ids: List[int]) -> List[int]:
+    """
+    The observations among observation_ids that belong to a completed
+    exercise. Called after a guarded UPDATE, whose write lock keeps the
+    answer valid until the commit.
+    """
+    return sorted(observation_id for observation_id, in (
+        db.query(DBObservation.id)
+        .join(DBExercise, DBObservation.exercise_id == DBExercise.id)
+        .filter(DBObservation.id.in_(observation_ids), DBExercise.is_completed.is_(True))
+    ))
+
+@app.put("/exercises/{exercise_id}/observations/{observation_id}", response_model=Observation)
+def update_observation(
     exercise_id: int,
     observation_id: int,
     observation: ObservationUpdate,
@@ -298,33 +669,167 @@ async def update_observation(
     
     if not db_observation:
         raise HTTPException(status_code=404, detail="Observation not found")
-    
-    db_observation.is_checked = observation.is_checked
+
+    # Locks the exercise against a concurrent completion until the commit
+    # (PostgreSQL; SQLite ignores FOR UPDATE, hence the guard in the UPDATE)
+    session_id, is_completed = db.query(DBExercise.session_id, DBExercise.is_completed).filter(
+        DBExercise.id == exercise_id
+    ).with_for_update().one()
+    if is_completed:
+        raise HTTPException(status_code=409, detail="Exercise is completed, its observations are frozen")
+    # Conditional update: only a real state change moves the competence counts
+    changed = db.execute(
+        update(DBObservation)
+        .where(
+            DBObservation.id == observation_id,
+            DBObservation.exercise_id.in_(open_exercise_ids()),
+            func.coalesce(DBObservation.is_checked, False) != observation.is_checked
+        )
+        .values(is_checked=observation.is_checked)
+        .returning(DBObservation.student_id, DBObservation.ob_id)
+    ).first()
+    if not changed and frozen_observations(db, [observation_id]):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Exercise is completed, its observations are frozen")
+    entry = get_catalog(db, [db_observation.ob_id]).entries[db_observation.ob_id]
+    if changed and entry.competence:
+        apply_count_deltas(db, session_id, {
+            (changed.student_id, entry.competence): (1 if observation.is_checked else -1, 0)
+        })
+    version = bump_session_version(db, session_id)
     db.commit()
     db.refresh(db_observation)
+    # Published even without a state change, so subscribers see every version
+    session_hub.publish(session_id, {
+        "type": "observations",
+        "version": version,
+        "observations": [{
+            "id": db_observation.id,
+            "exercise_id": exercise_id,
+            "is_checked": db_observation.is_checked
+        }] if changed else []
+    })
     
     return {
         "id": db_observation.id,
-        "text": db_observation.text,
+        "text": entry.text,
         "timestamp": db_observation.timestamp,
-        "ob_code": db_observation.ob_code,
-        "competence": db_observation.competence,
+        "ob_code": entry.ob_code,
+        "competence": entry.competence,
         "is_checked": db_observation.is_checked
     }
 
-@app.put("/exercises/{exercise_id}/complete")
-async def complete_exercise(
+@app.patch("/sessions/{session_id}/observations", response_model=ObservationBatchResult)
+def update_observations(
+    session_id: int,
+    batch: ObservationBatchUpdate,
+    db: Session = Depends(get_db)
+):
+    session = db.query(DBSession).filter(DBSession.id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    # Later changes to the same observation win
+    requested = {change.observation_id: change.is_checked for change in batch.changes}
+
+    # Locks the exercises against a concurrent completion until the commit
+    # (PostgreSQL; SQLite ignores FOR UPDATE, hence the guard in the UPDATE)
+    found = dict(
+        db.query(DBObservation.id, DBExercise.is_completed)
+        .join(DBExercise, DBObservation.exercise_id == DBExercise.id)
+        .filter(DBExercise.session_id == session_id, DBObservation.id.in_(requested))
+        .with_for_update(of=DBExercise)
+        .all()
+    ) if requested else {}
+    missing = [observation_id for observation_id in requested if observation_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Observations not found in this session: {missing}")
+    frozen = sorted(observation_id for observation_id, is_completed in found.items() if is_completed)
+    if frozen:
+        raise HTTPException(status_code=409, detail=f"Observations of completed exercises are frozen: {frozen}")
+
+    # One conditional UPDATE per target state, applied in a single transaction;
+    # RETURNING yields only the rows whose state actually changed
+    rows = []
+    for is_checked in (True, False):
+        ids = [observation_id for observation_id, state in requested.items() if state == is_checked]
+        if ids:
+            rows += db.execute(
+                update(DBObservation)
+                .where(
+                    DBObservation.id.in_(ids),
+                    DBObservation.exercise_id.in_(open_exercise_ids()),
+                    func.coalesce(DBObservation.is_checked, False) != is_checked
+                )
+                .values(is_checked=is_checked)
+                .returning(
+                    DBObservation.id,
+                    DBObservation.exercise_id,
+                    DBObservation.is_checked,
+                    DBObservation.student_id,
+                    DBObservation.ob_id
+                )
+            ).all()
+    if len(rows) < len(requested):
+        # An exercise completed since the check above is left out by the UPDATE
+        frozen = frozen_observations(db, list(requested))
+        if frozen:
+            db.rollback()
+            raise HTTPException(status_code=409, detail=f"Observations of completed exercises are frozen: {frozen}")
+    if not rows:
+        db.rollback()
+        return {"session_id": session_id, "version": session.version or 0, "observations": []}
+
+    catalog = get_catalog(db, (row.ob_id for row in rows))
+    deltas: Dict[tuple, tuple] = {}
+    for row in rows:
+        competence = catalog.entries[row.ob_id].competence
+        if competence:
+            checked, total = deltas.get((row.student_id, competence), (0, 0))
+            deltas[(row.student_id, competence)] = (checked + (1 if row.is_checked else -1), total)
+    apply_count_deltas(db, session_id, deltas)
+    version = bump_session_version(db, session_id)
+    db.commit()
+    rows.sort(key=lambda row: row.id)
+
+    changes = [{
+        "id": row.id,
+        "exercise_id": row.exercise_id,
+        "is_checked": row.is_checked
+    } for row in rows]
+    session_hub.publish(session_id, {"type": "observations", "version": version, "observations": changes})
+    return {"session_id": session_id, "version": version, "observations": changes}
+
+@app.put("/exercises/{exercise_id}/complete", response_model=Exercise)
+def complete_exercise(
     exercise_id: int,
     db: Session = Depends(get_db)
 ):
     exercise = db.query(DBExercise).filter(DBExercise.id == exercise_id).first()
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercise not found")
-    
-    exercise.is_completed = True
-    db.commit()
+
+    # Only the request that completes the exercise freezes it; completing it
+    # again changes nothing
+    completed = db.execute(
+        update(DBExercise)
+        .where(DBExercise.id == exercise_id, DBExercise.is_completed.is_not(True))
+        .values(is_completed=True)
+        .returning(DBExercise.id)
+    ).first()
+    if completed:
+        freeze_exercises(db, [exercise_id])
+        version = bump_session_version(db, exercise.session_id)
+        db.commit()
+        session_hub.publish(exercise.session_id, {
+            "type": "exercise_completed",
+            "version": version,
+            "exercise_id": exercise.id
+        })
+    else:
+        db.rollback()
     db.refresh(exercise)
-    
+
     return {
         "id": exercise.id,
         "name": exercise.name,
@@ -332,78 +837,205 @@ async def complete_exercise(
         "is_completed": exercise.is_completed
     }
 
-@app.get("/sessions/{session_id}/report/")
-async def generate_report(
+@app.websocket("/sessions/{session_id}/ws")
+async def session_updates(websocket: WebSocket, session_id: int, db: Session = Depends(get_db)):
+    """
+    Changes of a session as JSON messages: first {"type": "subscribed"} with
+    the current version, then observations, exercise_created and
+    exercise_completed deltas carrying the version they produced. Clients
+    ignore deltas at or below their version and reload the session when a
+    version is skipped or on {"type": "resync"}.
+    """
+    def current_version():
+        try:
+            return db.query(DBSession.version).filter(DBSession.id == session_id).scalar()
+        finally:
+            # Subscribers stay connected for long; don't hold a pooled connection
+            db.close()
+
+    # Subscribe before reading the version so no delta falls in between
+    queue = await session_hub.subscribe(session_id)
+    try:
+        version = await run_in_threadpool(current_version)
+        if version is None:
+            await websocket.close(code=1008)
+            return
+        await websocket.accept()
+        await websocket.send_text(json.dumps({"type": "subscribed", "session_id": session_id, "version": version}))
+
+        async def forward():
+            while True:
+                await websocket.send_text(await queue.get())
+
+        sender = asyncio.create_task(forward())
+        try:
+            # Messages from the client are ignored; this only waits for the disconnect
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+    finally:
+        session_hub.unsubscribe(session_id, queue)
+
+@app.get("/sessions/{session_id}/report/", response_model=Dict[str, StudentReport])
+def generate_report(
     session_id: int, 
     safety_scores: str = Query(..., description="""JSON string of safety scores per student, e.g., '{"Student A": 4, "Student B": 5}'"""),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    session = db.query(DBSession).filter(DBSession.id == session_id).first()
-    if not session:
+    found = load_session_report(db, session_id)
+    if found is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
+
     safety_scores_dict = json.loads(safety_scores)
-    
-    students_data = json.loads(session.students_data)
-    
-    full_report = {}
-    
-    for student in students_data:
-        student_name = student["name"]
-        student_safety_score = safety_scores_dict.get(student_name, 5) # Default to 5 if not provided
-
-        # Collect observations relevant to this student from all exercises
-        student_observations = []
-        student_competences_evaluated = set() # Collect unique competences evaluated for this student
-        unchecked_observations = [] # Liste des observations non cochées
-        for exercise in session.exercises:
-            # Only consider exercises that the current student participated in
-            if any(obs.student_name == student_name for obs in exercise.observations):
-                for obs in exercise.observations:
-                    if obs.student_name == student_name:
-                        obs_dict = {
-                            "text": obs.text,
-                            "ob_code": obs.ob_code,
-                            "competence": obs.competence,
-                            "is_checked": obs.is_checked
-                        }
-                        student_observations.append(obs_dict)
-                        if obs.competence: # Add competence from observation if it exists
-                            student_competences_evaluated.add(obs.competence)
-                        if not obs.is_checked:
-                            unchecked_observations.append({
-                                "text": obs.text,
-                                "ob_code": obs.ob_code,
-                                "competence": obs.competence
-                            })
-        
-        student_report = {}
-        for comp in sorted(list(student_competences_evaluated)):
-            how_many = calculate_how_many(student_observations, comp)
-            how_often = calculate_how_often(student_observations, comp)
-            final_grade = min(how_many, how_often, student_safety_score)
-            # Liste des observations pour cette compétence, sans doublon mais seulement pour cette compétence
-            seen_obs = set()
-            comp_observations = []
-            for obs in student_observations:
-                if obs["competence"] == comp:
-                    key = (obs["text"], obs["ob_code"], obs["competence"])
-                    if key not in seen_obs:
-                        comp_observations.append({"text": obs["text"], "ob_code": obs["ob_code"]})
-                        seen_obs.add(key)
-            student_report[comp] = {
-                "how_many": how_many,
-                "how_often": how_often,
-                "safety_score": student_safety_score,
-                "final_grade": final_grade,
-                "observations": comp_observations
-            }
-        full_report[student_name] = {
-            "report": student_report,
-            "unchecked_observations": unchecked_observations
-        }
-    
-    return full_report
+
+    # Every write bumps the session version, so the session's creation date,
+    # its version and the effective safety scores fully identify the report
+    scores_key = normalize_safety_scores([student.name for student in found.students], safety_scores_dict)
+    etag = report_etag(session_id, found.created, found.version, scores_key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        report_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+
+    report = report_cache.get_or_build(
+        (session_id, found.created, found.version, scores_key), lambda: found.build(safety_scores_dict)
+    )
+    return Response(content=report, media_type="application/json", headers=headers)
+
+@app.post("/reports/jobs", response_model=ReportJob, status_code=202)
+def create_report_job(job: ReportJobCreate, db: Session = Depends(get_db)):
+    """Queue the reports of several sessions; poll the returned job, then download its result."""
+    if not job.sessions:
+        raise HTTPException(status_code=400, detail="No sessions given")
+    database_url = db.get_bind().url.render_as_string(hide_password=False)
+    return report_jobs.submit(database_url, [(item.session_id, item.safety_scores) for item in job.sessions])
+
+@app.get("/reports/jobs/{job_id}", response_model=ReportJob)
+def get_report_job(job_id: str):
+    job = report_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/reports/jobs/{job_id}/result", response_class=FileResponse)
+def get_report_job_result(job_id: str):
+    """One NDJSON line per requested session: its report or an error."""
+    job = report_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "running":
+        raise HTTPException(status_code=409, detail="Job still running")
+    path = report_jobs.result_path(job_id)
+    if not os.path.exists(path):
+        # A stalled job never wrote its result
+        raise HTTPException(status_code=404, detail="Job result not available")
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES["ndjson"],
+        filename=f"reports-{job_id}.ndjson"
+    )
+
+def export_response(db: Session, rows, fields, name: str, export_format: str, **filters) -> StreamingResponse:
+    return StreamingResponse(
+        stream_export(db.get_bind(), rows, fields, export_format, **filters),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format}"'}
+    )
+
+@app.get("/export/observations", response_class=StreamingResponse)
+def export_observations(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    date_from: Optional[datetime] = Query(None, description="Sessions on or after this date"),
+    date_to: Optional[datetime] = Query(None, description="Sessions before this date"),
+    student: Optional[str] = Query(None, description="Only observations of this student"),
+    include_archived: bool = Query(True, description="Also export the sessions moved to the archive"),
+    db: Session = Depends(get_db)
+):
+    """Every observation of the matching sessions, streamed as NDJSON or CSV."""
+    return export_response(
+        db, observation_rows, OBSERVATION_FIELDS, "observations", export_format,
+        date_from=date_from, date_to=date_to, student=student, include_archived=include_archived
+    )
+
+@app.get("/export/reports", response_class=StreamingResponse)
+def export_reports(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    date_from: Optional[datetime] = Query(None, description="Sessions on or after this date"),
+    date_to: Optional[datetime] = Query(None, description="Sessions before this date"),
+    student: Optional[str] = Query(None, description="Only grades of this student"),
+    include_archived: bool = Query(True, description="Also export the sessions moved to the archive"),
+    db: Session = Depends(get_db)
+):
+    """HOW MANY/HOW OFTEN grades per session, student and competence, streamed as NDJSON or CSV."""
+    return export_response(
+        db, report_rows, REPORT_FIELDS, "reports", export_format,
+        date_from=date_from, date_to=date_to, student=student, include_archived=include_archived
+    )
+
+@app.get("/analytics/cohort", response_model=CohortAnalytics)
+def analytics_cohort(
+    date_from: Optional[datetime] = Query(None, description="Sessions on or after this date"),
+    date_to: Optional[datetime] = Query(None, description="Sessions before this date"),
+    student: Optional[str] = Query(None, description="Only this student"),
+    limit: int = Query(10, ge=1, le=100, description="Declining trends and weakest OBs to list"),
+    include_archived: bool = Query(True, description="Also count the sessions moved to the archive"),
+    db: Session = Depends(get_db)
+):
+    """
+    Grade distribution (counts of grades 1 to 5) per competence, students
+    whose grades decline the most across sessions and the least checked OBs.
+    """
+    from .analytics import cohort_analytics, get_cohort
+
+    return cohort_analytics(db, get_cohort(db), date_from, date_to, student, limit, include_archived)
+
+@app.get("/ob/catalog", response_model=List[CatalogEntryOut])
+def list_ob_catalog(db: Session = Depends(get_db)):
+    """All observation texts, for clients requesting sessions in compact mode."""
+    return serialize_catalog(get_catalog(db, reload=True))
+
+@app.get("/ob/match", response_model=List[OBMatch])
+def match_observation(
+    text: str = Query(..., min_length=1, description="Free-text instructor note"),
+    limit: int = Query(5, ge=1, le=20),
+    min_score: float = Query(0.0, ge=0.0, le=1.0),
+    mode: str = Query("lexical", pattern="^(lexical|semantic)$", description="semantic uses OB_CLASSIFIER_MODEL when configured")
+):
+    # numpy and the matchers are loaded on first use, or by prewarm()
+    if mode == "semantic":
+        from .ob_classifier import classify_ob as match
+    else:
+        from .ob_matcher import match_ob as match
+    return [{
+        "ob_code": ob_code,
+        "competence": competence,
+        "score": score
+    } for ob_code, competence, score in match(text, limit, min_score)]
+
+@app.get("/metrics/report-cache", response_model=ReportCacheStats)
+def report_cache_metrics():
+    return report_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Request latency, SQL statements per route and report cache counters, for Prometheus."""
+    cache = report_cache.stats()
+    return PlainTextResponse(metrics.render([
+        "# TYPE report_cache_entries gauge",
+        f"report_cache_entries {cache['size']}",
+        "# TYPE report_cache_hits_total counter",
+        f"report_cache_hits_total {cache['hits']}",
+        "# TYPE report_cache_misses_total counter",
+        f"report_cache_misses_total {cache['misses']}",
+        "# TYPE report_cache_not_modified_total counter",
+        f"report_cache_not_modified_total {cache['not_modified']}",
+    ]), media_type="text/plain; version=0.0.4")
+
+# Last, so that every route above is timed
+instrument(app)
 
 if __name__ == "__main__":
     import uvicorn
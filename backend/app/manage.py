@@ -0,0 +1,50 @@
+"""
+Database preparation, as an explicit deployment step.
+
+The API migrates the database and registers the OB taxonomy when it starts,
+unless DB_MIGRATE_ON_STARTUP=0, then builds the OB matcher in the background
+unless APP_PREWARM=0. Deployments running several workers or
+containers should migrate once per release instead, so that workers start
+without importing Alembic or racing on migrations:
+
+    cd backend && python -m app.manage migrate
+"""
+import argparse
+import os
+import time
+
+from .database import SessionLocal, init_db
+from .ob_catalog import seed_catalog
+
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "1") not in ("0", "false", "no")
+APP_PREWARM = os.getenv("APP_PREWARM", "1") not in ("0", "false", "no")
+
+
+def prepare_database(migrate: bool = DB_MIGRATE_ON_STARTUP) -> None:
+    """Upgrade the schema when asked to, then register the taxonomy OBs and load the catalog."""
+    if migrate:
+        init_db()
+    with SessionLocal() as db:
+        seed_catalog(db)
+
+
+def prewarm() -> None:
+    """Import numpy and build the lexical OB matcher ahead of the first request."""
+    from . import analytics  # noqa: F401
+    from .ob_matcher import get_matcher
+
+    get_matcher()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare the database before starting the API.")
+    parser.add_argument("command", choices=["migrate"])
+    parser.parse_args()
+
+    start = time.perf_counter()
+    prepare_database(migrate=True)
+    print(f"database migrated and OB catalog seeded in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Request and SQL instrumentation, exposed in the Prometheus text format.
+
+A pure ASGI middleware times every HTTP request into a latency histogram per
+method and route template (unmatched paths share one label). SQLAlchemy
+cursor events count the statements of the request and their duration; the
+per-request totals travel in a context variable, which follows handlers into
+the threadpool.
+
+Optional, all from the environment:
+
+- METRICS_SLOW_REQUEST_MS logs requests slower than this, with their SQL.
+- PROFILE_SAMPLE_RATE runs this fraction of requests under cProfile and
+  keeps the profile in PROFILE_DIR when the request took longer than
+  PROFILE_THRESHOLD_MS. Unsampled requests pay nothing for it.
+"""
+import asyncio
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "no")
+METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", "0"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_THRESHOLD_MS = float(os.getenv("PROFILE_THRESHOLD_MS", "500"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds", "profile")
+
+    def __init__(self, profile: Optional[cProfile.Profile] = None):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.profile = profile
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    if stats is not None:
+        started = conn.info.get("query_start")
+        if started:
+            stats.queries += 1
+            stats.sql_seconds += time.perf_counter() - started.pop()
+
+
+class Histogram:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+
+
+class Metrics:
+    """Counters and histograms, updated on the event loop by the middleware."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.queries: Dict[Tuple[str, str], int] = {}
+        self.sql_seconds: Dict[Tuple[str, str], float] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram(len(self.buckets))
+        histogram.counts[bisect_left(self.buckets, seconds)] += 1
+        histogram.sum += seconds
+        self.responses[(method, route, status)] = self.responses.get((method, route, status), 0) + 1
+        self.queries[key] = self.queries.get(key, 0) + stats.queries
+        self.sql_seconds[key] = self.sql_seconds.get(key, 0.0) + stats.sql_seconds
+
+    def render(self, extra: Optional[List[str]] = None) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds HTTP request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self.latency.items()):
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+        lines += ["# HELP http_responses_total HTTP responses by route and status.", "# TYPE http_responses_total counter"]
+        for (method, route, status), count in sorted(self.responses.items()):
+            lines.append(f'http_responses_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+        lines += ["# HELP db_queries_total SQL statements executed by requests.", "# TYPE db_queries_total counter"]
+        for (method, route), count in sorted(self.queries.items()):
+            lines.append(f'db_queries_total{{method="{method}",route="{route}"}} {count}')
+        lines += ["# HELP db_query_seconds_total Time spent in SQL statements by requests.",
+                  "# TYPE db_query_seconds_total counter"]
+        for (method, route), seconds in sorted(self.sql_seconds.items()):
+            lines.append(f'db_query_seconds_total{{method="{method}",route="{route}"}} {seconds:.6f}')
+        return "\n".join(lines + (extra or [])) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    def __init__(self, app, routes: Dict[object, str]):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = cProfile.Profile() if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE else None
+        stats = RequestStats(profile)
+        token = _request_stats.set(stats)
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            # The router stores the matched endpoint in the scope
+            route = self.routes.get(scope.get("endpoint"), "unmatched")
+            metrics.observe(scope["method"], route, status, elapsed, stats)
+            if METRICS_SLOW_REQUEST_MS and elapsed * 1000 >= METRICS_SLOW_REQUEST_MS:
+                logger.warning(
+                    "Slow request %s %s: %.0f ms, %d SQL statements in %.0f ms",
+                    scope["method"], scope["path"], elapsed * 1000, stats.queries, stats.sql_seconds * 1000
+                )
+            if profile is not None and elapsed * 1000 >= PROFILE_THRESHOLD_MS:
+                save_profile(profile, scope["method"], route, elapsed)
+
+
+def save_profile(profile: cProfile.Profile, method: str, route: str, elapsed: float):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r"[^0-9A-Za-z]+", "_", route).strip("_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{name}-{elapsed * 1000:.0f}ms.prof")
+    profile.dump_stats(path)
+    logger.warning("Profiled %s %s (%.0f ms): %s", method, route, elapsed * 1000, path)
+
+
+def profiled(call):
+    """Run an endpoint under the profiler of its request, if it was sampled."""
+    if asyncio.iscoroutinefunction(call):
+        @wraps(call)
+        async def run_async(*args, **kwargs):
+            stats = _request_stats.get()
+            if stats is None or stats.profile is None:
+                return await call(*args, **kwargs)
+            try:
+                stats.profile.enable()
+            except ValueError:
+                # Another sampled request is being profiled on the event loop
+                return await call(*args, **kwargs)
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                stats.profile.disable()
+        return run_async
+
+    @wraps(call)
+    def run(*args, **kwargs):
+        # Sync endpoints run in the threadpool, so the profiler has to be
+        # enabled there rather than in the middleware
+        stats = _request_stats.get()
+        if stats is None or stats.profile is None:
+            return call(*args, **kwargs)
+        try:
+            stats.profile.enable()
+        except ValueError:
+            # Another profiler is active: on Python 3.12+ cProfile is
+            # process-wide, so a concurrent sampled request may hold it
+            return call(*args, **kwargs)
+        try:
+            return call(*args, **kwargs)
+        finally:
+            stats.profile.disable()
+    return run
+
+
+def instrument(app):
+    """Add the metrics middleware to an app once its routes are declared."""
+    if not METRICS_ENABLED:
+        return
+    routes = {}
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            routes[route.endpoint] = route.path
+            if PROFILE_SAMPLE_RATE:
+                route.dependant.call = profiled(route.dependant.call)
+    app.add_middleware(MetricsMiddleware, routes=routes)
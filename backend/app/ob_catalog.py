@@ -0,0 +1,116 @@
+"""
+In-process view of the ob_catalog table.
+
+Observations only store the id of their catalog entry. Catalog rows are never
+updated or deleted, so each process keeps a copy per engine and resolves ids
+to (text, ob_code, competence) without joining, reloading only when it meets
+an id it has not seen yet.
+"""
+import threading
+import weakref
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .database import DBObCatalog
+from .taxonomy import TAXONOMY, Taxonomy
+
+
+class CatalogEntry(NamedTuple):
+    id: int
+    text: str
+    ob_code: Optional[str]
+    competence: Optional[str]
+
+
+CatalogKey = Tuple[str, Optional[str], Optional[str]]
+
+
+class ObCatalog:
+    def __init__(self, entries: Iterable[CatalogEntry]):
+        self.entries: Dict[int, CatalogEntry] = {entry.id: entry for entry in entries}
+        self.ids: Dict[CatalogKey, int] = {
+            (entry.text, entry.ob_code, entry.competence): entry.id for entry in self.entries.values()
+        }
+
+
+def _insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(DBObCatalog)
+
+
+_catalogs: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_taxonomy_ids: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _load(db: Session) -> ObCatalog:
+    catalog = ObCatalog(CatalogEntry(*row) for row in db.query(
+        DBObCatalog.id, DBObCatalog.text, DBObCatalog.ob_code, DBObCatalog.competence
+    ))
+    with _lock:
+        _catalogs[db.get_bind()] = catalog
+    return catalog
+
+
+def get_catalog(db: Session, ob_ids: Iterable[int] = (), reload: bool = False) -> ObCatalog:
+    """The catalog of the database behind db, reloaded if any of ob_ids is unknown."""
+    catalog = None if reload else _catalogs.get(db.get_bind())
+    if catalog is None or any(ob_id not in catalog.entries for ob_id in ob_ids):
+        catalog = _load(db)
+    return catalog
+
+
+def catalog_ids(db: Session, keys: Iterable[CatalogKey]) -> Dict[CatalogKey, int]:
+    """
+    Ids of the given (text, ob_code, competence) entries, creating missing ones.
+    New entries are committed on their own connection, so that ids cached by
+    this process never point at rows a later rollback discarded; call it before
+    writing anything in db.
+    """
+    keys = list(dict.fromkeys(keys))
+    catalog = get_catalog(db)
+    if any(key not in catalog.ids for key in keys):
+        catalog = _load(db)
+        missing = [key for key in keys if key not in catalog.ids]
+        if missing:
+            # Processes seeding at the same time may race on the same entries
+            with db.get_bind().begin() as connection:
+                connection.execute(_insert(db).on_conflict_do_nothing(), [
+                    {"text": text, "ob_code": ob_code, "competence": competence}
+                    for text, ob_code, competence in missing
+                ])
+            catalog = _load(db)
+    return {key: catalog.ids[key] for key in keys}
+
+
+def taxonomy_ob_ids(db: Session, taxonomy: Taxonomy = TAXONOMY) -> Tuple[int, ...]:
+    """
+    Catalog id of every OB of the taxonomy, indexed by OB id, registering
+    missing entries the first time. Follows the same rules as catalog_ids.
+    """
+    ids = _taxonomy_ids.get(db.get_bind())
+    if ids is None or ids[0] is not taxonomy:
+        keys = [(ob.text, ob.code, ob.competence) for ob in taxonomy.obs]
+        by_key = catalog_ids(db, keys)
+        ids = (taxonomy, tuple(by_key[key] for key in keys))
+        with _lock:
+            _taxonomy_ids[db.get_bind()] = ids
+    return ids[1]
+
+
+def seed_catalog(db: Session) -> None:
+    """Register the OBs of the taxonomy."""
+    taxonomy_ob_ids(db)
+
+
+def serialize_catalog(catalog: ObCatalog) -> List[dict]:
+    return [{
+        "id": entry.id,
+        "text": entry.text,
+        "ob_code": entry.ob_code,
+        "competence": entry.competence
+    } for entry in sorted(catalog.entries.values())]
@@ -0,0 +1,189 @@
+"""
+Optional semantic OB classifier.
+
+Notes and OB texts are embedded with a sentence transformer model and ranked
+by cosine similarity. torch and transformers are only imported when the model
+is first needed, the OB text embeddings are cached on disk per model, and
+notes arriving from concurrent requests are grouped into micro-batches so the
+CPU runs one forward pass per batch instead of one per note.
+
+The classifier is enabled by pointing OB_CLASSIFIER_MODEL at a local model
+directory or a model name in the Hugging Face cache. Without it, or when the
+model cannot be loaded, matching falls back to the lexical n-gram matcher.
+"""
+import hashlib
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ob_matcher import index_entries, match_ob, rank_candidates
+
+logger = logging.getLogger(__name__)
+
+OB_CLASSIFIER_MODEL = os.getenv("OB_CLASSIFIER_MODEL")
+OB_EMBEDDING_CACHE_DIR = os.getenv("OB_EMBEDDING_CACHE_DIR", "./.ob_embeddings")
+OB_BATCH_SIZE = int(os.getenv("OB_BATCH_SIZE", "32"))
+OB_BATCH_WAIT_MS = float(os.getenv("OB_BATCH_WAIT_MS", "5"))
+
+
+class TransformerEncoder:
+    """Mean-pooled, L2-normalized sentence embeddings computed on the CPU."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                import torch
+                from transformers import AutoModel, AutoTokenizer
+
+                self._torch = torch
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                model = AutoModel.from_pretrained(self.model_name)
+                model.eval()
+                self._model = model.to("cpu")
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        if self._model is None:
+            self._load()
+        torch = self._torch
+        inputs = self._tokenizer(list(texts), padding=True, truncation=True, max_length=128, return_tensors="pt")
+        with torch.inference_mode():
+            hidden = self._model(**inputs).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        embeddings = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        embeddings = torch.nn.functional.normalize(embeddings, dim=1)
+        return embeddings.numpy().astype(np.float32)
+
+
+class MicroBatcher:
+    """
+    Groups single-item calls from many threads into batched calls.
+    A batch is run once max_batch items are waiting or max_wait_ms after its
+    first item arrived, whichever comes first.
+    """
+
+    def __init__(self, run_batch: Callable[[List], List], max_batch: int = OB_BATCH_SIZE, max_wait_ms: float = OB_BATCH_WAIT_MS):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Tuple[object, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, item) -> Future:
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="ob-micro-batcher", daemon=True)
+                self._worker.start()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                pass
+            try:
+                results = self.run_batch([item for item, _ in batch])
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+
+
+class OBClassifier:
+    def __init__(self, encoder: TransformerEncoder, cache_dir: str = OB_EMBEDDING_CACHE_DIR):
+        self.encoder = encoder
+        self.cache_dir = cache_dir
+        entries = index_entries()
+        self.texts = [text for text, _, _ in entries]
+        self.ob_codes = [ob_code for _, ob_code, _ in entries]
+        self.competences = [competence for _, _, competence in entries]
+        self._embeddings: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _cache_path(self) -> str:
+        key = hashlib.sha1("\n".join([self.encoder.model_name] + self.texts).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"ob-embeddings-{key}.npy")
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """OB text embeddings, computed once per model and OB texts."""
+        with self._lock:
+            if self._embeddings is None:
+                path = self._cache_path()
+                if os.path.exists(path):
+                    self._embeddings = np.load(path)
+                else:
+                    self._embeddings = self.encoder.encode(self.texts)
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    np.save(path, self._embeddings)
+            return self._embeddings
+
+    def classify(self, notes: Sequence[str], limit: int = 5, min_score: float = 0.0) -> List[List[Tuple[str, str, float]]]:
+        """Ranked (ob_code, competence, score) candidates for each note, in one forward pass."""
+        scores = self.encoder.encode(notes) @ self.embeddings.T
+        return [rank_candidates(row, self.ob_codes, self.competences, limit, min_score) for row in scores]
+
+
+_classifier: Optional[OBClassifier] = None
+_batcher: Optional[MicroBatcher] = None
+_unavailable = OB_CLASSIFIER_MODEL is None
+_init_lock = threading.Lock()
+
+
+def _get_batcher() -> Optional[MicroBatcher]:
+    global _classifier, _batcher, _unavailable
+    with _init_lock:
+        if _batcher is None and not _unavailable:
+            try:
+                _classifier = OBClassifier(TransformerEncoder(OB_CLASSIFIER_MODEL))
+                _classifier.embeddings
+            except Exception:
+                logger.exception("OB classifier model %s unavailable, using the lexical matcher", OB_CLASSIFIER_MODEL)
+                _classifier = None
+                _unavailable = True
+            else:
+                # The batch is ranked with the largest limit; callers trim to their own
+                _batcher = MicroBatcher(lambda items: [
+                    [candidate for candidate in ranked if candidate[2] >= min_score][:limit]
+                    for ranked, (_, limit, min_score) in zip(
+                        _classifier.classify([note for note, _, _ in items], max(limit for _, limit, _ in items)),
+                        items
+                    )
+                ])
+        return _batcher
+
+
+def semantic_available() -> bool:
+    return _get_batcher() is not None
+
+
+def classify_ob(text: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[str, str, float]]:
+    """
+    Rank the OBs closest to a note with the semantic classifier, batched with
+    concurrent calls. Falls back to the lexical matcher without a model.
+    """
+    batcher = _get_batcher()
+    if batcher is None:
+        return match_ob(text, limit, min_score)
+    return batcher((text, limit, min_score))
@@ -0,0 +1,110 @@
+"""
+Free-text matching of instructor notes to OBs.
+
+The OB texts of the taxonomy are indexed once as character n-gram TF-IDF
+vectors. A note is vectorized the same way and scored against every indexed
+text with a single sparse dot product, so matching costs a fraction of a
+millisecond instead of one SequenceMatcher pass per definition.
+"""
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .taxonomy import TAXONOMY
+
+NGRAM_RANGE = (3, 5)
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def _ngrams(text: str) -> Counter:
+    """Character n-grams of the lowercased text, words padded with spaces."""
+    text = " " + _NON_WORD.sub(" ", text.lower()).strip() + " "
+    grams = Counter()
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        grams.update(text[i:i + n] for i in range(len(text) - n + 1))
+    return grams
+
+
+class OBMatcher:
+    def __init__(self, entries: Iterable[Tuple[str, str, str]]):
+        """Index (text, ob_code, competence) entries; an OB may have several texts."""
+        entries = list(entries)
+        self.ob_codes = [ob_code for _, ob_code, _ in entries]
+        self.competences = [competence for _, _, competence in entries]
+
+        documents = [_ngrams(text) for text, _, _ in entries]
+        self.vocabulary: Dict[str, int] = {}
+        for grams in documents:
+            for gram in grams:
+                self.vocabulary.setdefault(gram, len(self.vocabulary))
+        document_frequency = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for grams in documents:
+            document_frequency[[self.vocabulary[gram] for gram in grams]] += 1
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+
+        # Stored n-gram major: a note only gathers the rows of its own n-grams
+        weights = np.zeros((len(self.vocabulary), len(documents)), dtype=np.float32)
+        for column, grams in enumerate(documents):
+            rows = [self.vocabulary[gram] for gram in grams]
+            weights[rows, column] = (1 + np.log(np.fromiter(grams.values(), dtype=np.float32))) * self.idf[rows]
+        weights /= np.linalg.norm(weights, axis=0)
+        self.weights = weights
+
+    def match(self, text: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[str, str, float]]:
+        """
+        Rank the OBs closest to a free-text note.
+        Returns up to limit (ob_code, competence, score) tuples, best first,
+        with cosine scores between 0 and 1 and one entry per OB.
+        """
+        grams = {gram: count for gram, count in _ngrams(text).items() if gram in self.vocabulary}
+        if not grams or limit <= 0:
+            return []
+        rows = [self.vocabulary[gram] for gram in grams]
+        query = (1 + np.log(np.fromiter(grams.values(), dtype=np.float32))) * self.idf[rows]
+        scores = query @ self.weights[rows] / np.linalg.norm(query)
+
+        return rank_candidates(scores, self.ob_codes, self.competences, limit, min_score)
+
+
+def rank_candidates(
+    scores: np.ndarray,
+    ob_codes: List[str],
+    competences: List[str],
+    limit: int,
+    min_score: float = 0.0
+) -> List[Tuple[str, str, float]]:
+    """Best (ob_code, competence, score) per OB out of per-text scores, best first."""
+    # Take enough top texts to fill limit once texts of the same OB are merged
+    candidates = min(len(scores), limit * 4)
+    top = np.argpartition(-scores, candidates - 1)[:candidates]
+    results: List[Tuple[str, str, float]] = []
+    seen = set()
+    for index in top[np.argsort(-scores[top])]:
+        score = float(scores[index])
+        if score < min_score or len(results) == limit:
+            break
+        if ob_codes[index] not in seen:
+            seen.add(ob_codes[index])
+            results.append((ob_codes[index], competences[index], score))
+    return results
+
+
+def index_entries() -> List[Tuple[str, str, str]]:
+    return [(ob.text, ob.code, ob.competence) for ob in TAXONOMY.obs]
+
+
+_matcher: Optional[OBMatcher] = None
+
+
+def get_matcher() -> OBMatcher:
+    """The matcher over all OB definitions, built on first use."""
+    global _matcher
+    if _matcher is None:
+        _matcher = OBMatcher(index_entries())
+    return _matcher
+
+
+def match_ob(text: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[str, str, float]]:
+    return get_matcher().match(text, limit, min_score)
@@ -0,0 +1,154 @@
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
+
+from .database import DBCompetenceScore, DBExercise, DBExerciseSnapshot, DBObservation, DBSession, DBStudent
+from .ob_catalog import get_catalog
+from .ob_detector import grade_from_counts
+from .snapshots import archived_students, load_archived_session, parse, snapshot_observations
+
+# Builds the report of a session from the safety scores
+ReportBuilder = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class SessionReport(NamedTuple):
+    # The creation date and version identify the session's data: an id that
+    # was ever handed out twice still has two different creation dates
+    created: Optional[datetime]
+    version: int
+    students: List[Any]
+    build: ReportBuilder
+
+
+def load_session_report(db: Session, session_id: int) -> Optional[SessionReport]:
+    """The report inputs of a live or archived session, or None if there is no such session."""
+    session = db.query(DBSession).options(selectinload(DBSession.students)).filter(DBSession.id == session_id).first()
+    if session:
+        students = session.students
+        return SessionReport(session.date, session.version or 0, students, lambda safety_scores: build_session_report(
+            db, session_id, students, safety_scores
+        ))
+
+    archived = load_archived_session(db, session_id)
+    if archived is None:
+        return None
+    students = archived_students(archived)
+    unchecked = [
+        (student_id, ob_id)
+        for exercise in archived["exercises"]
+        for _, ob_id, _, is_checked, student_id in exercise[5] if not is_checked
+    ]
+    return SessionReport(parse(archived["date"]), archived["version"], students, lambda safety_scores: assemble_report(
+        db, students, archived["scores"], unchecked, safety_scores
+    ))
+
+
+def build_session_report(
+    db: Session,
+    session_id: int,
+    students: List[DBStudent],
+    safety_scores: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Build the evaluation report of a session.
+    Grades and observation listings come from competence_scores, one row per
+    student and competence. Only the unchecked observations, listed in the
+    report, are read: from the snapshots of completed exercises and from the
+    observations table for the others.
+    """
+    scores = db.query(
+        DBCompetenceScore.student_id,
+        DBCompetenceScore.competence,
+        DBCompetenceScore.checked,
+        DBCompetenceScore.total,
+        DBCompetenceScore.observations
+    ).filter(DBCompetenceScore.session_id == session_id).all()
+
+    exercises = (
+        db.query(DBExercise.id, DBExerciseSnapshot.observations)
+        .outerjoin(DBExerciseSnapshot, DBExerciseSnapshot.exercise_id == DBExercise.id)
+        .filter(DBExercise.session_id == session_id)
+        .order_by(DBExercise.id)
+        .all()
+    )
+    open_ids = [exercise_id for exercise_id, snapshot in exercises if snapshot is None]
+    open_rows: Dict[int, list] = {}
+    if open_ids:
+        for exercise_id, student_id, ob_id in (
+            db.query(DBObservation.exercise_id, DBObservation.student_id, DBObservation.ob_id)
+            .filter(
+                DBObservation.exercise_id.in_(open_ids),
+                or_(DBObservation.is_checked.is_(None), DBObservation.is_checked.is_(False))
+            )
+            .order_by(DBObservation.exercise_id, DBObservation.id)
+        ):
+            open_rows.setdefault(exercise_id, []).append((student_id, ob_id))
+
+    # (student_id, ob_id) of the unchecked observations in exercise/observation order
+    unchecked = []
+    for exercise_id, snapshot in exercises:
+        if snapshot is None:
+            unchecked += open_rows.get(exercise_id, ())
+        else:
+            unchecked += [
+                (student_id, ob_id)
+                for _, ob_id, _, is_checked, student_id in snapshot_observations(snapshot) if not is_checked
+            ]
+    return assemble_report(db, students, scores, unchecked, safety_scores)
+
+
+def assemble_report(
+    db: Session,
+    students: List[Any],
+    scores: Iterable[Tuple[int, str, int, int, str]],
+    unchecked: List[Tuple[int, int]],
+    safety_scores: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Report of the given students (objects with id and name) from their
+    competence_scores rows and their unchecked (student_id, ob_id) in order.
+    """
+    # student_id -> competence -> (checked, total, observations)
+    counts: Dict[int, Dict[str, tuple]] = {}
+    for student_id, competence, checked, total, observations in scores:
+        if total:
+            counts.setdefault(student_id, {})[competence] = (checked, total, observations)
+
+    # student_id -> unchecked observations
+    listed: Dict[int, List[dict]] = {}
+    catalog = get_catalog(db, (ob_id for _, ob_id in unchecked))
+    for student_id, ob_id in unchecked:
+        entry = catalog.entries[ob_id]
+        listed.setdefault(student_id, []).append({
+            "text": entry.text,
+            "ob_code": entry.ob_code,
+            "competence": entry.competence
+        })
+
+    full_report = {}
+    for student in students:
+        student_safety_score = safety_scores.get(student.name, 5) # Default to 5 if not provided
+        student_counts = counts.get(student.id, {})
+
+        student_report = {}
+        for comp in sorted(student_counts):
+            checked, total, observations = student_counts[comp]
+            how_many = grade_from_counts(checked, total)
+            how_often = grade_from_counts(checked, total)
+            student_report[comp] = {
+                "how_many": how_many,
+                "how_often": how_often,
+                "safety_score": student_safety_score,
+                "final_grade": min(how_many, how_often, student_safety_score),
+                "observations": [
+                    {"text": text, "ob_code": ob_code} for text, ob_code in json.loads(observations)
+                ]
+            }
+        full_report[student.name] = {
+            "report": student_report,
+            "unchecked_observations": listed.get(student.id, [])
+        }
+
+    return full_report
@@ -0,0 +1,99 @@
+"""
+Bounded LRU cache of session reports.
+
+A report only depends on the session data, which bumps the session version on
+every write, and on the safety scores of its students. Entries are keyed by
+(session_id, creation date, version, normalized safety scores), so writes
+never need to invalidate anything: stale versions simply stop being
+requested and fall off the end of the LRU. The creation date tells apart
+sessions that were given the same id. Archiving and restoring a session
+drop its entries. Reports are stored JSON encoded (with orjson) so hits
+skip serialization as well.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import orjson
+
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "256"))
+
+
+def normalize_safety_scores(student_names, safety_scores: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    """
+    Effective safety score of each student of the session, sorted by name.
+    Scores for students outside the session are ignored and missing ones get
+    the report default, so equivalent queries share a cache entry.
+    """
+    return tuple(sorted((name, safety_scores.get(name, 5)) for name in student_names))
+
+
+def report_etag(
+    session_id: int, created: Optional[datetime], version: int, safety_scores: Tuple[Tuple[str, Any], ...]
+) -> str:
+    digest = hashlib.sha1(json.dumps([created.isoformat() if created else None, safety_scores]).encode()).hexdigest()[:16]
+    return f'"{session_id}-{version}-{digest}"'
+
+
+class ReportCache:
+    def __init__(self, maxsize: int = REPORT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Dict[str, Any]]) -> bytes:
+        """Return the encoded report for key, building and storing it on a miss."""
+        with self._lock:
+            report = self._entries.get(key)
+            if report is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return report
+            self.misses += 1
+        # Build outside the lock: concurrent misses on the same key only cost
+        # a duplicate computation
+        report = orjson.dumps(build())
+        if self.maxsize > 0:
+            with self._lock:
+                self._entries[key] = report
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return report
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def discard_session(self, session_id: int):
+        """Drop every entry of a session, whose keys start with its id."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.not_modified = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+report_cache = ReportCache()
@@ -0,0 +1,210 @@
+"""
+Background generation of end-of-course reports.
+
+POST /reports/jobs queues the reports of many sessions at once and answers
+right away with a job id. The sessions are split into chunks of
+REPORT_JOB_CHUNK and built on a pool of REPORT_WORKERS processes, each with
+its own database engine, so a large batch neither holds a request open nor
+competes with the API for the GIL. GET /reports/jobs/{id} returns the
+progress, and once the job is done GET /reports/jobs/{id}/result returns one
+NDJSON line per session, in the requested order: {"session_id", "report"} or
+{"session_id", "error"}.
+
+The state and results of a job are files in REPORT_JOB_DIR, so every API
+worker can answer the polls; the process pool belongs to the worker that
+accepted the job, and each API worker starts its own pool. A running job
+whose state has not been updated for REPORT_JOB_STALE_MINUTES lost that
+worker and is reported as failed. Jobs are removed once they have not been
+updated for REPORT_JOB_TTL_HOURS.
+"""
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+REPORT_JOB_DIR = os.getenv("REPORT_JOB_DIR", "./report_jobs")
+# Per API process: uvicorn --workers N starts N pools, N * REPORT_WORKERS processes
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_JOB_CHUNK = int(os.getenv("REPORT_JOB_CHUNK", "20"))
+REPORT_JOB_TTL_HOURS = float(os.getenv("REPORT_JOB_TTL_HOURS", "24"))
+# Longer than a chunk takes to build: the state is saved after each chunk
+REPORT_JOB_STALE_MINUTES = float(os.getenv("REPORT_JOB_STALE_MINUTES", "30"))
+
+JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# (session_id, safety scores by student name)
+ReportRequest = Tuple[int, Dict[str, Any]]
+
+# Database sessions of the worker process, by database URL
+_worker_sessions: Dict[str, sessionmaker] = {}
+
+
+def build_reports(database_url: str, requests: List[ReportRequest]) -> Tuple[bytes, int]:
+    """Run in a worker process: the NDJSON lines of a chunk and how many of them failed."""
+    from .database import create_db_engine
+    from .report import load_session_report
+
+    Session = _worker_sessions.get(database_url)
+    if Session is None:
+        Session = _worker_sessions[database_url] = sessionmaker(
+            autocommit=False, autoflush=False, bind=create_db_engine(database_url)
+        )
+    lines, failed = [], 0
+    with Session() as db:
+        for session_id, safety_scores in requests:
+            try:
+                found = load_session_report(db, session_id)
+                if found is None:
+                    line = {"session_id": session_id, "error": "Session not found"}
+                else:
+                    line = {"session_id": session_id, "report": found.build(safety_scores)}
+            except Exception:
+                logger.exception("Report of session %s failed", session_id)
+                db.rollback()
+                line = {"session_id": session_id, "error": "Report generation failed"}
+            failed += "error" in line
+            lines.append(orjson.dumps(line) + b"\n")
+    return b"".join(lines), failed
+
+
+def write_atomic(path: str, data: bytes):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as output:
+        output.write(data)
+    os.replace(temporary, path)
+
+
+class Job:
+    __slots__ = ("directory", "state", "pending", "lock")
+
+    def __init__(self, directory: str, state: Dict[str, Any], chunks: int):
+        self.directory = directory
+        self.state = state
+        self.pending = chunks
+        self.lock = threading.Lock()
+
+    def save(self):
+        write_atomic(os.path.join(self.directory, "job.json"), orjson.dumps(self.state))
+
+
+class ReportJobQueue:
+    def __init__(self, directory: str = REPORT_JOB_DIR, workers: int = REPORT_WORKERS, chunk_size: int = REPORT_JOB_CHUNK):
+        self.directory = directory
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned workers do not inherit the API's open connections
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def submit(self, database_url: str, requests: List[ReportRequest]) -> Dict[str, Any]:
+        self.purge()
+        job_id = uuid.uuid4().hex
+        directory = os.path.join(self.directory, job_id)
+        os.makedirs(directory)
+        chunks = [requests[start:start + self.chunk_size] for start in range(0, len(requests), self.chunk_size)]
+        job = Job(directory, {
+            "id": job_id,
+            "status": "running",
+            "sessions": len(requests),
+            "completed": 0,
+            "failed": 0,
+            "created_at": datetime.utcnow().isoformat(),
+            "finished_at": None
+        }, len(chunks))
+        job.save()
+        pool = self.pool()
+        for index, chunk in enumerate(chunks):
+            future = pool.submit(build_reports, database_url, chunk)
+            future.add_done_callback(lambda future, index=index, chunk=chunk: self._chunk_done(job, index, chunk, future))
+        return dict(job.state)
+
+    def _chunk_done(self, job: Job, index: int, chunk: List[ReportRequest], future: Future):
+        try:
+            data, failed = future.result()
+        except BaseException:
+            # The worker died or the pool was shut down
+            logger.exception("Report job %s lost a chunk", job.state["id"])
+            data = b"".join(
+                orjson.dumps({"session_id": session_id, "error": "Report worker failed"}) + b"\n"
+                for session_id, _ in chunk
+            )
+            failed = len(chunk)
+        write_atomic(os.path.join(job.directory, f"{index:06}.ndjson"), data)
+        with job.lock:
+            job.state["completed"] += len(chunk)
+            job.state["failed"] += failed
+            job.pending -= 1
+            if job.pending == 0:
+                self._finish(job)
+            job.save()
+
+    def _finish(self, job: Job):
+        parts = sorted(name for name in os.listdir(job.directory) if name.endswith(".ndjson"))
+        temporary = os.path.join(job.directory, "result.tmp")
+        with open(temporary, "wb") as result:
+            for name in parts:
+                with open(os.path.join(job.directory, name), "rb") as part:
+                    shutil.copyfileobj(part, result)
+        os.replace(temporary, os.path.join(job.directory, "result.ndjson"))
+        for name in parts:
+            os.remove(os.path.join(job.directory, name))
+        job.state["status"] = "failed" if job.state["failed"] == job.state["sessions"] else "done"
+        job.state["finished_at"] = datetime.utcnow().isoformat()
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not JOB_ID.match(job_id):
+            return None
+        path = os.path.join(self.directory, job_id, "job.json")
+        try:
+            with open(path, "rb") as state:
+                job = orjson.loads(state.read())
+                updated = os.fstat(state.fileno()).st_mtime
+        except FileNotFoundError:
+            return None
+        if job["status"] == "running" and updated < time.time() - REPORT_JOB_STALE_MINUTES * 60:
+            # The API process that owned the pool died with the job unfinished
+            logger.warning("Report job %s stalled, marking it failed", job_id)
+            job["status"] = "failed"
+            job["finished_at"] = datetime.utcnow().isoformat()
+            write_atomic(path, orjson.dumps(job))
+        return job
+
+    def result_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id, "result.ndjson")
+
+    def purge(self):
+        """Remove the jobs not updated for REPORT_JOB_TTL_HOURS."""
+        if not os.path.isdir(self.directory):
+            return
+        cutoff = time.time() - REPORT_JOB_TTL_HOURS * 3600
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if JOB_ID.match(name) and os.path.getctime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+report_jobs = ReportJobQueue()
@@ -0,0 +1,195 @@
+"""
+Full-text search over observations.
+
+Everything searchable about an observation lives in two small tables: its
+text, OB code and competence in ob_catalog, and its student in students.
+Those are full-text indexed, FTS5 on SQLite and a weighted tsvector on
+PostgreSQL, kept in sync by triggers (migration 0009), so a search first
+ranks the matching catalog entries and students, then reads the
+observations of the matching entries in rank order, newest first, through
+the observation indexes, stopping as soon as the page is full. Entries are
+read by windows, one UNION ALL statement per window with one index range per
+entry, and each window is twice as large as the previous one: a dense first
+entry costs one statement and a thousand sparse entries eleven.
+The cost of a page depends on the page size and the number of matching
+entries, not on the number of observations.
+
+Archived sessions are not searched.
+"""
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Integer, select, text
+from sqlalchemy.orm import Session
+
+from .database import DBExercise, DBObservation, DBSession, DBStudent
+from .ob_catalog import get_catalog
+
+# Matching catalog entries or students considered, best first
+MAX_MATCHES = 1000
+
+# Entries read by the first statement of a page, doubling up to the maximum
+FIRST_WINDOW = 1
+MAX_WINDOW = 256
+
+# FTS5 column weights of (text, ob_code, competence): an OB code match ranks first
+CATALOG_WEIGHTS = (1.0, 4.0, 2.0)
+
+
+class SearchHit(NamedTuple):
+    id: int
+    ob_id: int
+    timestamp: object
+    is_checked: Optional[bool]
+    student_id: int
+    student_name: str
+    exercise_id: int
+    exercise_name: Optional[str]
+    session_id: int
+    session_date: object
+
+
+def fts5_query(query: str) -> Optional[str]:
+    """
+    FTS5 expression requiring every word of query, the last one as a prefix.
+    Words are quoted, so FTS5 operators in the input are searched as text.
+    """
+    phrases = [" ".join(re.findall(r"\w+", word)) for word in query.split()]
+    phrases = [phrase for phrase in phrases if phrase]
+    if not phrases:
+        return None
+    return " ".join(f'"{phrase}"' for phrase in phrases) + "*"
+
+
+def tsquery(query: str) -> Optional[str]:
+    """to_tsquery expression requiring every word of query as a prefix."""
+    words = [word.strip(".") for word in re.findall(r"[\w.]+", query)]
+    words = [word for word in words if word]
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def match_ids(db: Session, table: str, query: str) -> List[int]:
+    """Ids of the ob_catalog or students rows matching query, best first."""
+    if db.get_bind().dialect.name == "postgresql":
+        expression = tsquery(query)
+        statement = text(
+            f"SELECT id FROM {table} WHERE search @@ to_tsquery('simple', :query) "
+            f"ORDER BY ts_rank(search, to_tsquery('simple', :query)) DESC, id LIMIT :limit"
+        )
+    else:
+        expression = fts5_query(query)
+        weights = ", ".join(map(str, CATALOG_WEIGHTS)) if table == "ob_catalog" else "1.0"
+        statement = text(
+            f"SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH :query "
+            f"ORDER BY bm25({table}_fts, {weights}), rowid LIMIT :limit"
+        )
+    if expression is None:
+        return []
+    return [row_id for row_id, in db.execute(statement, {"query": expression, "limit": MAX_MATCHES})]
+
+
+def search_observations(
+    db: Session,
+    query: Optional[str],
+    student: Optional[str],
+    checked: Optional[bool],
+    limit: int,
+    after: Optional[Tuple[int, int]] = None
+) -> List[SearchHit]:
+    """
+    Up to limit observations matching query and student, ordered by the rank
+    of their catalog entry (of their student without query), then newest
+    first. after is the (group, observation id) of the last hit of the
+    previous page, group being the catalog id or the student id.
+    """
+    student_ids = match_ids(db, "students", student) if student else None
+    if query:
+        groups = match_ids(db, "ob_catalog", query)
+    else:
+        groups, student_ids = student_ids, None
+    if after is not None:
+        if after[0] not in groups:
+            return []
+        groups = groups[groups.index(after[0]):]
+
+    # The window statements repeat one range per entry, so they are written as
+    # text: building hundreds of Core subqueries costs more than running them
+    conditions = ""
+    if student_ids is not None:
+        if not student_ids:
+            return []
+        conditions += f" AND student_id IN ({', '.join(str(int(student_id)) for student_id in student_ids)})"
+    if checked:
+        conditions += " AND is_checked = :checked"
+    elif checked is not None:
+        conditions += " AND (is_checked IS NULL OR is_checked = :checked)"
+    column = "ob_id" if query else "student_id"
+
+    hits: List[SearchHit] = []
+    start, window = 0, FIRST_WINDOW
+    while start < len(groups) and len(hits) < limit:
+        # Newest observations of each entry of the window, one index range each
+        params = {"remaining": limit - len(hits)}
+        if checked is not None:
+            params["checked"] = checked
+        ranges = []
+        for position, group in enumerate(groups[start:start + window], start):
+            params[f"group_{position}"] = group
+            cursor = ""
+            if after is not None and group == after[0]:
+                cursor, params["after"] = " AND id < :after", after[1]
+            ranges.append(
+                f"SELECT * FROM (SELECT id, {position} AS position FROM observations "
+                f"WHERE {column} = :group_{position}{conditions}{cursor} "
+                f"ORDER BY id DESC LIMIT :remaining) AS range_{position}"
+            )
+        page = text(
+            f"SELECT id, position FROM ({' UNION ALL '.join(ranges)}) AS ranges "
+            f"ORDER BY position, id DESC LIMIT :remaining"
+        ).bindparams(**params).columns(id=Integer, position=Integer).subquery("page")
+        statement = (
+            select(
+                DBObservation.id,
+                DBObservation.ob_id,
+                DBObservation.timestamp,
+                DBObservation.is_checked,
+                DBObservation.student_id,
+                DBStudent.name,
+                DBExercise.id,
+                DBExercise.name,
+                DBSession.id,
+                DBSession.date
+            )
+            .select_from(page)
+            .join(DBObservation, DBObservation.id == page.c.id)
+            .join(DBStudent, DBStudent.id == DBObservation.student_id)
+            .join(DBExercise, DBExercise.id == DBObservation.exercise_id)
+            .join(DBSession, DBSession.id == DBExercise.session_id)
+            .order_by(page.c.position, page.c.id.desc())
+        )
+        hits += [SearchHit(*row) for row in db.execute(statement)]
+        start, window = start + window, min(window * 2, MAX_WINDOW)
+    return hits
+
+
+def serialize_hits(db: Session, hits: List[SearchHit]) -> List[dict]:
+    catalog = get_catalog(db, (hit.ob_id for hit in hits))
+    results = []
+    for hit in hits:
+        entry = catalog.entries[hit.ob_id]
+        results.append({
+            "id": hit.id,
+            "text": entry.text,
+            "ob_code": entry.ob_code,
+            "competence": entry.competence,
+            "timestamp": hit.timestamp,
+            "is_checked": hit.is_checked,
+            "student_name": hit.student_name,
+            "exercise_id": hit.exercise_id,
+            "exercise_name": hit.exercise_name,
+            "session_id": hit.session_id,
+            "session_date": hit.session_date
+        })
+    return results
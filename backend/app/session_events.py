@@ -0,0 +1,165 @@
+"""
+Per-session change notifications for WebSocket subscribers.
+
+Write endpoints publish a small delta once their transaction has committed:
+observation states, a created exercise or a completed exercise, each with
+the session version it produced. The hub encodes the delta once and fans it
+out to the queue of every subscriber of the session on the event loop.
+
+Deltas go through a backend. The default one delivers within the process.
+With several worker processes, SESSION_EVENTS_URL=redis://... routes them
+through Redis pub/sub so that each worker delivers them to its own
+subscribers (requires the redis package).
+
+A subscriber that falls SESSION_EVENTS_QUEUE_SIZE deltas behind has its
+backlog replaced by a single resync message telling it to reload the session.
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+SESSION_EVENTS_URL = os.getenv("SESSION_EVENTS_URL")
+SESSION_EVENTS_QUEUE_SIZE = int(os.getenv("SESSION_EVENTS_QUEUE_SIZE", "256"))
+
+Deliver = Callable[[int, str], None]
+
+# Replaces the backlog of a subscriber too slow to keep up
+RESYNC = orjson.dumps({"type": "resync"}).decode()
+
+
+class LocalBackend:
+    """Delivers deltas to the subscribers of this process only."""
+
+    local = True
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._loop = asyncio.get_running_loop()
+        self._deliver = deliver
+
+    def publish(self, session_id: int, message: str):
+        # Called from the threadpool; delivery happens on the event loop
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._deliver, session_id, message)
+
+    async def close(self):
+        self._loop = None
+
+
+class RedisBackend:
+    """
+    Delivers deltas to the subscribers of every process connected to the same
+    Redis. All sessions share one channel; each worker drops the deltas of
+    sessions nobody follows on it.
+    """
+
+    local = False
+    channel = "session-events"
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    async def start(self, deliver: Deliver):
+        import redis.asyncio
+
+        self._pubsub = redis.asyncio.from_url(self.url).pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.get_running_loop().create_task(self._listen(deliver))
+
+    async def _listen(self, deliver: Deliver):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    session_id, _, payload = message["data"].decode().partition(":")
+                    deliver(int(session_id), payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Session events listener failed, resubscribing")
+                await asyncio.sleep(1)
+
+    def publish(self, session_id: int, message: str):
+        with self._lock:
+            if self._client is None:
+                import redis
+
+                self._client = redis.Redis.from_url(self.url)
+        try:
+            self._client.publish(self.channel, f"{session_id}:{message}")
+        except Exception:
+            # Subscribers catch up from the version of the next delta
+            logger.exception("Could not publish session %s event", session_id)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+
+
+class SessionHub:
+    def __init__(self, backend=None, queue_size: int = SESSION_EVENTS_QUEUE_SIZE):
+        self.backend = backend or LocalBackend()
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._started: Optional[asyncio.Lock] = None
+        self._running = False
+
+    async def subscribe(self, session_id: int) -> asyncio.Queue:
+        """Queue receiving the encoded deltas of a session; call from the event loop."""
+        if not self._running:
+            if self._started is None:
+                self._started = asyncio.Lock()
+            async with self._started:
+                if not self._running:
+                    await self.backend.start(self._deliver)
+                    self._running = True
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(session_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, session_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(session_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[session_id]
+
+    def subscriber_count(self, session_id: int) -> int:
+        return len(self._subscribers.get(session_id, ()))
+
+    def publish(self, session_id: int, event: Dict[str, Any]):
+        """Send a delta to the subscribers of a session; safe to call from any thread."""
+        if self.backend.local and not self._subscribers.get(session_id):
+            return
+        self.backend.publish(session_id, orjson.dumps({"session_id": session_id, **event}).decode())
+
+    def _deliver(self, session_id: int, message: str):
+        for queue in self._subscribers.get(session_id, ()):
+            if queue.full():
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+            else:
+                queue.put_nowait(message)
+
+    async def close(self):
+        if self._running:
+            await self.backend.close()
+            self._running = False
+
+
+session_hub = SessionHub(RedisBackend(SESSION_EVENTS_URL) if SESSION_EVENTS_URL else None)
@@ -0,0 +1,338 @@
+"""
+Frozen exercises and archived sessions.
+
+Completing an exercise freezes it: its observations can no longer be
+toggled, so complete_exercise stores them once in exercise_snapshots, as
+compact JSON rows. Session reads and reports decode one snapshot per
+completed exercise instead of reading its observation rows again; the
+checked/total counts come from competence_scores.
+
+Sessions older than a retention window can be moved out of the hot tables
+into archived_sessions, one zlib-compressed JSON document per session. They
+disappear from GET /sessions/ and the search, but stay readable through
+GET /sessions/{id}, the report endpoint and GET /archive/sessions, are still
+counted by the exports and the cohort analytics unless include_archived is
+false, and can be restored.
+
+    cd backend && python -m app.snapshots freeze
+    cd backend && python -m app.snapshots check
+    cd backend && python -m app.snapshots archive --older-than-days 365
+    cd backend && python -m app.snapshots restore 42
+"""
+import argparse
+import os
+import sys
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import orjson
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from .database import (
+    DBArchivedSession, DBCompetenceScore, DBExercise, DBExerciseSnapshot, DBObservation, DBSession, DBStudent,
+    SessionLocal, get_or_create_students, session_students
+)
+from .report_cache import report_cache
+
+SESSION_RETENTION_DAYS = int(os.getenv("SESSION_RETENTION_DAYS", "365"))
+ARCHIVE_COMPRESSION_LEVEL = 6
+
+# (id, ob_id, timestamp, is_checked, student_id), the layout of get_session's rows
+ObservationRow = Tuple[int, int, Any, Optional[bool], int]
+
+
+class RestoreConflict(Exception):
+    """The ids of an archived session have been given to other rows."""
+
+
+class Student(NamedTuple):
+    id: int
+    name: str
+
+
+def build_snapshots(db: Session, exercise_ids: List[int]) -> List[Dict[str, Any]]:
+    """exercise_snapshots rows of the given exercises, from their current observations."""
+    rows = (
+        db.query(
+            DBObservation.exercise_id,
+            DBObservation.id,
+            DBObservation.ob_id,
+            DBObservation.timestamp,
+            DBObservation.is_checked,
+            DBObservation.student_id
+        )
+        .filter(DBObservation.exercise_id.in_(exercise_ids))
+        .order_by(DBObservation.exercise_id, DBObservation.id)
+        .all()
+    )
+    observations: Dict[int, list] = {exercise_id: [] for exercise_id in exercise_ids}
+    for exercise_id, *row in rows:
+        observations[exercise_id].append(row)
+    return [{
+        "exercise_id": exercise_id,
+        "observations": orjson.dumps(observations[exercise_id]).decode()
+    } for exercise_id in exercise_ids]
+
+
+def freeze_exercises(db: Session, exercise_ids: Iterable[int]) -> int:
+    """Snapshot completed exercises in the current transaction; the caller commits."""
+    exercise_ids = list(exercise_ids)
+    for start in range(0, len(exercise_ids), 500):
+        db.execute(insert(DBExerciseSnapshot), build_snapshots(db, exercise_ids[start:start + 500]))
+    return len(exercise_ids)
+
+
+def unfrozen_exercise_ids(db: Session) -> List[int]:
+    """Completed exercises without a snapshot."""
+    return [exercise_id for exercise_id, in (
+        db.query(DBExercise.id)
+        .outerjoin(DBExerciseSnapshot, DBExerciseSnapshot.exercise_id == DBExercise.id)
+        .filter(DBExercise.is_completed.is_(True), DBExerciseSnapshot.exercise_id.is_(None))
+        .order_by(DBExercise.id)
+    )]
+
+
+def snapshot_observations(snapshot: str) -> List[ObservationRow]:
+    return orjson.loads(snapshot)
+
+
+def check_snapshots(db: Session) -> List[int]:
+    """Exercises whose snapshot differs from their observation rows."""
+    stored = dict(db.query(DBExerciseSnapshot.exercise_id, DBExerciseSnapshot.observations))
+    differing = []
+    exercise_ids = sorted(stored)
+    for start in range(0, len(exercise_ids), 500):
+        batch = exercise_ids[start:start + 500]
+        for snapshot in build_snapshots(db, batch):
+            if orjson.loads(snapshot["observations"]) != orjson.loads(stored[snapshot["exercise_id"]]):
+                differing.append(snapshot["exercise_id"])
+    return differing
+
+
+def archive_session(db: Session, session_id: int) -> bool:
+    """
+    Move a session and its exercises, observations, snapshots and scores into
+    archived_sessions in the current transaction; the caller commits.
+    """
+    session = db.query(DBSession).filter(DBSession.id == session_id).first()
+    if session is None:
+        return False
+    roster = [
+        student_id for student_id, in
+        db.query(session_students.c.student_id)
+        .filter(session_students.c.session_id == session_id)
+        .order_by(session_students.c.position)
+    ]
+    exercises = (
+        db.query(DBExercise.id, DBExercise.name, DBExercise.date, DBExercise.is_completed, DBExercise.competences)
+        .filter(DBExercise.session_id == session_id)
+        .order_by(DBExercise.id)
+        .all()
+    )
+    exercise_ids = [exercise.id for exercise in exercises]
+    observations: Dict[int, list] = {}
+    for exercise_id, *row in (
+        db.query(
+            DBObservation.exercise_id,
+            DBObservation.id,
+            DBObservation.ob_id,
+            DBObservation.timestamp,
+            DBObservation.is_checked,
+            DBObservation.student_id
+        )
+        .filter(DBObservation.exercise_id.in_(exercise_ids))
+        .order_by(DBObservation.exercise_id, DBObservation.id)
+    ):
+        observations.setdefault(exercise_id, []).append(row)
+    scores = db.query(
+        DBCompetenceScore.student_id,
+        DBCompetenceScore.competence,
+        DBCompetenceScore.checked,
+        DBCompetenceScore.total,
+        DBCompetenceScore.observations
+    ).filter(DBCompetenceScore.session_id == session_id).all()
+
+    student_ids = set(roster)
+    student_ids.update(row[4] for rows in observations.values() for row in rows)
+    student_ids.update(score.student_id for score in scores)
+    names = dict(db.query(DBStudent.id, DBStudent.name).filter(DBStudent.id.in_(student_ids)))
+
+    payload = {
+        "id": session.id,
+        "date": session.date,
+        "competences": session.competences,
+        "version": session.version or 0,
+        "students": roster,
+        "student_names": sorted(names.items()),
+        "exercises": [
+            [exercise.id, exercise.name, exercise.date, exercise.is_completed, exercise.competences,
+             observations.get(exercise.id, [])]
+            for exercise in exercises
+        ],
+        "scores": [list(score) for score in scores]
+    }
+    db.add(DBArchivedSession(
+        session_id=session.id,
+        date=session.date,
+        competences=session.competences,
+        archived_at=datetime.utcnow(),
+        students=orjson.dumps([names[student_id] for student_id in roster]).decode(),
+        payload=zlib.compress(orjson.dumps(payload), ARCHIVE_COMPRESSION_LEVEL)
+    ))
+
+    if exercise_ids:
+        db.execute(delete(DBObservation).where(DBObservation.exercise_id.in_(exercise_ids)))
+        db.execute(delete(DBExerciseSnapshot).where(DBExerciseSnapshot.exercise_id.in_(exercise_ids)))
+        db.execute(delete(DBExercise).where(DBExercise.id.in_(exercise_ids)))
+    db.execute(delete(DBCompetenceScore).where(DBCompetenceScore.session_id == session_id))
+    db.execute(delete(session_students).where(session_students.c.session_id == session_id))
+    db.execute(delete(DBSession).where(DBSession.id == session_id))
+    report_cache.discard_session(session_id)
+    return True
+
+
+def archive_sessions(db: Session, before: datetime, batch_size: int = 100) -> int:
+    """Archive every session dated before `before`, committing every batch_size sessions."""
+    session_ids = [session_id for session_id, in db.query(DBSession.id).filter(DBSession.date < before)]
+    for start in range(0, len(session_ids), batch_size):
+        for session_id in session_ids[start:start + batch_size]:
+            archive_session(db, session_id)
+        db.commit()
+    return len(session_ids)
+
+
+def load_archived_session(db: Session, session_id: int) -> Optional[Dict[str, Any]]:
+    payload = db.query(DBArchivedSession.payload).filter(DBArchivedSession.session_id == session_id).scalar()
+    return orjson.loads(zlib.decompress(payload)) if payload is not None else None
+
+
+def iter_archived_sessions(db: Session, session_ids: List[int], batch_size: int = 50) -> Iterator[Dict[str, Any]]:
+    """Decoded archived sessions, in the order of session_ids, reading batch_size payloads at a time."""
+    for start in range(0, len(session_ids), batch_size):
+        batch = session_ids[start:start + batch_size]
+        payloads = dict(
+            db.query(DBArchivedSession.session_id, DBArchivedSession.payload)
+            .filter(DBArchivedSession.session_id.in_(batch))
+        )
+        for session_id in batch:
+            if session_id in payloads:
+                yield orjson.loads(zlib.decompress(payloads[session_id]))
+
+
+def archived_students(archived: Dict[str, Any]) -> List[Student]:
+    names = dict(archived["student_names"])
+    return [Student(student_id, names[student_id]) for student_id in archived["students"]]
+
+
+def parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _taken(db: Session, column, ids: List[int]) -> bool:
+    return any(
+        db.query(column).filter(column.in_(ids[start:start + 500])).first() is not None
+        for start in range(0, len(ids), 500)
+    )
+
+
+def restore_session(db: Session, session_id: int) -> bool:
+    """
+    Move an archived session back into the hot tables; the caller commits.
+    Raises RestoreConflict, before writing anything, if one of its ids is in use.
+    """
+    archived = load_archived_session(db, session_id)
+    if archived is None:
+        return False
+    exercise_ids = [exercise[0] for exercise in archived["exercises"]]
+    observation_ids = [row[0] for exercise in archived["exercises"] for row in exercise[5]]
+    for label, column, ids in (
+        ("session", DBSession.id, [session_id]),
+        ("exercise", DBExercise.id, exercise_ids),
+        ("observation", DBObservation.id, observation_ids)
+    ):
+        if _taken(db, column, ids):
+            raise RestoreConflict(f"session {session_id}: {label} ids of the archive are used by other rows")
+    # Students are never deleted, but look them up by name in case of a copied database
+    names = dict(archived["student_names"])
+    students = get_or_create_students(db, list(names.values()))
+    ids = {student_id: students[name].id for student_id, name in names.items()}
+
+    db.execute(insert(DBSession), [{
+        "id": archived["id"],
+        "date": parse(archived["date"]),
+        "competences": archived["competences"],
+        "version": archived["version"]
+    }])
+    if archived["students"]:
+        db.execute(insert(session_students), [
+            {"session_id": archived["id"], "student_id": ids[student_id], "position": position}
+            for position, student_id in enumerate(archived["students"])
+        ])
+    exercises = archived["exercises"]
+    if exercises:
+        db.execute(insert(DBExercise), [{
+            "id": exercise_id, "session_id": archived["id"], "name": name, "date": parse(date),
+            "is_completed": is_completed, "competences": competences
+        } for exercise_id, name, date, is_completed, competences, _ in exercises])
+        rows = [{
+            "id": obs_id, "exercise_id": exercise[0], "ob_id": ob_id, "timestamp": parse(timestamp),
+            "is_checked": is_checked, "student_id": ids[student_id]
+        } for exercise in exercises for obs_id, ob_id, timestamp, is_checked, student_id in exercise[5]]
+        if rows:
+            db.execute(insert(DBObservation), rows)
+        completed = [exercise[0] for exercise in exercises if exercise[3]]
+        freeze_exercises(db, completed)
+    if archived["scores"]:
+        db.execute(insert(DBCompetenceScore), [{
+            "session_id": archived["id"], "student_id": ids[student_id], "competence": competence,
+            "checked": checked, "total": total, "observations": observations
+        } for student_id, competence, checked, total, observations in archived["scores"]])
+    db.execute(delete(DBArchivedSession).where(DBArchivedSession.session_id == session_id))
+    report_cache.discard_session(session_id)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise snapshots and session archive.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("freeze", help="snapshot completed exercises that have no snapshot")
+    commands.add_parser("check", help="compare the snapshots with the observation rows")
+    archive = commands.add_parser("archive", help="archive sessions older than the retention window")
+    archive.add_argument("--older-than-days", type=int, default=SESSION_RETENTION_DAYS)
+    restore = commands.add_parser("restore", help="move archived sessions back")
+    restore.add_argument("session_ids", type=int, nargs="+")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.command == "freeze":
+            count = freeze_exercises(db, unfrozen_exercise_ids(db))
+            db.commit()
+            print(f"froze {count} completed exercises")
+        elif args.command == "check":
+            differing = check_snapshots(db)
+            if differing:
+                print(f"snapshots differing from the observations: exercises {differing}")
+                sys.exit(1)
+            print("snapshots match the observations")
+        elif args.command == "archive":
+            before = datetime.utcnow() - timedelta(days=args.older_than_days)
+            count = archive_sessions(db, before)
+            print(f"archived {count} sessions dated before {before:%Y-%m-%d}")
+        else:
+            try:
+                missing = [session_id for session_id in args.session_ids if not restore_session(db, session_id)]
+            except RestoreConflict as conflict:
+                db.rollback()
+                print(f"not restored: {conflict}")
+                sys.exit(1)
+            db.commit()
+            if missing:
+                print(f"not archived: {missing}")
+                sys.exit(1)
+            print(f"restored {len(args.session_ids)} sessions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+OB taxonomy registry.
+
+The competences and their observable behaviours are loaded once at import
+from a versioned JSON file (app/data/ob_taxonomy.json by default, or the
+file named by OB_TAXONOMY_FILE) and validated before the API serves any
+request. The registry is immutable: OBs are numbered 0..n-1 in file order,
+each competence holds a tuple of its OBs and (competence, text) pairs map
+back to OBs, so every lookup is a single index or hash probe returning
+preexisting objects.
+"""
+import json
+import os
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+TAXONOMY_FILE = os.getenv(
+    "OB_TAXONOMY_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ob_taxonomy.json")
+)
+SUPPORTED_VERSIONS = (1,)
+
+
+class TaxonomyError(ValueError):
+    pass
+
+
+class OB(NamedTuple):
+    id: int
+    code: str
+    competence: str
+    text: str
+
+
+class Taxonomy:
+    __slots__ = ("version", "obs", "by_competence", "by_code", "_by_text", "_by_competence_text")
+
+    def __init__(self, version: int, competences: Mapping[str, List[Tuple[str, str]]]):
+        obs = []
+        by_competence = {}
+        for competence, entries in competences.items():
+            start = len(obs)
+            obs += [OB(start + offset, code, competence, text) for offset, (code, text) in enumerate(entries)]
+            by_competence[competence] = tuple(obs[start:])
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "obs", tuple(obs))
+        object.__setattr__(self, "by_competence", MappingProxyType(by_competence))
+        object.__setattr__(self, "by_code", MappingProxyType({(ob.competence, ob.code): ob for ob in obs}))
+        # A text shared by several competences resolves to its first OB
+        by_text: Dict[str, OB] = {}
+        for ob in obs:
+            by_text.setdefault(ob.text, ob)
+        object.__setattr__(self, "_by_text", MappingProxyType(by_text))
+        object.__setattr__(self, "_by_competence_text", MappingProxyType({(ob.competence, ob.text): ob for ob in obs}))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("the OB taxonomy is immutable")
+
+    @property
+    def competences(self) -> Tuple[str, ...]:
+        return tuple(self.by_competence)
+
+    def lookup(self, text: str, competence: Optional[str] = None) -> Optional[OB]:
+        """The OB with this text, within competence when given."""
+        if competence is None:
+            return self._by_text.get(text)
+        return self._by_competence_text.get((competence, text))
+
+
+def parse_taxonomy(data: Any) -> Taxonomy:
+    """Validate the content of a taxonomy file and build the registry."""
+    if not isinstance(data, dict):
+        raise TaxonomyError("taxonomy must be a JSON object")
+    version = data.get("version")
+    if version not in SUPPORTED_VERSIONS:
+        raise TaxonomyError(f"unsupported taxonomy version {version!r}, expected one of {SUPPORTED_VERSIONS}")
+    competences = data.get("competences")
+    if not isinstance(competences, list) or not competences:
+        raise TaxonomyError("taxonomy must list at least one competence")
+
+    errors = []
+    parsed: Dict[str, List[Tuple[str, str]]] = {}
+    for competence in competences:
+        code = competence.get("code") if isinstance(competence, dict) else None
+        if not isinstance(code, str) or not code:
+            errors.append(f"competence without a code: {competence!r}")
+            continue
+        if code in parsed:
+            errors.append(f"duplicate competence {code}")
+            continue
+        observations = competence.get("observations")
+        if not isinstance(observations, list) or not observations:
+            errors.append(f"{code}: no observations")
+            continue
+        entries = []
+        for observation in observations:
+            ob_code = observation.get("code") if isinstance(observation, dict) else None
+            text = observation.get("text") if isinstance(observation, dict) else None
+            if not isinstance(ob_code, str) or not ob_code or not isinstance(text, str) or not text.strip():
+                errors.append(f"{code}: observation needs a code and a text: {observation!r}")
+            elif any(ob_code == other for other, _ in entries):
+                errors.append(f"{code}: duplicate OB code {ob_code}")
+            elif any(text == other for _, other in entries):
+                errors.append(f"{code}: duplicate text for {ob_code}")
+            else:
+                entries.append((ob_code, text))
+        parsed[code] = entries
+    if errors:
+        raise TaxonomyError("invalid OB taxonomy:\n  " + "\n  ".join(errors))
+    return Taxonomy(version, parsed)
+
+
+def load_taxonomy(path: str = TAXONOMY_FILE) -> Taxonomy:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as error:
+        raise TaxonomyError(f"cannot read OB taxonomy {path}: {error}") from error
+    return parse_taxonomy(data)
+
+
+TAXONOMY = load_taxonomy()
@@ -0,0 +1,205 @@
+"""
+Benchmark of GET /analytics/cohort on a large cohort.
+
+Fills a database with --students students sitting --sessions sessions each,
+two students per session, with checked rates drifting per student. It then
+times loading the cohort arrays, refreshing them after a write to one
+session, the vectorized analytics on the loaded
+arrays and the endpoint, and checks the results against a pure-Python
+implementation built on grade_from_counts.
+
+    cd backend && python -m benchmarks.analytics --students 3000 --sessions 8
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, text, update
+from sqlalchemy.orm import sessionmaker
+
+from app.aggregates import rebuild_scores
+from app.analytics import cohort_analytics, get_cohort, load_cohort
+from app.database import DBExercise, DBObservation, DBSession, DBStudent, init_db, session_students
+from app.main import app, get_db
+from app.ob_catalog import taxonomy_ob_ids
+from app.ob_detector import grade_from_counts
+from app.taxonomy import TAXONOMY
+
+
+def populate(engine, students, sessions_per_student, seed=42):
+    rng = random.Random(seed)
+    with sessionmaker(bind=engine)() as db:
+        ob_ids = taxonomy_ob_ids(db)
+    competences = list(TAXONOMY.competences)
+    # Each student starts at some checked rate and improves or declines
+    levels = [(rng.uniform(0.3, 0.95), rng.uniform(-0.05, 0.05)) for _ in range(students)]
+    start = datetime(2023, 1, 1)
+    sessions = students * sessions_per_student // 2
+    with engine.begin() as connection:
+        connection.execute(insert(DBStudent), [{"name": f"Student {i}"} for i in range(students)])
+        connection.execute(insert(DBSession), [{
+            "date": start + timedelta(hours=n),
+            "competences": "",
+            "version": 1
+        } for n in range(sessions)])
+        # Students pair up in order, so each sits sessions_per_student sessions
+        pairs = []
+        for n in range(sessions):
+            first = (2 * n) % students
+            pairs.append((first, (first + 1) % students))
+        connection.execute(insert(session_students), [
+            {"session_id": n + 1, "student_id": student + 1, "position": position}
+            for n, pair in enumerate(pairs) for position, student in enumerate(pair)
+        ])
+        connection.execute(insert(DBExercise), [{
+            "name": "Exercise",
+            "session_id": n + 1,
+            "date": start + timedelta(hours=n),
+            "is_completed": True,
+            "competences": "[]"
+        } for n in range(sessions)])
+        rows = []
+        sat = [0] * students
+        for n, pair in enumerate(pairs):
+            for student in pair:
+                base, drift = levels[student]
+                rate = min(1.0, max(0.0, base + drift * sat[student]))
+                sat[student] += 1
+                for competence in rng.sample(competences, rng.randint(1, 3)):
+                    for ob in TAXONOMY.by_competence[competence]:
+                        if rng.random() < 0.5:
+                            rows.append({
+                                "ob_id": ob_ids[ob.id],
+                                "timestamp": start,
+                                "student_id": student + 1,
+                                "exercise_id": n + 1,
+                                "is_checked": rng.random() < rate
+                            })
+        connection.execute(insert(DBObservation), rows)
+    with sessionmaker(bind=engine)() as db:
+        rebuild_scores(db)
+        db.commit()
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    return sessions, len(rows)
+
+
+def reference_analytics(cohort, limit):
+    """Distributions, trends and OB rates with per-entry Python loops."""
+    distribution = defaultdict(lambda: [0] * 5)
+    series = defaultdict(list)
+    for student, session, competence, checked, total in zip(
+        cohort.score_student.tolist(), cohort.score_session.tolist(), cohort.score_competence.tolist(),
+        cohort.score_checked.tolist(), cohort.score_total.tolist()
+    ):
+        grade = grade_from_counts(checked, total)
+        distribution[cohort.competences[competence]][grade - 1] += 1
+        series[(student, competence)].append((cohort.session_rank[session], grade))
+
+    slopes = []
+    for (student, competence), points in series.items():
+        grades = [grade for _, grade in sorted(points)]
+        n = len(grades)
+        mean_x, mean_y = (n - 1) / 2, sum(grades) / n
+        variance = sum((x - mean_x) ** 2 for x in range(n))
+        if variance:
+            slope = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(grades)) / variance
+            if slope < 0:
+                slopes.append((round(slope, 9), student, competence))
+
+    ob_counts = defaultdict(lambda: [0, 0])
+    for ob_id, checked, total in zip(cohort.ob_id.tolist(), cohort.ob_checked.tolist(), cohort.ob_total.tolist()):
+        ob_counts[ob_id][0] += checked
+        ob_counts[ob_id][1] += total
+    weakest = sorted(ob_counts.items(), key=lambda item: (item[1][0] / item[1][1], -item[1][1], item[0]))[:limit]
+    declining = [
+        (round(slope, 3), cohort.student_names[student], cohort.competences[competence])
+        for slope, student, competence in sorted(slopes)[:limit]
+    ]
+    return dict(distribution), declining, [ob_id for ob_id, _ in weakest]
+
+
+def timed(repeat, call):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=3000)
+    parser.add_argument("--sessions", type=int, default=8, help="sessions per student")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        start = time.perf_counter()
+        sessions, count = populate(engine, args.students, args.sessions)
+        print(f"{args.students} students, {sessions} sessions, {count} observations, "
+              f"populated in {time.perf_counter() - start:.1f} s")
+        Session = sessionmaker(bind=engine)
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        client = TestClient(app)
+        try:
+            with Session() as db:
+                cohort, load = timed(1, lambda: load_cohort(db))
+                get_cohort(db)
+
+                def write_and_refresh():
+                    # Simulates one checkbox write, which bumps a single session's version
+                    db.execute(update(DBSession).where(DBSession.id == 1).values(version=DBSession.version + 1))
+                    db.commit()
+                    return get_cohort(db)
+
+                _, refresh = timed(args.repeat, write_and_refresh)
+                result, analytics = timed(args.repeat, lambda: cohort_analytics(db, cohort))
+                _, filtered = timed(args.repeat, lambda: cohort_analytics(
+                    db, cohort, date_from=datetime(2023, 2, 1), date_to=datetime(2023, 3, 1)
+                ))
+                _, one_student = timed(args.repeat, lambda: cohort_analytics(db, cohort, student="Student 7"))
+                reference, python = timed(1, lambda: reference_analytics(cohort, 10))
+            response, endpoint = timed(args.repeat, lambda: client.get("/analytics/cohort"))
+            response.raise_for_status()
+        finally:
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+    distribution, declining, weakest = reference
+    assert {name: stats["distribution"] for name, stats in result["competences"].items()} == distribution, \
+        "grade distributions differ from grade_from_counts"
+    assert [(trend["slope"], trend["student_name"], trend["competence"]) for trend in result["declining"]] == declining, \
+        "declining trends differ from the reference"
+    assert [ob["total"] for ob in result["weakest_obs"]] == [cohort.ob_total[cohort.ob_id == ob_id].sum() for ob_id in weakest], \
+        "weakest OBs differ from the reference"
+
+    print(f"{len(cohort.score_total)} competence evaluations, {len(cohort.ob_total)} OB counts")
+    print(f"load cohort arrays        {load:9.1f} ms")
+    print(f"refresh after one write   {refresh:9.1f} ms")
+    print(f"analytics, whole cohort   {analytics:9.1f} ms")
+    print(f"analytics, one month      {filtered:9.1f} ms")
+    print(f"analytics, one student    {one_student:9.1f} ms")
+    print(f"pure Python reference     {python:9.1f} ms")
+    print(f"GET /analytics/cohort     {endpoint:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
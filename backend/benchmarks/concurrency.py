@@ -0,0 +1,127 @@
+"""
+Concurrency benchmark: parallel observation toggles while sessions are being read.
+
+Runs writer threads toggling observations through PUT
+/exercises/{id}/observations/{id} and reader threads loading the session,
+each with its own client, and reports throughput and latency per backend:
+
+- SQLite with the previous default settings (rollback journal, no busy timeout)
+- SQLite as configured by create_db_engine (WAL, synchronous=NORMAL, busy timeout)
+- PostgreSQL, when a URL is given with --postgres-url or BENCH_POSTGRES_URL
+  (e.g. a local `docker run -e POSTGRES_PASSWORD=bench -p 5432:5432 postgres:16`)
+
+    cd backend && python -m benchmarks.concurrency --writers 8 --readers 4
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DBObservation, DBExercise, create_db_engine, init_db
+from app.main import app, get_db
+from benchmarks.report import populate
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run(label, engine, args):
+    init_db(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as db:
+        session_id, _, _ = populate(db, args.students, args.exercises)
+        targets = db.query(DBObservation.exercise_id, DBObservation.id).join(DBExercise).filter(
+            DBExercise.session_id == session_id
+        ).all()
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    write_latencies, read_latencies, errors = [], [], []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def writer(seed):
+        rng = random.Random(seed)
+        client = TestClient(app)
+        for _ in range(args.toggles):
+            exercise_id, observation_id = rng.choice(targets)
+            start = time.perf_counter()
+            response = client.put(
+                f"/exercises/{exercise_id}/observations/{observation_id}",
+                json={"is_checked": rng.random() < 0.5}
+            )
+            elapsed = time.perf_counter() - start
+            with lock:
+                (write_latencies if response.status_code == 200 else errors).append(elapsed)
+
+    def reader():
+        client = TestClient(app)
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = client.get(f"/sessions/{session_id}")
+            elapsed = time.perf_counter() - start
+            with lock:
+                (read_latencies if response.status_code == 200 else errors).append(elapsed)
+
+    writers = [threading.Thread(target=writer, args=(seed,)) for seed in range(args.writers)]
+    readers = [threading.Thread(target=reader) for _ in range(args.readers)]
+    start = time.perf_counter()
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in readers:
+        thread.join()
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+    print(f"{label}:")
+    print(f"  toggles: {len(write_latencies) / elapsed:8.1f}/s  "
+          f"p50 {statistics.median(write_latencies) * 1000:7.1f} ms  "
+          f"p99 {percentile(write_latencies, 0.99) * 1000:7.1f} ms")
+    if read_latencies:
+        print(f"  reads:   {len(read_latencies) / elapsed:8.1f}/s  "
+              f"p50 {statistics.median(read_latencies) * 1000:7.1f} ms  "
+              f"p99 {percentile(read_latencies, 0.99) * 1000:7.1f} ms")
+    print(f"  errors:  {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--toggles", type=int, default=100, help="toggles per writer")
+    parser.add_argument("--students", type=int, default=4)
+    parser.add_argument("--exercises", type=int, default=3, help="exercises per student")
+    parser.add_argument("--postgres-url", default=os.getenv("BENCH_POSTGRES_URL"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_url = f"sqlite:///{os.path.join(tmp, 'legacy.db')}"
+        run("sqlite (rollback journal)", create_engine(legacy_url, connect_args={"check_same_thread": False}), args)
+        run("sqlite (WAL)", create_db_engine(f"sqlite:///{os.path.join(tmp, 'wal.db')}"), args)
+    if args.postgres_url:
+        run("postgresql", create_db_engine(args.postgres_url), args)
+    else:
+        print("postgresql: skipped, pass --postgres-url or set BENCH_POSTGRES_URL")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark of POST /sessions/{session_id}/exercises/ observation creation.
+
+Creates one all-competence exercise per student of a class, first with the
+previous one-ORM-object-per-observation path, then with the endpoint's
+bulk INSERT, and reports time and SQL statements per exercise.
+
+    cd backend && python -m benchmarks.create_exercise --students 30
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, DBSession, DBExercise, DBObservation, add_session_students
+from app.main import create_exercise, ExerciseCreate
+from app.ob_catalog import catalog_ids, seed_catalog
+from app.ob_detector import detect_ob
+from app.taxonomy import TAXONOMY
+
+
+def legacy_create_exercise(db, session_id, student, competences):
+    """Observation creation as it was done before the bulk INSERT."""
+    ob_ids = catalog_ids(db, [
+        (ob.text, ob.code, ob.competence) for competency in competences for ob in TAXONOMY.by_competence[competency]
+    ])
+    db_exercise = DBExercise(
+        name="Exercise",
+        session_id=session_id,
+        date=datetime.utcnow(),
+        competences=json.dumps(competences)
+    )
+    for competency in competences:
+        for ob in TAXONOMY.by_competence[competency]:
+            ob_result = detect_ob(ob.text, competency)
+            db.add(DBObservation(
+                ob_id=ob_ids[(ob.text, ob_result["ob_code"], competency)],
+                timestamp=datetime.utcnow(),
+                student_id=student.id,
+                exercise=db_exercise
+            ))
+    db.add(db_exercise)
+    db.commit()
+    db.refresh(db_exercise)
+    return len(db_exercise.observations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=30)
+    args = parser.parse_args()
+
+    competences = list(TAXONOMY.competences)
+    names = [f"Student {i}" for i in range(args.students)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+        with Session() as db:
+            session = DBSession(date=datetime.utcnow())
+            db.add(session)
+            db.flush()
+            add_session_students(db, session.id, names)
+            db.commit()
+            session_id = session.id
+            seed_catalog(db)
+
+        statements.clear()
+        start = time.perf_counter()
+        with Session() as db:
+            for student in db.get(DBSession, session_id).students:
+                legacy_create_exercise(db, session_id, student, competences)
+        legacy_time = time.perf_counter() - start
+        legacy_statements = len(statements)
+
+        statements.clear()
+        start = time.perf_counter()
+        with Session() as db:
+            for name in names:
+                create_exercise(
+                    session_id,
+                    ExerciseCreate(name="Exercise", student_name=name, competences=competences),
+                    compact=False,
+                    db=db
+                )
+        bulk_time = time.perf_counter() - start
+        bulk_statements = len(statements)
+        engine.dispose()
+
+    per_exercise = len(TAXONOMY.obs)
+    print(f"{args.students} exercises x {per_exercise} observations")
+    print(f"legacy ORM:  {legacy_time * 1000 / args.students:7.2f} ms/exercise, "
+          f"{legacy_statements / args.students:5.1f} statements/exercise")
+    print(f"bulk insert: {bulk_time * 1000 / args.students:7.2f} ms/exercise, "
+          f"{bulk_statements / args.students:5.1f} statements/exercise")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Bounded-memory check of the streaming exports.
+
+Fills a database with --observations synthetic observations (1M by default),
+then streams GET /export/observations and GET /export/reports in both
+formats straight through the ASGI app, discarding the body as it arrives
+(the test client would buffer it). The process RSS is sampled on every
+chunk. The check fails if it grows by more than --max-growth MiB over the
+baseline at any point.
+
+    cd backend && python -m benchmarks.export --observations 1000000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.aggregates import rebuild_scores
+from app.database import DBExercise, DBObservation, DBSession, DBStudent, init_db, session_students
+from app.main import app, get_db
+from app.ob_catalog import taxonomy_ob_ids
+from app.taxonomy import TAXONOMY
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+INSERT_CHUNK = 50_000
+
+
+def rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 2 ** 20
+
+
+def populate(engine, observations, students_per_session=2, exercises_per_session=10, seed=42):
+    """Sessions of a few exercises on random competences until `observations` rows exist."""
+    rng = random.Random(seed)
+    per_exercise = len(TAXONOMY.obs) * 2 // 3
+    sessions = max(1, observations // (exercises_per_session * per_exercise))
+    start = datetime(2023, 1, 1)
+    with sessionmaker(bind=engine)() as db:
+        ob_ids = taxonomy_ob_ids(db)
+    with engine.begin() as connection:
+        connection.execute(insert(DBStudent), [{"name": f"Student {i}"} for i in range(sessions // 5 + students_per_session)])
+        connection.execute(insert(DBSession), [{
+            "date": start + timedelta(hours=6 * n),
+            "competences": "",
+            "version": 0
+        } for n in range(sessions)])
+        roster = {
+            session_id: rng.sample(range(1, sessions // 5 + students_per_session + 1), students_per_session)
+            for session_id in range(1, sessions + 1)
+        }
+        connection.execute(insert(session_students), [
+            {"session_id": session_id, "student_id": student_id, "position": position}
+            for session_id, student_ids in roster.items() for position, student_id in enumerate(student_ids)
+        ])
+        connection.execute(insert(DBExercise), [{
+            "name": f"Exercise {n}",
+            "session_id": session_id,
+            "date": start + timedelta(hours=6 * (session_id - 1), minutes=n),
+            "is_completed": True,
+            "competences": "[]"
+        } for session_id in range(1, sessions + 1) for n in range(exercises_per_session)])
+
+        rows = []
+        count = 0
+        exercise_id = 0
+        for session_id, student_ids in roster.items():
+            for n in range(exercises_per_session):
+                exercise_id += 1
+                student_id = student_ids[n % students_per_session]
+                for ob in rng.sample(TAXONOMY.obs, per_exercise):
+                    rows.append({
+                        "ob_id": ob_ids[ob.id],
+                        "timestamp": start,
+                        "student_id": student_id,
+                        "exercise_id": exercise_id,
+                        "is_checked": rng.random() < 0.7
+                    })
+                if len(rows) >= INSERT_CHUNK:
+                    connection.execute(insert(DBObservation), rows)
+                    count += len(rows)
+                    rows = []
+        if rows:
+            connection.execute(insert(DBObservation), rows)
+            count += len(rows)
+    with sessionmaker(bind=engine)() as db:
+        rebuild_scores(db)
+        db.commit()
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    return sessions, count
+
+
+async def stream(path: str, query: str = ""):
+    """Run one GET through the ASGI app, discarding the body; returns (status, bytes, lines, peak RSS)."""
+    status = None
+    size = lines = 0
+    peak = rss_mib()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # The client never disconnects
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status, size, lines, peak
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            size += len(body)
+            lines += body.count(b"\n")
+            peak = max(peak, rss_mib())
+
+    await app({
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [],
+        "client": ("benchmark", 0),
+        "server": ("benchmark", 80),
+    }, receive, send)
+    return status, size, lines, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--observations", type=int, default=1_000_000)
+    parser.add_argument("--max-growth", type=float, default=64, help="allowed RSS growth in MiB")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        start = time.perf_counter()
+        sessions, count = populate(engine, args.observations)
+        print(f"{count} observations in {sessions} sessions, populated in {time.perf_counter() - start:.1f} s")
+        Session = sessionmaker(bind=engine)
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            # Warm up imports, the catalog and the connection pool
+            asyncio.run(stream("/export/observations", "date_to=2023-01-02T00:00:00"))
+            for path in ("/export/observations", "/export/reports"):
+                for export_format in ("ndjson", "csv"):
+                    gc.collect()
+                    baseline = rss_mib()
+                    start = time.perf_counter()
+                    status, size, lines, peak = asyncio.run(stream(path, f"format={export_format}"))
+                    elapsed = time.perf_counter() - start
+                    growth = peak - baseline
+                    ok = status == 200 and growth <= args.max_growth
+                    failed = failed or not ok
+                    print(f"{path:22s} {export_format:6s} {lines:9d} lines {size / 2 ** 20:8.1f} MiB "
+                          f"{elapsed:6.1f} s  RSS {baseline:6.1f} -> {peak:6.1f} MiB (+{growth:.1f})  "
+                          f"{'ok' if ok else 'FAIL'}")
+        finally:
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+    if failed:
+        print(f"exports must stream with less than {args.max_growth} MiB of RSS growth", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
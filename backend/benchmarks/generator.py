@@ -0,0 +1,138 @@
+"""
+Seeded generator of synthetic evaluation data.
+
+Fills a database with --sessions sessions of --students students drawn from
+a class of --pool students, each with --exercises exercises per session on
+random competences of the OB taxonomy. Each student has their own checked
+rate, drifting from one session to the next. The same seed always produces
+the same rows, so timings taken on different commits compare the same data.
+
+    cd backend && python -m benchmarks.generator sqlite:///bench.db --sessions 200 --students 4 --exercises 6
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.aggregates import rebuild_scores
+from app.database import DBExercise, DBObservation, DBSession, DBStudent, create_db_engine, init_db, session_students
+from app.ob_catalog import taxonomy_ob_ids
+from app.snapshots import freeze_exercises, unfrozen_exercise_ids
+from app.taxonomy import TAXONOMY
+
+START = datetime(2024, 1, 1, 8)
+
+
+class Dataset(NamedTuple):
+    sessions: int
+    students: int
+    exercises: int
+    observations: int
+
+
+def generate(engine, sessions, students, exercises, pool=None, seed=42, completed=0.8) -> Dataset:
+    """
+    Insert the synthetic rows into a migrated database, then rebuild the
+    competence scores and refresh the planner statistics. A `completed`
+    fraction of each session's exercises is marked completed and frozen.
+    """
+    rng = random.Random(seed)
+    pool = max(pool or students, students)
+    with sessionmaker(bind=engine)() as db:
+        ob_ids = taxonomy_ob_ids(db)
+        db.commit()
+        first_student = (db.query(DBStudent.id).order_by(DBStudent.id.desc()).limit(1).scalar() or 0) + 1
+        first_session = (db.query(DBSession.id).order_by(DBSession.id.desc()).limit(1).scalar() or 0) + 1
+        first_exercise = (db.query(DBExercise.id).order_by(DBExercise.id.desc()).limit(1).scalar() or 0) + 1
+
+    competences = list(TAXONOMY.competences)
+    levels = [(rng.uniform(0.35, 0.95), rng.uniform(-0.03, 0.03)) for _ in range(pool)]
+    sat = [0] * pool
+    session_rows, member_rows, exercise_rows, observation_rows = [], [], [], []
+    exercise_id = first_exercise
+    for n in range(sessions):
+        session_id = first_session + n
+        date = START + timedelta(days=n // 3, hours=4 * (n % 3))
+        session_rows.append({"id": session_id, "date": date, "competences": "", "version": 1})
+        members = rng.sample(range(pool), students)
+        member_rows += [
+            {"session_id": session_id, "student_id": first_student + student, "position": position}
+            for position, student in enumerate(members)
+        ]
+        done = round(exercises * completed)
+        for k in range(exercises):
+            for student in members:
+                selected = rng.sample(competences, rng.randint(1, len(competences)))
+                exercise_rows.append({
+                    "id": exercise_id,
+                    "name": f"Exercise {k + 1}",
+                    "session_id": session_id,
+                    "date": date + timedelta(minutes=10 * k),
+                    "is_completed": k < done,
+                    "competences": json.dumps(selected)
+                })
+                base, drift = levels[student]
+                rate = min(1.0, max(0.0, base + drift * sat[student]))
+                for competence in selected:
+                    for ob in TAXONOMY.by_competence[competence]:
+                        observation_rows.append({
+                            "ob_id": ob_ids[ob.id],
+                            "timestamp": date + timedelta(minutes=10 * k),
+                            "student_id": first_student + student,
+                            "exercise_id": exercise_id,
+                            "is_checked": rng.random() < rate
+                        })
+                exercise_id += 1
+        for student in members:
+            sat[student] += 1
+
+    with engine.begin() as connection:
+        connection.execute(insert(DBStudent), [
+            {"id": first_student + n, "name": f"Student {first_student + n}"} for n in range(pool)
+        ])
+        connection.execute(insert(DBSession), session_rows)
+        connection.execute(insert(session_students), member_rows)
+        connection.execute(insert(DBExercise), exercise_rows)
+        for start in range(0, len(observation_rows), 50_000):
+            connection.execute(insert(DBObservation), observation_rows[start:start + 50_000])
+        if engine.dialect.name == "postgresql":
+            # Rows were inserted with explicit ids; move the sequences past them
+            for table in (DBStudent.__table__, DBSession.__table__, DBExercise.__table__):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))"
+                ))
+    with sessionmaker(bind=engine)() as db:
+        rebuild_scores(db)
+        freeze_exercises(db, unfrozen_exercise_ids(db))
+        db.commit()
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    return Dataset(sessions, pool, len(exercise_rows), len(observation_rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database_url", help="migrated first if needed")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--students", type=int, default=4, help="students per session")
+    parser.add_argument("--pool", type=int, default=None, help="students in the class, --students by default")
+    parser.add_argument("--exercises", type=int, default=6, help="exercises per student and session")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_db_engine(args.database_url)
+    init_db(engine)
+    start = time.perf_counter()
+    dataset = generate(engine, args.sessions, args.students, args.exercises, args.pool, args.seed)
+    engine.dispose()
+    print(f"{dataset.sessions} sessions, {dataset.students} students, {dataset.exercises} exercises, "
+          f"{dataset.observations} observations in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
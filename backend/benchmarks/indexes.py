@@ -0,0 +1,119 @@
+"""
+Query plans and timings of the hot queries without and with the secondary indexes.
+
+Builds a database at the latest migration, drops the secondary indexes and
+fills it with synthetic sessions, prints SQLite's EXPLAIN QUERY PLAN and the
+mean time of each query, then recreates the indexes and does the same again.
+
+    cd backend && python -m benchmarks.indexes --sessions 40
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import MIGRATIONS_CONFIG, DBExercise, DBObservation
+from benchmarks.report import populate
+
+QUERIES = {
+    "session exercises": (
+        "SELECT id FROM exercises WHERE session_id = :session_id"
+    ),
+    "exercise observations": (
+        "SELECT id, is_checked FROM observations WHERE exercise_id IN "
+        "(SELECT id FROM exercises WHERE session_id = :session_id)"
+    ),
+    "report": (
+        "SELECT observations.student_id, observations.ob_id, observations.is_checked "
+        "FROM observations JOIN exercises ON observations.exercise_id = exercises.id "
+        "WHERE exercises.session_id = :session_id ORDER BY exercises.id, observations.id"
+    ),
+    "update observation": (
+        "SELECT id FROM observations WHERE id = :observation_id AND exercise_id = :exercise_id"
+    ),
+    "student observations": (
+        "SELECT count(*) FROM observations JOIN students ON observations.student_id = students.id "
+        "WHERE students.name = :student_name"
+    ),
+}
+
+
+SECONDARY_INDEXES = [
+    index
+    for table in (DBExercise.__table__, DBObservation.__table__)
+    for index in table.indexes
+    if index.name not in ("ix_exercises_id", "ix_observations_id")
+]
+
+
+def migrate(engine, revision):
+    config = Config(MIGRATIONS_CONFIG)
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+def measure(engine, params, repeat):
+    with engine.connect() as connection:
+        for name, sql in QUERIES.items():
+            plan = connection.execute(text("EXPLAIN QUERY PLAN " + sql), params).all()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                connection.execute(text(sql), params).all()
+            elapsed = (time.perf_counter() - start) / repeat
+            print(f"  {name:22s} {elapsed * 1000:8.3f} ms")
+            for row in plan:
+                print(f"      {row[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--students", type=int, default=6)
+    parser.add_argument("--exercises", type=int, default=5, help="exercises per student")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        migrate(engine, "head")
+        for index in SECONDARY_INDEXES:
+            index.drop(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        total = 0
+        with Session() as db:
+            for seed in range(args.sessions):
+                session_id, names, count = populate(db, args.students, args.exercises, seed=seed)
+                total += count
+        with engine.connect() as connection:
+            exercise_id, observation_id = connection.execute(text(
+                "SELECT exercise_id, max(id) FROM observations WHERE exercise_id = "
+                "(SELECT max(id) FROM exercises WHERE session_id = :session_id)"
+            ), {"session_id": session_id}).one()
+        params = {
+            "session_id": session_id,
+            "exercise_id": exercise_id,
+            "observation_id": observation_id,
+            "student_name": names[0],
+        }
+
+        print(f"{args.sessions} sessions, {total} observations")
+        print("without secondary indexes:")
+        measure(engine, params, args.repeat)
+        for index in SECONDARY_INDEXES:
+            index.create(bind=engine)
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
+        print("with secondary indexes:")
+        measure(engine, params, args.repeat)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
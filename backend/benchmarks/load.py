@@ -0,0 +1,123 @@
+"""
+Load test: observation toggle latency while reports are being generated.
+
+Serves the app with uvicorn on a local port, then measures the latency of
+PUT /exercises/{id}/observations/{id} alone and while other clients keep
+requesting the report of a large session. Blocking work done on the event
+loop shows up as a large toggle p99 during reports.
+
+    cd backend && python -m benchmarks.load --toggles 100 --report-clients 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DBObservation, DBExercise, create_db_engine, init_db
+from app.main import app, get_db
+from benchmarks.report import populate
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def measure(base_url, session_id, targets, args, report_clients):
+    rng = random.Random(0)
+    latencies = []
+    reports = 0
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        async def report_loop():
+            nonlocal reports
+            while not stop.is_set():
+                response = await client.get(f"/sessions/{session_id}/report/", params={"safety_scores": "{}"})
+                response.raise_for_status()
+                reports += 1
+
+        loops = [asyncio.create_task(report_loop()) for _ in range(report_clients)]
+        if loops:
+            await asyncio.sleep(0.5)  # let the report requests get going
+        for _ in range(args.toggles):
+            exercise_id, observation_id = rng.choice(targets)
+            start = time.perf_counter()
+            response = await client.put(
+                f"/exercises/{exercise_id}/observations/{observation_id}",
+                json={"is_checked": rng.random() < 0.5}
+            )
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+            await asyncio.sleep(args.interval)
+        stop.set()
+        await asyncio.gather(*loops)
+    return latencies, reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--toggles", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.01, help="pause between toggles, in seconds")
+    parser.add_argument("--report-clients", type=int, default=4)
+    parser.add_argument("--students", type=int, default=25)
+    parser.add_argument("--exercises", type=int, default=10, help="exercises per student")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with Session() as db:
+            session_id, _, count = populate(db, args.students, args.exercises)
+            targets = db.query(DBObservation.exercise_id, DBObservation.id).join(DBExercise).filter(
+                DBExercise.session_id == session_id
+            ).all()
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        try:
+            print(f"report session: {count} observations")
+            base_url = f"http://127.0.0.1:{port}"
+            for label, clients in (("idle", 0), (f"{args.report_clients} report clients", args.report_clients)):
+                latencies, reports = asyncio.run(measure(base_url, session_id, targets, args, clients))
+                print(f"toggles, {label:18s} p50 {statistics.median(latencies) * 1000:8.1f} ms  "
+                      f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms  "
+                      f"max {max(latencies) * 1000:8.1f} ms  ({reports} reports)")
+        finally:
+            server.should_exit = True
+            thread.join()
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
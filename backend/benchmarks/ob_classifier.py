@@ -0,0 +1,99 @@
+"""
+Latency and throughput of the semantic OB classifier at batch sizes 1 to 64.
+
+Runs fully offline: without --model, a tiny randomly initialized BERT and a
+tokenizer built from the OB vocabulary are written to a temporary directory.
+Scores are then meaningless but timings show the batching behaviour; pass a
+real local model directory to measure it instead.
+
+    cd backend && python -m benchmarks.ob_classifier
+    cd backend && python -m benchmarks.ob_classifier --model ./models/all-MiniLM-L6-v2
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.ob_classifier import MicroBatcher, OBClassifier, TransformerEncoder
+from app.ob_matcher import index_entries
+from benchmarks.ob_matcher import noisy_note
+
+BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64)
+
+
+def build_tiny_model(directory):
+    from transformers import BertConfig, BertModel, BertTokenizer
+
+    words = sorted({word for text, _, _ in index_entries() for word in re.findall(r"[a-z0-9]+", text.lower())})
+    vocab_file = os.path.join(directory, "vocab.txt")
+    with open(vocab_file, "w") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words))
+    BertTokenizer(vocab_file).save_pretrained(directory)
+    config = BertConfig(
+        vocab_size=len(words) + 5,
+        hidden_size=128,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=512
+    )
+    BertModel(config).save_pretrained(directory)
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="local model directory (default: tiny random BERT)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        import torch  # noqa: F401
+        import transformers  # noqa: F401
+    except ImportError:
+        print("torch and transformers are required: pip install torch transformers", file=sys.stderr)
+        sys.exit(1)
+
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    rng = random.Random(args.seed)
+    entries = index_entries()
+    notes = [noisy_note(rng, rng.choice(entries)[0]) for _ in range(max(BATCH_SIZES) * 4)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = args.model or build_tiny_model(tmp)
+        start = time.perf_counter()
+        classifier = OBClassifier(TransformerEncoder(model), cache_dir=os.path.join(tmp, "cache"))
+        classifier.embeddings
+        print(f"model {args.model or 'tiny random BERT'}: loaded and embedded {len(entries)} OB texts "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        start = time.perf_counter()
+        OBClassifier(TransformerEncoder(model), cache_dir=os.path.join(tmp, "cache")).embeddings
+        print(f"embeddings from disk cache (model load included): {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        print(f"{'batch':>5}  {'latency ms':>10}  {'notes/s':>9}")
+        for batch_size in BATCH_SIZES:
+            timings = []
+            for _ in range(args.repeat):
+                batch = rng.sample(notes, batch_size)
+                start = time.perf_counter()
+                classifier.classify(batch)
+                timings.append(time.perf_counter() - start)
+            latency = min(timings)
+            print(f"{batch_size:5d}  {latency * 1000:10.2f}  {batch_size / latency:9.0f}")
+
+        # Concurrent single-note callers, as from request threads
+        for max_batch in (1, 32):
+            batcher = MicroBatcher(lambda items: classifier.classify(items), max_batch=max_batch)
+            with ThreadPoolExecutor(max_workers=64) as pool:
+                start = time.perf_counter()
+                list(pool.map(batcher, notes))
+                elapsed = time.perf_counter() - start
+            print(f"64 concurrent callers, micro-batch {max_batch:2d}: {len(notes) / elapsed:7.0f} notes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of free-text OB matching against the SequenceMatcher baseline.
+
+Builds noisy instructor notes from the OB descriptions (dropped words,
+typos, truncation) and compares accuracy and per-note latency of the n-gram
+TF-IDF matcher with a brute-force similar() pass over every definition.
+
+    cd backend && python -m benchmarks.ob_matcher --notes 500
+"""
+import argparse
+import random
+import time
+
+from app.ob_detector import similar
+from app.ob_matcher import index_entries, get_matcher
+
+
+def noisy_note(rng, text):
+    words = text.split()
+    start = rng.randint(0, len(words) // 3)
+    words = words[start:start + max(3, int(len(words) * rng.uniform(0.4, 0.8)))]
+    words = [word for word in words if rng.random() > 0.15] or words[:1]
+    note = list(" ".join(words).lower())
+    for _ in range(rng.randint(0, 3)):
+        position = rng.randrange(len(note))
+        note[position] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(note)
+
+
+def sequence_matcher_match(entries, text, limit):
+    scored = sorted(((similar(text, entry_text), ob_code, competence)
+                     for entry_text, ob_code, competence in entries), reverse=True)
+    results, seen = [], set()
+    for score, ob_code, competence in scored:
+        if ob_code not in seen:
+            seen.add(ob_code)
+            results.append((ob_code, competence, score))
+        if len(results) == limit:
+            break
+    return results
+
+
+def run(name, match, notes, limit):
+    start = time.perf_counter()
+    ranked = [match(note) for note, _ in notes]
+    elapsed = time.perf_counter() - start
+    top1 = sum(1 for results, (_, ob_code) in zip(ranked, notes) if results and results[0][0] == ob_code)
+    topk = sum(1 for results, (_, ob_code) in zip(ranked, notes) if ob_code in [r[0] for r in results])
+    print(f"{name:16s} {elapsed / len(notes) * 1000:9.3f} ms/note   "
+          f"top-1 {top1 / len(notes):6.1%}   top-{limit} {topk / len(notes):6.1%}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    entries = index_entries()
+    notes = []
+    for _ in range(args.notes):
+        text, ob_code, _ = rng.choice(entries)
+        notes.append((noisy_note(rng, text), ob_code))
+
+    start = time.perf_counter()
+    matcher = get_matcher()
+    print(f"index: {len(entries)} texts, {len(matcher.vocabulary)} n-grams, "
+          f"built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    baseline = run("SequenceMatcher", lambda note: sequence_matcher_match(entries, note, args.limit), notes, args.limit)
+    indexed = run("n-gram TF-IDF", lambda note: matcher.match(note, args.limit), notes, args.limit)
+    print(f"speedup: {baseline / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark of GET /sessions/{session_id}/report/ report building.
+
+Compares the previous nested-loop implementation with the report engine
+(competence_scores counts plus unchecked rows) on a synthetic session, and
+checks both produce the same JSON.
+
+    cd backend && python -m benchmarks.report --students 25 --exercises 10
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.aggregates import rebuild_scores
+from app.database import Base, DBSession, DBExercise, DBObservation, add_session_students
+from app.ob_catalog import taxonomy_ob_ids
+from app.ob_detector import calculate_how_many, calculate_how_often
+from app.report import build_session_report
+from app.taxonomy import TAXONOMY
+
+
+def legacy_report(session, safety_scores_dict):
+    """Report building as it was done before the single-pass engine."""
+    full_report = {}
+    for student in session.students:
+        student_name = student.name
+        student_safety_score = safety_scores_dict.get(student_name, 5)
+        student_observations = []
+        student_competences_evaluated = set()
+        unchecked_observations = []
+        for exercise in session.exercises:
+            if any(obs.student_id == student.id for obs in exercise.observations):
+                for obs in exercise.observations:
+                    if obs.student_id == student.id:
+                        student_observations.append({
+                            "text": obs.ob.text,
+                            "ob_code": obs.ob.ob_code,
+                            "competence": obs.ob.competence,
+                            "is_checked": obs.is_checked
+                        })
+                        if obs.ob.competence:
+                            student_competences_evaluated.add(obs.ob.competence)
+                        if not obs.is_checked:
+                            unchecked_observations.append({
+                                "text": obs.ob.text,
+                                "ob_code": obs.ob.ob_code,
+                                "competence": obs.ob.competence
+                            })
+        student_report = {}
+        for comp in sorted(list(student_competences_evaluated)):
+            how_many = calculate_how_many(student_observations, comp)
+            how_often = calculate_how_often(student_observations, comp)
+            seen_obs = set()
+            comp_observations = []
+            for obs in student_observations:
+                if obs["competence"] == comp:
+                    key = (obs["text"], obs["ob_code"], obs["competence"])
+                    if key not in seen_obs:
+                        comp_observations.append({"text": obs["text"], "ob_code": obs["ob_code"]})
+                        seen_obs.add(key)
+            student_report[comp] = {
+                "how_many": how_many,
+                "how_often": how_often,
+                "safety_score": student_safety_score,
+                "final_grade": min(how_many, how_often, student_safety_score),
+                "observations": comp_observations
+            }
+        full_report[student_name] = {
+            "report": student_report,
+            "unchecked_observations": unchecked_observations
+        }
+    return full_report
+
+
+def populate(db, students, exercises_per_student, seed=42):
+    """
+    Add a session of `students` students (shared across calls) with
+    `exercises_per_student` exercises each on random competences.
+    """
+    rng = random.Random(seed)
+    names = [f"Student {i}" for i in range(students)]
+    ob_ids = taxonomy_ob_ids(db)
+    session = DBSession(date=datetime.utcnow())
+    db.add(session)
+    db.flush()
+    student_ids = {student.name: student.id for student in add_session_students(db, session.id, names)}
+
+    competences = list(TAXONOMY.competences)
+    rows = []
+    for n in range(exercises_per_student):
+        for name in names:
+            selected = rng.sample(competences, rng.randint(1, len(competences)))
+            exercise = DBExercise(
+                name=f"Exercise {n}",
+                session_id=session.id,
+                date=datetime.utcnow(),
+                competences=json.dumps(selected)
+            )
+            db.add(exercise)
+            db.flush()
+            for competency in selected:
+                for ob in TAXONOMY.by_competence[competency]:
+                    rows.append({
+                        "ob_id": ob_ids[ob.id],
+                        "timestamp": datetime.utcnow(),
+                        "student_id": student_ids[name],
+                        "exercise_id": exercise.id,
+                        "is_checked": rng.random() < 0.7
+                    })
+    db.execute(insert(DBObservation), rows)
+    rebuild_scores(db, session.id)
+    db.commit()
+    return session.id, names, len(rows)
+
+
+def best_of(repeat, fn):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=25)
+    parser.add_argument("--exercises", type=int, default=10, help="exercises per student")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as db:
+            session_id, names, count = populate(db, args.students, args.exercises)
+        safety_scores = {name: 4 for name in names[::2]}
+
+        def run_legacy():
+            with Session() as db:
+                session = db.get(DBSession, session_id)
+                return legacy_report(session, safety_scores)
+
+        def run_engine():
+            with Session() as db:
+                session = db.get(DBSession, session_id)
+                return build_session_report(db, session_id, session.students, safety_scores)
+
+        legacy_time, legacy = best_of(args.repeat, run_legacy)
+        engine_time, report = best_of(args.repeat, run_engine)
+        engine.dispose()
+
+    assert json.dumps(legacy) == json.dumps(report), "report engine output differs from legacy report"
+    print(f"observations: {count} ({args.students} students, {args.students * args.exercises} exercises)")
+    print(f"legacy report: {legacy_time * 1000:9.1f} ms")
+    print(f"report engine: {engine_time * 1000:9.1f} ms")
+    print(f"speedup:       {legacy_time / engine_time:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark of the report cache on GET /sessions/{session_id}/report/.
+
+Times a cold report, a cached report and a conditional request answered with
+304 Not Modified, then checks that a write invalidates the cached report.
+
+    cd backend && python -m benchmarks.report_cache --students 25 --exercises 10
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.main import app, get_db
+from app.report_cache import report_cache
+from benchmarks.report import populate
+
+
+def timed(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = call()
+        timings.append(time.perf_counter() - start)
+    return response, min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=25)
+    parser.add_argument("--exercises", type=int, default=10, help="exercises per student")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            session_id, names, count = populate(db, args.students, args.exercises)
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        client = TestClient(app)
+        url = f"/sessions/{session_id}/report/"
+        params = {"safety_scores": json.dumps({name: 4 for name in names[::2]})}
+        try:
+            def cold():
+                report_cache.clear()
+                return client.get(url, params=params)
+
+            response, cold_ms = timed(cold, args.repeat)
+            etag = response.headers["ETag"]
+            body = response.json()
+            report_cache.clear()
+            client.get(url, params=params)
+            response, cached_ms = timed(lambda: client.get(url, params=params), args.repeat)
+            cached_body = response.json()
+            response, not_modified_ms = timed(
+                lambda: client.get(url, params=params, headers={"If-None-Match": etag}), args.repeat
+            )
+            not_modified_status = response.status_code
+
+            # Same effective scores in another order or with unknown students share the entry
+            reordered = {name: 4 for name in reversed(names[::2])}
+            reordered["not in session"] = 1
+            shared = client.get(url, params={"safety_scores": json.dumps(reordered)}).headers["ETag"] == etag
+
+            observation = client.get(f"/sessions/{session_id}").json()["exercises"][0]["observations"][0]
+            client.patch(
+                f"/sessions/{session_id}/observations",
+                json={"changes": [{"observation_id": observation["id"], "is_checked": not observation["is_checked"]}]}
+            ).raise_for_status()
+            after_write = client.get(url, params=params, headers={"If-None-Match": etag})
+            stats = client.get("/metrics/report-cache").json()
+        finally:
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+    print(f"observations: {count} ({args.students} students, {args.students * args.exercises} exercises)")
+    print(f"cold report:   {cold_ms:8.2f} ms")
+    print(f"cached report: {cached_ms:8.2f} ms")
+    print(f"304 response:  {not_modified_ms:8.2f} ms")
+    print(f"cache stats:   {stats}")
+
+    failures = []
+    if cached_body != body:
+        failures.append("cached report differs from the computed one")
+    if not_modified_status != 304:
+        failures.append(f"If-None-Match returned {not_modified_status} instead of 304")
+    if not shared:
+        failures.append("equivalent safety scores produced a different ETag")
+    if after_write.status_code != 200 or after_write.headers["ETag"] == etag:
+        failures.append("a write did not invalidate the cached report")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Throughput of the background report jobs as the worker count grows.
+
+Generates --sessions sessions, builds all their reports sequentially in this
+process as the baseline, then runs the same batch as a report job on pools
+of each --workers size and reports sessions per second. Each pool is warmed
+up with a small job first, so process start-up is not counted. The results
+are checked against the baseline.
+
+    cd backend && python -m benchmarks.report_jobs --sessions 500 --workers 1 2 4
+
+Workers only add throughput up to the number of CPU cores.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import orjson
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DBSession, DBStudent, create_db_engine, init_db, session_students
+from app.report import load_session_report
+from app.report_jobs import ReportJobQueue
+from benchmarks.generator import generate
+
+
+def run_job(queue, database_url, requests):
+    job = queue.submit(database_url, requests)
+    while True:
+        status = queue.status(job["id"])
+        if status["status"] != "running":
+            break
+        time.sleep(0.01)
+    with open(queue.result_path(job["id"]), "rb") as result:
+        return status, result.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--students", type=int, default=4, help="students per session")
+    parser.add_argument("--exercises", type=int, default=6, help="exercises per student and session")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--chunk", type=int, default=20, help="sessions per task")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_db_engine(database_url)
+        init_db(engine)
+        dataset = generate(engine, args.sessions, args.students, args.exercises)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with Session() as db:
+            # One lowered safety score per session, so the reports depend on the request
+            names = dict(db.query(session_students.c.session_id, DBStudent.name).join(
+                DBStudent, DBStudent.id == session_students.c.student_id
+            ))
+            requests = [
+                (session_id, {names[session_id]: 3})
+                for session_id, in db.query(DBSession.id).order_by(DBSession.id)
+            ]
+
+            start = time.perf_counter()
+            expected = b"".join(
+                orjson.dumps({"session_id": session_id, "report": load_session_report(db, session_id).build(scores)}) + b"\n"
+                for session_id, scores in requests
+            )
+            sequential = time.perf_counter() - start
+        engine.dispose()
+
+        print(f"{dataset.observations} observations, {len(requests)} reports, {os.cpu_count()} CPU")
+        print(f"{'sequential':>12}{sequential:9.2f} s{len(requests) / sequential:9.0f} sessions/s")
+        for workers in args.workers:
+            queue = ReportJobQueue(os.path.join(tmp, f"jobs-{workers}"), workers, args.chunk)
+            try:
+                run_job(queue, database_url, requests[:workers * args.chunk])
+                start = time.perf_counter()
+                status, result = run_job(queue, database_url, requests)
+                elapsed = time.perf_counter() - start
+            finally:
+                queue.shutdown()
+            assert status["failed"] == 0 and result == expected, "job results differ from the sequential reports"
+            print(f"{workers:>4} workers{elapsed:9.2f} s{len(requests) / elapsed:9.0f} sessions/s"
+                  f"{sequential / elapsed:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Latency of the observation search on a large dataset.
+
+Generates about a million observations (--sessions sessions of --students
+students with --exercises exercises each), then times the
+/search/observations handler on typical queries: OB text, OB code,
+competence, student, unchecked OBs of a student, and deep pages followed
+through the cursor. Reports the best, median and worst of --repeat runs and
+fails when a median exceeds --budget-ms.
+
+    cd backend && python -m benchmarks.search --sessions 900
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from fastapi import Response
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DBObservation, create_db_engine, init_db
+from app.main import search
+from benchmarks.generator import generate
+
+QUERIES = [
+    ("OB text", {"q": "radio"}),
+    ("OB text, 2 words", {"q": "situation awareness"}),
+    ("OB code", {"q": "OB 2.9"}),
+    ("competence", {"q": "SAW"}),
+    ("student", {"student": "Student 7"}),
+    ("unchecked OBs of a student", {"q": "knowledge", "student": "Student 3", "checked": False}),
+    ("no match", {"q": "zzzz"}),
+]
+
+
+def call(db, params, cursor=None):
+    response = Response()
+    hits = search(
+        response, params.get("q"), params.get("student"), params.get("checked"), params.get("limit", 50), cursor, db
+    )
+    return hits, response.headers.get("X-Next-Cursor")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=900)
+    parser.add_argument("--students", type=int, default=4, help="students per session")
+    parser.add_argument("--pool", type=int, default=40, help="students in the class")
+    parser.add_argument("--exercises", type=int, default=6, help="exercises per student and session")
+    parser.add_argument("--pages", type=int, default=20, help="pages followed for the deep page timing")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        start = time.perf_counter()
+        generate(engine, args.sessions, args.students, args.exercises, args.pool)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        over_budget = []
+        with Session() as db:
+            observations = db.query(func.count(DBObservation.id)).scalar()
+            print(f"{observations} observations generated in {time.perf_counter() - start:.0f} s")
+            print(f"{'query':32}{'hits':>6}{'best':>10}{'median':>10}{'worst':>10}")
+
+            timings = {}
+            for label, params in QUERIES:
+                call(db, params)
+                durations = []
+                for _ in range(args.repeat):
+                    begin = time.perf_counter()
+                    hits, _ = call(db, params)
+                    durations.append(time.perf_counter() - begin)
+                timings[label] = (len(hits), durations)
+
+            # Page --pages of the broadest query, then time the next one
+            params = {"q": "demonstrates"}
+            cursor = None
+            for _ in range(args.pages):
+                _, cursor = call(db, params, cursor)
+            durations = []
+            for _ in range(args.repeat):
+                begin = time.perf_counter()
+                hits, _ = call(db, params, cursor)
+                durations.append(time.perf_counter() - begin)
+            timings[f"page {args.pages + 1} of '{params['q']}'"] = (len(hits), durations)
+
+            for label, (count, durations) in timings.items():
+                median = statistics.median(durations) * 1000
+                print(f"{label:32}{count:6}{min(durations) * 1000:7.2f} ms{median:7.2f} ms"
+                      f"{max(durations) * 1000:7.2f} ms")
+                if median > args.budget_ms:
+                    over_budget.append(label)
+        engine.dispose()
+
+    if over_budget:
+        print(f"over {args.budget_ms} ms: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
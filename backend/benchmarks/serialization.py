@@ -0,0 +1,132 @@
+"""
+Per-request CPU cost of GET /sessions/{session_id} serialization.
+
+Builds a session of about 5k observations and serves it through the API and
+through the previous implementation (ORM objects loaded with selectinload,
+encoded by jsonable_encoder and JSONResponse), checks both return the same
+JSON, then reports the CPU time per request and how it splits between
+building the response data and encoding it.
+
+    cd backend && python -m benchmarks.serialization --students 5 --exercises 22
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from fastapi import Depends, FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from app.database import Base, DBExercise, DBSession
+from app.main import SessionDetail, app, get_db, get_session, serialize_observation
+from app.ob_catalog import get_catalog
+from benchmarks.report import populate
+
+
+def legacy_session(session_id: int, db) -> dict:
+    """GET /sessions/{session_id} data as it was built from ORM objects."""
+    session = (
+        db.query(DBSession)
+        .options(
+            selectinload(DBSession.students),
+            selectinload(DBSession.exercises).selectinload(DBExercise.observations)
+        )
+        .filter(DBSession.id == session_id)
+        .first()
+    )
+    catalog = get_catalog(db, (obs.ob_id for ex in session.exercises for obs in ex.observations))
+    return {
+        "id": session.id,
+        "date": session.date,
+        "students": [{"name": student.name} for student in session.students],
+        "version": session.version or 0,
+        "exercises": [{
+            "id": ex.id,
+            "name": ex.name,
+            "date": ex.date,
+            "is_completed": ex.is_completed,
+            "competences": json.loads(ex.competences) if ex.competences else [],
+            "observations": [
+                serialize_observation(obs, catalog.entries[obs.ob_id], obs.student.name)
+                for obs in ex.observations
+            ]
+        } for ex in session.exercises]
+    }
+
+
+def cpu_ms(repeat, call):
+    """Best CPU time of call over repeat runs, in ms."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = call()
+        timings.append(time.process_time() - start)
+    return result, min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=5)
+    parser.add_argument("--exercises", type=int, default=22, help="exercises per student")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            session_id, _, count = populate(db, args.students, args.exercises)
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        legacy_app = FastAPI()
+
+        @legacy_app.get("/sessions/{session_id}")
+        def legacy_endpoint(session_id: int, db=Depends(override_get_db)):
+            return legacy_session(session_id, db)
+
+        app.dependency_overrides[get_db] = override_get_db
+        client = TestClient(app)
+        legacy_client = TestClient(legacy_app)
+        try:
+            path = f"/sessions/{session_id}"
+            legacy_response, legacy_request = cpu_ms(args.repeat, lambda: legacy_client.get(path))
+            response, request = cpu_ms(args.repeat, lambda: client.get(path))
+            compact_response, compact_request = cpu_ms(args.repeat, lambda: client.get(path, params={"compact": True}))
+            assert legacy_response.json() == response.json(), "session JSON differs from the legacy endpoint"
+
+            # The same requests split into building the data and encoding it
+            with Session() as db:
+                legacy_data, legacy_build = cpu_ms(args.repeat, lambda: legacy_session(session_id, db))
+                data, build = cpu_ms(args.repeat, lambda: get_session(session_id, compact=False, db=db))
+            _, legacy_encode = cpu_ms(args.repeat, lambda: JSONResponse(jsonable_encoder(legacy_data)).body)
+            _, encode = cpu_ms(args.repeat, lambda: app.router.default_response_class(
+                SessionDetail.model_validate(data).model_dump(mode="json")
+            ).body)
+        finally:
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+    print(f"session of {count} observations, {len(response.content) // 1024} KiB "
+          f"({len(compact_response.content) // 1024} KiB compact), CPU per request:")
+    print(f"  {'':28s} {'request':>9s} {'build':>9s} {'encode':>9s}")
+    print(f"  {'ORM + jsonable_encoder':28s} {legacy_request:7.1f}ms {legacy_build:7.1f}ms {legacy_encode:7.1f}ms")
+    print(f"  {'rows + response model':28s} {request:7.1f}ms {build:7.1f}ms {encode:7.1f}ms")
+    print(f"  {'rows + response model, compact':28s} {compact_request:7.1f}ms")
+    print(f"  speedup: {legacy_request / request:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Query-count regression check and timing for GET /sessions/{session_id}.
+
+Loads sessions of growing size through the API and fails if the number of
+SQL statements grows with the number of exercises (N+1 lazy loading).
+
+    cd backend && python -m benchmarks.session_fetch
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.main import app, get_db
+from benchmarks.report import populate
+
+# One query per level: session, students, exercises, observations
+MAX_QUERIES = 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        client = TestClient(app)
+        try:
+            for exercises in (1, 10, 40):
+                with Session() as db:
+                    session_id, _, count = populate(db, args.students, exercises)
+
+                timings = []
+                for _ in range(args.repeat):
+                    statements.clear()
+                    start = time.perf_counter()
+                    response = client.get(f"/sessions/{session_id}")
+                    timings.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                queries = len(statements)
+
+                status = "ok" if queries <= MAX_QUERIES else "FAIL"
+                failed = failed or queries > MAX_QUERIES
+                print(f"{args.students * exercises:5d} exercises {count:6d} observations: "
+                      f"{queries} queries, {min(timings) * 1000:8.1f} ms  {status}")
+        finally:
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+    if failed:
+        print(f"GET /sessions/{{id}} must not issue more than {MAX_QUERIES} queries", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark of GET /sessions/ on a large history.
+
+Fills a database at the latest migration with --sessions sessions (100k by
+default) and times the unpaginated listing the endpoint used to return, the
+first keyset page, a page deep into the history, the student and date
+filters and the summary projection, and compares the deep page query with
+its OFFSET equivalent.
+Prints SQLite's query plan of each paginated query.
+
+    cd backend && python -m benchmarks.session_list --sessions 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from app.database import DBSession, DBStudent, init_db, session_students
+from app.main import app, get_db, encode_session_cursor
+
+
+def populate(engine, sessions, students, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(DBStudent), [{"name": f"Student {i}"} for i in range(students)])
+        connection.execute(insert(DBSession), [{
+            "date": start + timedelta(minutes=30 * n + rng.randint(0, 20)),
+            "competences": ""
+        } for n in range(sessions)])
+        connection.execute(insert(session_students), [
+            {"session_id": session_id, "student_id": student_id, "position": position}
+            for session_id in range(1, sessions + 1)
+            for position, student_id in enumerate(rng.sample(range(1, students + 1), rng.randint(1, 3)))
+        ])
+        connection.execute(text("ANALYZE"))
+
+
+def timed(repeat, call):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        start = time.perf_counter()
+        populate(engine, args.sessions, args.students)
+        print(f"{args.sessions} sessions, {args.students} students, populated in {time.perf_counter() - start:.1f} s")
+        Session = sessionmaker(bind=engine)
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *a: statements.append((a[2], a[3])))
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        client = TestClient(app)
+        try:
+            def unpaginated():
+                with Session() as db:
+                    sessions = db.query(DBSession).options(selectinload(DBSession.students)).all()
+                    return [{
+                        "id": session.id,
+                        "date": session.date,
+                        "students": [{"name": student.name} for student in session.students]
+                    } for session in sessions]
+
+            listed, elapsed = timed(1, unpaginated)
+            print(f"unpaginated listing ({len(listed)} sessions)    {elapsed:9.2f} ms")
+
+            with Session() as db:
+                deep = db.query(DBSession).order_by(DBSession.date.desc(), DBSession.id.desc()).offset(
+                    args.sessions * 9 // 10 - 1
+                ).first()
+            cases = {
+                "first page": {},
+                "page at 90%": {"cursor": encode_session_cursor(deep)},
+                "student filter": {"student": "Student 7"},
+                "date range": {"date_from": "2025-01-01T00:00:00", "date_to": "2025-02-01T00:00:00"},
+                "summary page": {"summary": True},
+                "summary at 90%": {"summary": True, "cursor": encode_session_cursor(deep)},
+            }
+            plans = {}
+            for name, params in cases.items():
+                statements.clear()
+                response, elapsed = timed(args.repeat, lambda: client.get("/sessions/", params={"limit": 50, **params}))
+                response.raise_for_status()
+                plans[name] = statements[0]
+                print(f"{name:36s} {elapsed:9.2f} ms  {len(response.json())} sessions"
+                      f"{'  next cursor' if 'X-Next-Cursor' in response.headers else ''}")
+
+            # The same deep page as plain SQL, by keyset and by OFFSET
+            with engine.connect() as connection:
+                deep_date = connection.execute(
+                    text("SELECT date FROM sessions WHERE id = :id"), {"id": deep.id}
+                ).scalar_one()
+                for name, sql, params in (
+                    ("keyset SQL at 90%",
+                     "SELECT id, date FROM sessions WHERE (date, id) < (:date, :id) "
+                     "ORDER BY date DESC, id DESC LIMIT 50",
+                     {"date": deep_date, "id": deep.id}),
+                    ("OFFSET SQL at 90%",
+                     "SELECT id, date FROM sessions ORDER BY date DESC, id DESC LIMIT 50 OFFSET :offset",
+                     {"offset": args.sessions * 9 // 10}),
+                ):
+                    _, elapsed = timed(args.repeat, lambda: connection.execute(text(sql), params).all())
+                    print(f"{name:36s} {elapsed:9.2f} ms")
+
+            print("query plans:")
+            with engine.connect() as connection:
+                for name, (sql, parameters) in plans.items():
+                    print(f"  {name}:")
+                    for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, parameters):
+                        print(f"      {row[-1]}")
+        finally:
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
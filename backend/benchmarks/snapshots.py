@@ -0,0 +1,99 @@
+"""
+Benchmark of exercise snapshots and of the session archive.
+
+Generates --sessions sessions with every exercise completed and frozen, then
+times the get_session and report handlers on one session with the
+snapshots, and again after dropping them so that the observation rows are
+read. It then archives the sessions older than the newest --keep, reports
+the archive compression ratio and the size of the hot observations table,
+and times reading an archived session.
+
+    cd backend && python -m benchmarks.snapshots --sessions 50 --exercises 10
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.database import (
+    DBArchivedSession, DBExerciseSnapshot, DBObservation, DBSession, create_db_engine, init_db
+)
+from app.main import get_session
+from app.report import build_session_report
+from app.snapshots import archive_sessions
+from benchmarks.generator import generate
+
+
+def best_of(repeat, call):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--students", type=int, default=4, help="students per session")
+    parser.add_argument("--exercises", type=int, default=10, help="exercises per student and session")
+    parser.add_argument("--keep", type=int, default=5, help="newest sessions left in the hot tables")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        dataset = generate(engine, args.sessions, args.students, args.exercises, completed=1.0)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        with Session() as db:
+            session = db.query(DBSession).order_by(DBSession.id.desc()).first()
+            students = session.students
+            observations = db.query(func.count(DBObservation.id)).filter(
+                DBObservation.exercise_id.in_([exercise.id for exercise in session.exercises])
+            ).scalar()
+
+            def measure():
+                _, full = best_of(args.repeat, lambda: get_session(session.id, False, db))
+                _, compact = best_of(args.repeat, lambda: get_session(session.id, True, db))
+                report, build = best_of(args.repeat, lambda: build_session_report(db, session.id, students, {}))
+                return full, compact, build, report
+
+            frozen = measure()
+            db.query(DBExerciseSnapshot).delete()
+            db.commit()
+            rows = measure()
+            assert frozen[3] == rows[3], "reports differ with and without snapshots"
+
+        print(f"{dataset.observations} observations, {observations} in the measured session")
+        print(f"{'':24}{'snapshots':>12}{'rows':>12}")
+        for label, with_snapshots, without in zip(
+            ("get_session", "get_session compact", "build_session_report"), frozen, rows
+        ):
+            print(f"{label:24}{with_snapshots:9.2f} ms{without:9.2f} ms")
+
+        with Session() as db:
+            newest = [date for date, in db.query(DBSession.date).order_by(DBSession.date.desc()).limit(args.keep)]
+            start = time.perf_counter()
+            archived = archive_sessions(db, min(newest))
+            elapsed = time.perf_counter() - start
+            hot = db.query(func.count(DBObservation.id)).scalar()
+            compressed = db.query(func.sum(func.length(DBArchivedSession.payload))).scalar()
+            archived_id = db.query(DBArchivedSession.session_id).first()[0]
+            _, read = best_of(args.repeat, lambda: get_session(archived_id, False, db))
+        engine.dispose()
+
+    print(f"archived {archived} sessions in {elapsed * 1000:.0f} ms, "
+          f"{compressed / archived / 1024:.1f} KiB per session compressed")
+    print(f"hot observations table: {dataset.observations} -> {hot} rows")
+    print(f"get_session, archived     {read:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
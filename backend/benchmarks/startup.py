@@ -0,0 +1,117 @@
+"""
+Benchmark of the API cold start.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+fails if a module that the API should only load lazily (torch, transformers,
+numpy, alembic) is imported. It then starts uvicorn in a subprocess on a new
+database and times the first responses, with migrations run at startup and
+with the database migrated beforehand by `python -m app.manage migrate`.
+
+    cd backend && python -m benchmarks.startup --runs 3 --budget-ms 3000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.load import free_port
+
+LAZY_MODULES = ("torch", "transformers", "numpy", "alembic")
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile():
+    """Cumulative import time of app.main and self time per top-level package, in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND, capture_output=True, text=True, check=True
+    )
+    total = 0
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_time)
+        if name == "app.main":
+            total = int(cumulative)
+    return total, packages
+
+
+def first_responses(url, migrate):
+    """Seconds from spawning uvicorn to the first /ob/catalog and /ob/match responses."""
+    env = dict(os.environ, DATABASE_URL=url, DB_MIGRATE_ON_STARTUP="1" if migrate else "0")
+    if not migrate:
+        subprocess.run([sys.executable, "-m", "app.manage", "migrate"], cwd=BACKEND, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            while True:
+                try:
+                    response = client.get("/ob/catalog")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError("uvicorn exited during startup")
+                    time.sleep(0.005)
+            response.raise_for_status()
+            catalog = time.perf_counter() - start
+            client.get("/ob/match", params={"text": "checklist"}).raise_for_status()
+            match = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return catalog, match
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="fail if the first response takes longer, migrated beforehand")
+    args = parser.parse_args()
+
+    total, packages = import_profile()
+    print(f"import app.main           {total / 1000:9.1f} ms")
+    for package, self_time in sorted(packages.items(), key=lambda item: -item[1])[:8]:
+        print(f"  {package:24}{self_time / 1000:9.1f} ms")
+    eager = [name for name in LAZY_MODULES if name in packages]
+
+    timings = {}
+    for migrate in (True, False):
+        runs = []
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as tmp:
+                runs.append(first_responses(f"sqlite:///{os.path.join(tmp, 'bench.db')}", migrate))
+        label = "migrate at startup" if migrate else "migrated beforehand"
+        catalog = statistics.median(run[0] for run in runs) * 1000
+        match = statistics.median(run[1] for run in runs) * 1000
+        timings[migrate] = catalog
+        print(f"{label:20} first response {catalog:7.0f} ms   first /ob/match {match:7.0f} ms")
+
+    failed = False
+    if eager:
+        print(f"imported at startup although loaded lazily: {', '.join(eager)}")
+        failed = True
+    if args.budget_ms is not None and timings[False] > args.budget_ms:
+        print(f"first response over budget: {timings[False]:.0f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
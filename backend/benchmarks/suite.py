@@ -0,0 +1,308 @@
+"""
+Synthetic-load benchmark suite for the API endpoints.
+
+Generates a seeded dataset with benchmarks.generator, then sends --requests
+requests per scenario and reports throughput, p50/p95/p99 latency and SQL
+statements per request as JSON. Two transports are available:
+
+- inprocess: sequential calls through TestClient, without sockets; the SQL
+  statements are counted per request.
+- uvicorn: --concurrency clients over HTTP to a uvicorn server on a local
+  port; the SQL statements are averaged over the scenario.
+
+Save the JSON of two commits and compare them:
+
+    cd backend && python -m benchmarks.suite --output before.json
+    cd backend && python -m benchmarks.suite --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import httpx
+import uvicorn
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DBExercise, DBObservation, DBSession, DBStudent, create_db_engine, init_db, session_students
+from app.main import app, get_db
+from app.taxonomy import TAXONOMY
+from benchmarks.generator import generate
+from benchmarks.load import free_port, percentile
+
+NOTES = ["checklist not completed", "late radio call", "overspeed on approach", "good crew briefing"]
+
+
+class Fixtures:
+    """Ids of the generated rows, to pick request targets from."""
+
+    def __init__(self, db, seed):
+        self.rng = random.Random(seed)
+        self.sessions = [session_id for session_id, in db.query(DBSession.id)]
+        self.students = {}
+        for session_id, name in db.query(session_students.c.session_id, DBStudent.name).join(
+            DBStudent, DBStudent.id == session_students.c.student_id
+        ):
+            self.students.setdefault(session_id, []).append(name)
+        self.observations = {}
+        for session_id, observation_id in db.query(DBExercise.session_id, DBObservation.id).join(DBExercise).filter(
+            DBExercise.is_completed.is_(False)
+        ):
+            self.observations.setdefault(session_id, []).append(observation_id)
+        self.open_sessions = sorted(self.observations)
+
+    def session(self):
+        return self.rng.choice(self.sessions)
+
+
+# Each scenario returns the method, URL and httpx arguments of one request
+def list_sessions(f):
+    return "GET", "/sessions/", {"params": {"limit": 50}}
+
+
+def list_sessions_by_student(f):
+    session_id = f.session()
+    return "GET", "/sessions/", {"params": {"limit": 50, "student": f.rng.choice(f.students[session_id])}}
+
+
+def get_session(f):
+    return "GET", f"/sessions/{f.session()}", {}
+
+
+def get_session_compact(f):
+    return "GET", f"/sessions/{f.session()}", {"params": {"compact": True}}
+
+
+def generate_report(f):
+    # Random safety scores make most requests miss the report cache
+    session_id = f.session()
+    scores = {name: f.rng.randint(1, 5) for name in f.students[session_id]}
+    return "GET", f"/sessions/{session_id}/report/", {"params": {"safety_scores": json.dumps(scores)}}
+
+
+def create_exercise(f):
+    session_id = f.session()
+    competences = f.rng.sample(list(TAXONOMY.competences), f.rng.randint(1, len(TAXONOMY.competences)))
+    return "POST", f"/sessions/{session_id}/exercises/", {"json": {
+        "name": "Benchmark exercise",
+        "student_name": f.rng.choice(f.students[session_id]),
+        "competences": competences
+    }}
+
+
+def toggle_observations(f):
+    session_id = f.rng.choice(f.open_sessions)
+    changes = [
+        {"observation_id": observation_id, "is_checked": f.rng.random() < 0.5}
+        for observation_id in f.rng.sample(f.observations[session_id], min(5, len(f.observations[session_id])))
+    ]
+    return "PATCH", f"/sessions/{session_id}/observations", {"json": {"changes": changes}}
+
+
+def cohort_analytics(f):
+    return "GET", "/analytics/cohort", {}
+
+
+def match_ob(f):
+    return "GET", "/ob/match", {"params": {"text": f.rng.choice(NOTES)}}
+
+
+SCENARIOS = {scenario.__name__: scenario for scenario in (
+    list_sessions, list_sessions_by_student, get_session, get_session_compact, generate_report,
+    create_exercise, toggle_observations, cohort_analytics, match_ob
+)}
+
+
+def summarize(latencies, elapsed, errors, queries, max_queries=None):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "queries_per_request": round(queries / len(latencies), 2),
+        "max_queries": max_queries
+    }
+
+
+def run_inprocess(scenario, fixtures, args, statements):
+    client = TestClient(app)
+    for _ in range(args.warmup):
+        method, url, kwargs = scenario(fixtures)
+        client.request(method, url, **kwargs)
+    latencies, counts, errors = [], [], 0
+    begin = time.perf_counter()
+    for _ in range(args.requests):
+        method, url, kwargs = scenario(fixtures)
+        before = statements[0]
+        start = time.perf_counter()
+        response = client.request(method, url, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        counts.append(statements[0] - before)
+        errors += response.status_code >= 400
+    return summarize(latencies, time.perf_counter() - begin, errors, sum(counts), max(counts))
+
+
+async def run_http(base_url, scenario, fixtures, args, statements):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        for _ in range(args.warmup):
+            method, url, kwargs = scenario(fixtures)
+            await client.request(method, url, **kwargs)
+
+        latencies, errors = [], 0
+        remaining = args.requests
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                method, url, kwargs = scenario(fixtures)
+                start = time.perf_counter()
+                response = await client.request(method, url, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code >= 400
+
+        before = statements[0]
+        begin = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - begin
+        return summarize(latencies, elapsed, errors, statements[0] - before)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline):
+    for key in ("transport", "concurrency", "database", "dataset"):
+        if result[key] != baseline.get(key):
+            print(f"warning: {key} differs from the baseline", file=sys.stderr)
+    print(f"{'scenario':26}{'p50 ms':>18}{'p99 ms':>18}{'req/s':>18}{'queries':>14}", file=sys.stderr)
+    for name, current in result["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        cells = [
+            f"{previous[key]:>8} -> {current[key]:<7}"
+            for key in ("p50_ms", "p99_ms", "throughput_rps")
+        ]
+        cells.append(f"{previous['queries_per_request']:>5} -> {current['queries_per_request']:<5}")
+        print(f"{name:26}" + "".join(cells), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="clients for the uvicorn transport")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--students", type=int, default=4, help="students per session")
+    parser.add_argument("--pool", type=int, default=40, help="students in the class")
+    parser.add_argument("--exercises", type=int, default=6, help="exercises per student and session")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=None, help="empty database to fill, a temporary SQLite file by default")
+    parser.add_argument("--output", default=None, help="write the JSON there instead of stdout")
+    parser.add_argument("--compare", default=None, help="JSON of a previous run to compare with")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        start = time.perf_counter()
+        dataset = generate(engine, args.sessions, args.students, args.exercises, args.pool, args.seed)
+        print(f"{dataset.observations} observations generated in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with Session() as db:
+            fixtures = Fixtures(db, args.seed)
+
+        statements = [0]
+
+        def count_statement(*_):
+            statements[0] += 1
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        event.listen(engine, "before_cursor_execute", count_statement)
+        app.dependency_overrides[get_db] = override_get_db
+        server = thread = None
+        scenarios = {}
+        try:
+            if args.transport == "uvicorn":
+                port = free_port()
+                # The lifespan would prepare the default database, not this one
+                server = uvicorn.Server(uvicorn.Config(
+                    app, host="127.0.0.1", port=port, log_level="warning", lifespan="off", backlog=4096
+                ))
+                thread = threading.Thread(target=server.run, daemon=True)
+                thread.start()
+                while not server.started:
+                    time.sleep(0.05)
+            for name in args.scenarios:
+                if args.transport == "uvicorn":
+                    scenarios[name] = asyncio.run(run_http(
+                        f"http://127.0.0.1:{port}", SCENARIOS[name], fixtures, args, statements
+                    ))
+                else:
+                    scenarios[name] = run_inprocess(SCENARIOS[name], fixtures, args, statements)
+                summary = scenarios[name]
+                print(f"{name:26} p50 {summary['p50_ms']:8.2f} ms  p99 {summary['p99_ms']:8.2f} ms  "
+                      f"{summary['throughput_rps']:8.1f} req/s  {summary['queries_per_request']:6.2f} queries",
+                      file=sys.stderr)
+        finally:
+            if server is not None:
+                server.should_exit = True
+                thread.join()
+            app.dependency_overrides.clear()
+            event.remove(engine, "before_cursor_execute", count_statement)
+            engine.dispose()
+
+    result = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": engine.dialect.name,
+        "transport": args.transport,
+        "concurrency": args.concurrency if args.transport == "uvicorn" else 1,
+        "dataset": {**dataset._asdict(), "students_per_session": args.students, "seed": args.seed},
+        "scenarios": scenarios
+    }
+    encoded = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(encoded + "\n")
+    else:
+        print(encoded)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(result, json.load(baseline))
+    if sum(summary["errors"] for summary in scenarios.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Load test: fan-out of session deltas to many WebSocket subscribers.
+
+Serves the app with uvicorn on a local port and connects --subscribers
+clients to /sessions/{id}/ws. A writer then toggles observations one PATCH
+at a time. The test checks that every subscriber receives every version in
+order, and reports the latency from sending the PATCH to each subscriber
+receiving its delta.
+
+    cd backend && python -m benchmarks.websocket --subscribers 500 --deltas 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+import websockets
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DBExercise, DBObservation, create_db_engine, init_db
+from app.main import app, get_db
+from benchmarks.load import free_port, percentile
+from benchmarks.report import populate
+
+
+async def subscriber(url, ready, received, done):
+    async with websockets.connect(url, max_queue=None) as socket:
+        hello = json.loads(await socket.recv())
+        assert hello["type"] == "subscribed", hello
+        ready.set()
+        while not done.is_set():
+            try:
+                message = await asyncio.wait_for(socket.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            event = json.loads(message)
+            received.append((event.get("version"), event["type"], time.perf_counter()))
+
+
+async def run(base_url, session_id, targets, args):
+    ws_url = base_url.replace("http", "ws") + f"/sessions/{session_id}/ws"
+    done = asyncio.Event()
+    readies = [asyncio.Event() for _ in range(args.subscribers)]
+    inboxes = [[] for _ in range(args.subscribers)]
+
+    start = time.perf_counter()
+    # Connect in waves, as a burst of handshakes would exceed the listen backlog
+    tasks = []
+    for first in range(0, args.subscribers, 100):
+        wave = range(first, min(first + 100, args.subscribers))
+        tasks += [asyncio.create_task(subscriber(ws_url, readies[n], inboxes[n], done)) for n in wave]
+        await asyncio.gather(*(readies[n].wait() for n in wave))
+    connect_time = time.perf_counter() - start
+
+    sent = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        session = (await client.get(f"/sessions/{session_id}", params={"compact": True})).json()
+        states = {obs["id"]: obs["is_checked"] for ex in session["exercises"] for obs in ex["observations"]}
+        for n in range(args.deltas):
+            _, observation_id = targets[n % len(targets)]
+            states[observation_id] = not states[observation_id]
+            start = time.perf_counter()
+            response = await client.patch(f"/sessions/{session_id}/observations", json={
+                "changes": [{"observation_id": observation_id, "is_checked": states[observation_id]}]
+            })
+            response.raise_for_status()
+            sent[response.json()["version"]] = start
+            await asyncio.sleep(args.interval)
+
+    # Let the last deltas arrive
+    deadline = time.perf_counter() + 10
+    last = max(sent)
+    while time.perf_counter() < deadline and not all(inbox and inbox[-1][0] == last for inbox in inboxes):
+        await asyncio.sleep(0.05)
+    done.set()
+    await asyncio.gather(*tasks)
+    return connect_time, sent, inboxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--deltas", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.02, help="pause between writes, in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with Session() as db:
+            session_id, _, count = populate(db, 2, 3)
+            targets = db.query(DBObservation.exercise_id, DBObservation.id).join(DBExercise).filter(
+                DBExercise.session_id == session_id
+            ).all()
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        try:
+            connect_time, sent, inboxes = asyncio.run(run(f"http://127.0.0.1:{port}", session_id, targets, args))
+        finally:
+            server.should_exit = True
+            thread.join()
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+    expected = sorted(sent)
+    latencies = []
+    failures = 0
+    for inbox in inboxes:
+        versions = [version for version, kind, _ in inbox if kind == "observations"]
+        if versions != expected:
+            failures += 1
+        latencies += [received - sent[version] for version, _, received in inbox if version in sent]
+
+    print(f"{args.subscribers} subscribers connected in {connect_time * 1000:.0f} ms, {args.deltas} deltas")
+    print(f"delivered {len(latencies)} / {args.subscribers * args.deltas}, "
+          f"{failures} subscribers with missing or reordered deltas")
+    if latencies:
+        print(f"PATCH -> delta received  p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  max {max(latencies) * 1000:7.1f} ms")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""initial schema
+
+Creates the tables as they were before migrations were introduced. Databases
+created by the former Base.metadata.create_all() already have them and are
+left untouched, so they upgrade in place.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "sessions" not in existing:
+        op.create_table(
+            "sessions",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("date", sa.DateTime(), nullable=True),
+            sa.Column("competences", sa.String(), nullable=True),
+            sa.Column("students_data", sa.Text(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_sessions_id", "sessions", ["id"])
+
+    if "exercises" not in existing:
+        op.create_table(
+            "exercises",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=True),
+            sa.Column("session_id", sa.Integer(), nullable=True),
+            sa.Column("date", sa.DateTime(), nullable=True),
+            sa.Column("is_completed", sa.Boolean(), nullable=True),
+            sa.Column("competences", sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(["session_id"], ["sessions.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_exercises_id", "exercises", ["id"])
+
+    if "observations" not in existing:
+        op.create_table(
+            "observations",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("text", sa.String(), nullable=True),
+            sa.Column("timestamp", sa.DateTime(), nullable=True),
+            sa.Column("ob_code", sa.String(), nullable=True),
+            sa.Column("competence", sa.String(), nullable=True),
+            sa.Column("student_name", sa.String(), nullable=False),
+            sa.Column("exercise_id", sa.Integer(), nullable=True),
+            sa.Column("is_checked", sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(["exercise_id"], ["exercises.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_observations_id", "observations", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_observations_id", table_name="observations")
+    op.drop_table("observations")
+    op.drop_index("ix_exercises_id", table_name="exercises")
+    op.drop_table("exercises")
+    op.drop_index("ix_sessions_id", table_name="sessions")
+    op.drop_table("sessions")
@@ -0,0 +1,39 @@
+"""secondary indexes
+
+Indexes the foreign keys used to load a session and the report's access
+pattern. ix_observations_report orders each exercise's rows by student and
+competence with is_checked included, and its exercise_id prefix also serves
+the per-exercise observation loads.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_exercises_session_id", "exercises", ["session_id"])
+    op.create_index("ix_observations_student_name", "observations", ["student_name"])
+    op.create_index(
+        "ix_observations_report",
+        "observations",
+        ["exercise_id", "student_name", "competence", "is_checked"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_observations_report", table_name="observations")
+    op.drop_index("ix_observations_student_name", table_name="observations")
+    op.drop_index("ix_exercises_session_id", table_name="exercises")
@@ -0,0 +1,141 @@
+"""students table
+
+Replaces the JSON roster in sessions.students_data with a students table and
+a session_students association, and observations.student_name with an
+integer student_id. Existing rows are converted.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+sessions = sa.table("sessions", sa.column("id", sa.Integer), sa.column("students_data", sa.Text))
+observations = sa.table(
+    "observations",
+    sa.column("student_name", sa.String),
+    sa.column("student_id", sa.Integer),
+)
+students = sa.table("students", sa.column("id", sa.Integer), sa.column("name", sa.String))
+session_students = sa.table(
+    "session_students",
+    sa.column("session_id", sa.Integer),
+    sa.column("student_id", sa.Integer),
+    sa.column("position", sa.Integer),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    op.create_table(
+        "students",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_students_id", "students", ["id"])
+    op.create_index("ix_students_name", "students", ["name"], unique=True)
+    op.create_table(
+        "session_students",
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["session_id"], ["sessions.id"]),
+        sa.ForeignKeyConstraint(["student_id"], ["students.id"]),
+        sa.PrimaryKeyConstraint("session_id", "student_id"),
+    )
+
+    # Students get ids in order of first appearance, rosters first
+    student_ids = {}
+    members = []
+    rosters = bind.execute(sa.select(sessions.c.id, sessions.c.students_data).order_by(sessions.c.id))
+    for session_id, students_data in rosters:
+        names = [student["name"] for student in json.loads(students_data)] if students_data else []
+        for position, name in enumerate(dict.fromkeys(names)):
+            student_id = student_ids.setdefault(name, len(student_ids) + 1)
+            members.append({"session_id": session_id, "student_id": student_id, "position": position})
+    for (name,) in bind.execute(sa.select(observations.c.student_name).distinct()):
+        student_ids.setdefault(name, len(student_ids) + 1)
+
+    if student_ids:
+        op.bulk_insert(students, [{"id": student_id, "name": name} for name, student_id in student_ids.items()])
+        if bind.dialect.name == "postgresql":
+            # Explicit ids do not advance the serial sequence
+            bind.execute(sa.text("SELECT setval(pg_get_serial_sequence('students', 'id'), max(id)) FROM students"))
+    if members:
+        op.bulk_insert(session_students, members)
+
+    op.drop_index("ix_observations_report", table_name="observations")
+    op.drop_index("ix_observations_student_name", table_name="observations")
+    op.add_column("observations", sa.Column("student_id", sa.Integer(), nullable=True))
+    bind.execute(observations.update().values(student_id=(
+        sa.select(students.c.id)
+        .where(students.c.name == observations.c.student_name)
+        .scalar_subquery()
+    )))
+    with op.batch_alter_table("observations") as batch_op:
+        batch_op.alter_column("student_id", existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key("fk_observations_student_id_students", "students", ["student_id"], ["id"])
+        batch_op.drop_column("student_name")
+    op.create_index("ix_observations_student_id", "observations", ["student_id"])
+    op.create_index(
+        "ix_observations_report",
+        "observations",
+        ["exercise_id", "student_id", "competence", "is_checked"],
+    )
+
+    with op.batch_alter_table("sessions") as batch_op:
+        batch_op.drop_column("students_data")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    op.add_column("sessions", sa.Column("students_data", sa.Text(), nullable=True))
+    rosters = {}
+    members = bind.execute(
+        sa.select(session_students.c.session_id, students.c.name)
+        .join(students, students.c.id == session_students.c.student_id)
+        .order_by(session_students.c.session_id, session_students.c.position)
+    )
+    for session_id, name in members:
+        rosters.setdefault(session_id, []).append({"name": name})
+    for session_id, roster in rosters.items():
+        bind.execute(sessions.update().where(sessions.c.id == session_id).values(students_data=json.dumps(roster)))
+
+    op.drop_index("ix_observations_report", table_name="observations")
+    op.drop_index("ix_observations_student_id", table_name="observations")
+    op.add_column("observations", sa.Column("student_name", sa.String(), nullable=True))
+    bind.execute(observations.update().values(student_name=(
+        sa.select(students.c.name)
+        .where(students.c.id == observations.c.student_id)
+        .scalar_subquery()
+    )))
+    with op.batch_alter_table("observations") as batch_op:
+        batch_op.alter_column("student_name", existing_type=sa.String(), nullable=False)
+        batch_op.drop_constraint("fk_observations_student_id_students", type_="foreignkey")
+        batch_op.drop_column("student_id")
+    op.create_index("ix_observations_student_name", "observations", ["student_name"])
+    op.create_index(
+        "ix_observations_report",
+        "observations",
+        ["exercise_id", "student_name", "competence", "is_checked"],
+    )
+
+    op.drop_table("session_students")
+    op.drop_index("ix_students_name", table_name="students")
+    op.drop_index("ix_students_id", table_name="students")
+    op.drop_table("students")
@@ -0,0 +1,77 @@
+"""competence scores
+
+Adds the competence_scores table holding checked/total observation counts
+and the distinct observations listed in the report per (session, student,
+competence), filled from the existing observations.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "competence_scores",
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column("competence", sa.String(), nullable=False),
+        sa.Column("checked", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("observations", sa.Text(), server_default="[]", nullable=False),
+        sa.ForeignKeyConstraint(["session_id"], ["sessions.id"]),
+        sa.ForeignKeyConstraint(["student_id"], ["students.id"]),
+        sa.PrimaryKeyConstraint("session_id", "student_id", "competence"),
+    )
+    op.execute(
+        "INSERT INTO competence_scores (session_id, student_id, competence, checked, total) "
+        "SELECT exercises.session_id, observations.student_id, observations.competence, "
+        "sum(CASE WHEN observations.is_checked THEN 1 ELSE 0 END), count(observations.id) "
+        "FROM observations JOIN exercises ON observations.exercise_id = exercises.id "
+        "WHERE observations.competence IS NOT NULL AND observations.competence != '' "
+        "GROUP BY exercises.session_id, observations.student_id, observations.competence"
+    )
+
+    # Distinct (text, ob_code) pairs in first-seen order
+    listings = {}
+    rows = op.get_bind().execute(sa.text(
+        "SELECT exercises.session_id, observations.student_id, observations.competence, "
+        "observations.text, observations.ob_code "
+        "FROM observations JOIN exercises ON observations.exercise_id = exercises.id "
+        "WHERE observations.competence IS NOT NULL AND observations.competence != '' "
+        "GROUP BY exercises.session_id, observations.student_id, observations.competence, "
+        "observations.text, observations.ob_code "
+        "ORDER BY min(observations.id)"
+    ))
+    for session_id, student_id, competence, text, ob_code in rows:
+        listings.setdefault((session_id, student_id, competence), []).append([text, ob_code])
+    if listings:
+        op.get_bind().execute(
+            sa.text(
+                "UPDATE competence_scores SET observations = :observations "
+                "WHERE session_id = :session_id AND student_id = :student_id AND competence = :competence"
+            ),
+            [{
+                "session_id": session_id,
+                "student_id": student_id,
+                "competence": competence,
+                "observations": json.dumps(observations)
+            } for (session_id, student_id, competence), observations in listings.items()]
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("competence_scores")
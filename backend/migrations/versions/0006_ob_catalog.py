@@ -0,0 +1,123 @@
+"""ob catalog
+
+Moves observation texts, OB codes and competences into the ob_catalog table.
+Observations keep only the id of their catalog entry; entries are created in
+order of first appearance.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+observations = sa.table(
+    "observations",
+    sa.column("id", sa.Integer),
+    sa.column("text", sa.String),
+    sa.column("ob_code", sa.String),
+    sa.column("competence", sa.String),
+    sa.column("ob_id", sa.Integer),
+)
+ob_catalog = sa.table(
+    "ob_catalog",
+    sa.column("id", sa.Integer),
+    sa.column("text", sa.String),
+    sa.column("ob_code", sa.String),
+    sa.column("competence", sa.String),
+)
+
+
+def _same(left, right):
+    # NULL-safe equality that works on both SQLite and PostgreSQL
+    return sa.func.coalesce(left, "") == sa.func.coalesce(right, "")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    op.create_table(
+        "ob_catalog",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("text", sa.String(), nullable=False),
+        sa.Column("ob_code", sa.String(), nullable=True),
+        sa.Column("competence", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("text", "ob_code", "competence", name="uq_ob_catalog_entry"),
+    )
+
+    entries = bind.execute(
+        sa.select(
+            sa.func.coalesce(observations.c.text, ""),
+            observations.c.ob_code,
+            observations.c.competence,
+        )
+        .group_by(sa.func.coalesce(observations.c.text, ""), observations.c.ob_code, observations.c.competence)
+        .order_by(sa.func.min(observations.c.id))
+    ).all()
+    if entries:
+        op.bulk_insert(ob_catalog, [
+            {"text": text, "ob_code": ob_code, "competence": competence}
+            for text, ob_code, competence in entries
+        ])
+
+    op.drop_index("ix_observations_report", table_name="observations")
+    op.add_column("observations", sa.Column("ob_id", sa.Integer(), nullable=True))
+    bind.execute(observations.update().values(ob_id=(
+        sa.select(ob_catalog.c.id)
+        .where(
+            ob_catalog.c.text == sa.func.coalesce(observations.c.text, ""),
+            _same(ob_catalog.c.ob_code, observations.c.ob_code),
+            _same(ob_catalog.c.competence, observations.c.competence),
+        )
+        .limit(1)
+        .scalar_subquery()
+    )))
+    with op.batch_alter_table("observations") as batch_op:
+        batch_op.alter_column("ob_id", existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key("fk_observations_ob_id_ob_catalog", "ob_catalog", ["ob_id"], ["id"])
+        batch_op.drop_column("text")
+        batch_op.drop_column("ob_code")
+        batch_op.drop_column("competence")
+    op.create_index("ix_observations_ob_id", "observations", ["ob_id"])
+    op.create_index(
+        "ix_observations_report",
+        "observations",
+        ["exercise_id", "student_id", "ob_id", "is_checked"],
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    op.drop_index("ix_observations_report", table_name="observations")
+    op.drop_index("ix_observations_ob_id", table_name="observations")
+    op.add_column("observations", sa.Column("text", sa.String(), nullable=True))
+    op.add_column("observations", sa.Column("ob_code", sa.String(), nullable=True))
+    op.add_column("observations", sa.Column("competence", sa.String(), nullable=True))
+    for column in ("text", "ob_code", "competence"):
+        bind.execute(observations.update().values({column: (
+            sa.select(ob_catalog.c[column])
+            .where(ob_catalog.c.id == observations.c.ob_id)
+            .scalar_subquery()
+        )}))
+    with op.batch_alter_table("observations") as batch_op:
+        batch_op.drop_constraint("fk_observations_ob_id_ob_catalog", type_="foreignkey")
+        batch_op.drop_column("ob_id")
+    op.create_index(
+        "ix_observations_report",
+        "observations",
+        ["exercise_id", "student_id", "competence", "is_checked"],
+    )
+
+    op.drop_table("ob_catalog")
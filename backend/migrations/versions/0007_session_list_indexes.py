@@ -0,0 +1,33 @@
+"""session list indexes
+
+Indexes the keyset-paginated session list: sessions by (date, id) and the
+sessions of a student.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Pagination compares (date, id) row values, which NULL dates would drop
+    op.execute(sa.text("UPDATE sessions SET date = CURRENT_TIMESTAMP WHERE date IS NULL"))
+    op.create_index("ix_sessions_date_id", "sessions", ["date", "id"])
+    op.create_index("ix_session_students_student_id", "session_students", ["student_id", "session_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_session_students_student_id", table_name="session_students")
+    op.drop_index("ix_sessions_date_id", table_name="sessions")
@@ -0,0 +1,93 @@
+"""exercise snapshots and session archive
+
+Adds exercise_snapshots, holding the frozen observations of completed
+exercises, filled for the exercises already completed, and
+archived_sessions, holding sessions moved out of the hot tables.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import orjson
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+exercises = sa.table(
+    "exercises",
+    sa.column("id", sa.Integer),
+    sa.column("is_completed", sa.Boolean),
+)
+observations = sa.table(
+    "observations",
+    sa.column("id", sa.Integer),
+    sa.column("exercise_id", sa.Integer),
+    sa.column("ob_id", sa.Integer),
+    sa.column("timestamp", sa.DateTime),
+    sa.column("is_checked", sa.Boolean),
+    sa.column("student_id", sa.Integer),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    snapshots = op.create_table(
+        "exercise_snapshots",
+        sa.Column("exercise_id", sa.Integer(), nullable=False),
+        sa.Column("observations", sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(["exercise_id"], ["exercises.id"]),
+        sa.PrimaryKeyConstraint("exercise_id"),
+    )
+    op.create_table(
+        "archived_sessions",
+        sa.Column("session_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("date", sa.DateTime(), nullable=True),
+        sa.Column("competences", sa.String(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.Column("students", sa.Text(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("session_id"),
+    )
+    op.create_index("ix_archived_sessions_date_id", "archived_sessions", ["date", "session_id"])
+
+    # Same layout as app.snapshots.build_snapshots
+    rows = bind.execute(
+        sa.select(
+            observations.c.exercise_id,
+            observations.c.id,
+            observations.c.ob_id,
+            observations.c.timestamp,
+            observations.c.is_checked,
+            observations.c.student_id,
+        )
+        .select_from(observations.join(exercises, observations.c.exercise_id == exercises.c.id))
+        .where(exercises.c.is_completed.is_(True))
+        .order_by(observations.c.exercise_id, observations.c.id)
+    )
+    frozen = {
+        exercise_id: [] for exercise_id, in
+        bind.execute(sa.select(exercises.c.id).where(exercises.c.is_completed.is_(True)))
+    }
+    for exercise_id, obs_id, ob_id, timestamp, is_checked, student_id in rows:
+        frozen[exercise_id].append((obs_id, ob_id, timestamp, is_checked, student_id))
+    if frozen:
+        op.bulk_insert(snapshots, [{
+            "exercise_id": exercise_id,
+            "observations": orjson.dumps(observation_rows).decode()
+        } for exercise_id, observation_rows in frozen.items()])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_archived_sessions_date_id", table_name="archived_sessions")
+    op.drop_table("archived_sessions")
+    op.drop_table("exercise_snapshots")
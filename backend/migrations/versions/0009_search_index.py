@@ -0,0 +1,98 @@
+"""observation search index
+
+Full-text indexes the catalog entries (text, OB code, competence) and the
+student names, which is everything searchable about an observation: SQLite
+gets FTS5 tables over ob_catalog and students, PostgreSQL a weighted
+tsvector column with a GIN index on each. Triggers keep them in sync with
+their table. Also indexes the observations of a student by OB.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> (indexed columns, PostgreSQL weights)
+INDEXED = {
+    "ob_catalog": (("text", "ob_code", "competence"), ("B", "A", "C")),
+    "students": (("name",), ("A",)),
+}
+
+
+def upgrade_sqlite() -> None:
+    for table, (columns, _) in INDEXED.items():
+        listed = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+        op.execute(sa.text(
+            f"CREATE VIRTUAL TABLE {table}_fts USING fts5({listed}, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        ))
+        op.execute(sa.text(
+            f"CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {table}_fts(rowid, {listed}) VALUES (new.id, {new}); END"
+        ))
+        op.execute(sa.text(
+            f"CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, {listed}) VALUES ('delete', old.id, {old}); END"
+        ))
+        op.execute(sa.text(
+            f"CREATE TRIGGER {table}_fts_update AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, {listed}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {table}_fts(rowid, {listed}) VALUES (new.id, {new}); END"
+        ))
+        op.execute(sa.text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+
+
+def upgrade_postgresql() -> None:
+    for table, (columns, weights) in INDEXED.items():
+        vector = " || ".join(
+            f"setweight(to_tsvector('simple', coalesce(new.{column}, '')), '{weight}')"
+            for column, weight in zip(columns, weights)
+        )
+        op.add_column(table, sa.Column("search", postgresql.TSVECTOR(), nullable=True))
+        op.execute(sa.text(
+            f"CREATE FUNCTION {table}_search() RETURNS trigger AS $$ "
+            f"BEGIN new.search := {vector}; RETURN new; END $$ LANGUAGE plpgsql"
+        ))
+        op.execute(sa.text(
+            f"CREATE TRIGGER {table}_search BEFORE INSERT OR UPDATE OF {', '.join(columns)} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_search()"
+        ))
+        # Fire the trigger on the existing rows
+        op.execute(sa.text(f"UPDATE {table} SET {columns[0]} = {columns[0]}"))
+        op.create_index(f"ix_{table}_search", table, ["search"], postgresql_using="gin")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        upgrade_postgresql()
+    else:
+        upgrade_sqlite()
+    op.create_index("ix_observations_student_ob", "observations", ["student_id", "ob_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_observations_student_ob", table_name="observations")
+    for table in INDEXED:
+        if op.get_bind().dialect.name == "postgresql":
+            op.drop_index(f"ix_{table}_search", table_name=table)
+            op.execute(sa.text(f"DROP TRIGGER {table}_search ON {table}"))
+            op.execute(sa.text(f"DROP FUNCTION {table}_search()"))
+            op.drop_column(table, "search")
+        else:
+            for action in ("insert", "delete", "update"):
+                op.execute(sa.text(f"DROP TRIGGER {table}_fts_{action}"))
+            op.execute(sa.text(f"DROP TABLE {table}_fts"))
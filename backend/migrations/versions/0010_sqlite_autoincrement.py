@@ -0,0 +1,68 @@
+"""never reuse session, exercise and observation ids on SQLite
+
+Without AUTOINCREMENT, SQLite hands out max(id) + 1, so once archiving has
+deleted the newest rows their ids went to new sessions, which then shadowed
+the archived ones and made them impossible to restore. The three tables are
+rebuilt with AUTOINCREMENT and their sequences start past every archived id.
+PostgreSQL sequences never hand out an id twice.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import orjson
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("sessions", "exercises", "observations")
+
+archived_sessions = sa.table(
+    "archived_sessions",
+    sa.column("session_id", sa.Integer),
+    sa.column("payload", sa.LargeBinary),
+)
+
+
+def rebuild(autoincrement: bool) -> None:
+    for table in TABLES:
+        with op.batch_alter_table(table, recreate="always", table_kwargs={"sqlite_autoincrement": autoincrement}):
+            pass
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    rebuild(True)
+
+    # Same layout as app.snapshots.archive_session
+    highest = dict.fromkeys(TABLES, 0)
+    for session_id, payload in bind.execute(sa.select(archived_sessions.c.session_id, archived_sessions.c.payload)):
+        archived = orjson.loads(zlib.decompress(payload))
+        highest["sessions"] = max(highest["sessions"], session_id)
+        for exercise in archived["exercises"]:
+            highest["exercises"] = max(highest["exercises"], exercise[0])
+            highest["observations"] = max([highest["observations"]] + [row[0] for row in exercise[5]])
+    for table, seq in highest.items():
+        bind.execute(sa.text("DELETE FROM sqlite_sequence WHERE name = :name AND seq < :seq"), {"name": table, "seq": seq})
+        bind.execute(
+            sa.text("INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"),
+            {"name": table, "seq": seq}
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        rebuild(False)
@@ -0,0 +1,36 @@
+"""drop exercise_snapshots.counts
+
+The per-student and competence counts stored with each snapshot were
+never read: reports and analytics use competence_scores. Migration 0008
+no longer creates the column, so only databases migrated before that
+change have it to drop.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("exercise_snapshots")}
+    if "counts" in columns:
+        with op.batch_alter_table("exercise_snapshots") as batch:
+            batch.drop_column("counts")
+
+
+def downgrade() -> None:
+    # Emptied counts; app.snapshots no longer reads or writes them
+    with op.batch_alter_table("exercise_snapshots") as batch:
+        batch.add_column(sa.Column("counts", sa.Text(), nullable=False, server_default="[]"))
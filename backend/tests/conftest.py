@@ -0,0 +1,76 @@
+import os
+import tempfile
+
+import pytest
+
+# app.database builds its default engine at import; keep it off simulator.db
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'simulator-tests.db')}")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import create_db_engine, init_db
+from app.main import app, get_db
+from app.taxonomy import TAXONOMY
+
+STUDENTS = ["Student A", "Student B", "Student C"]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    init_db(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    # Without the context manager the lifespan, which prepares the default
+    # database, does not run
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL statements executed on the test engine."""
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def create_session(client):
+    """
+    Create a session through the API with one exercise per student and
+    round, the first `completed` rounds completed. Returns the session id.
+    """
+    def create(exercises, completed=0, students=STUDENTS):
+        session_id = client.post("/sessions/", json={"students": [{"name": name} for name in students]}).json()["id"]
+        for n in range(exercises):
+            for name in students:
+                exercise = client.post(f"/sessions/{session_id}/exercises/", json={
+                    "name": f"Exercise {n + 1}", "student_name": name, "competences": list(TAXONOMY.competences)
+                }).json()
+                if n < completed:
+                    client.put(f"/exercises/{exercise['id']}/complete").raise_for_status()
+        return session_id
+
+    return create
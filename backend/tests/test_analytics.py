@@ -0,0 +1,42 @@
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+from app.analytics import get_cohort, load_cohort
+
+def rows(cohort, prefix):
+    columns = ["student", "session", "competence" if prefix == "score" else "id", "checked", "total"]
+    return sorted(zip(*(getattr(cohort, f"{prefix}_{column}").tolist() for column in columns)))
+
+
+def assert_same_cohort(cached, loaded):
+    # The row order within a session does not matter
+    assert cached.student_names == loaded.student_names
+    assert cached.competences == loaded.competences
+    assert np.array_equal(cached.session_ids, loaded.session_ids)
+    assert rows(cached, "score") == rows(loaded, "score")
+    assert rows(cached, "ob") == rows(loaded, "ob")
+
+
+def test_cohort_cache_reloads_only_changed_sessions(engine, client, statements, create_session):
+    first = create_session(2)
+    create_session(1)
+    with sessionmaker(bind=engine)() as db:
+        cohort = get_cohort(db)
+        assert_same_cohort(cohort, load_cohort(db))
+
+        statements.clear()
+        assert get_cohort(db) is cohort
+        # Only the versions of the live and archived sessions
+        assert len(statements) == 2
+
+        exercise = client.get(f"/sessions/{first}").json()["exercises"][0]
+        observation = exercise["observations"][0]
+        client.put(f"/exercises/{exercise['id']}/observations/{observation['id']}",
+                   json={"is_checked": True}).raise_for_status()
+        db.rollback()
+        statements.clear()
+        cohort = get_cohort(db)
+        # Only the toggled session's counts are read again
+        assert sum(" IN (" in statement for statement in statements) == 2
+        assert cohort.ob_checked.sum() == 1
+        assert_same_cohort(cohort, load_cohort(db))
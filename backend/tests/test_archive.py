@@ -0,0 +1,39 @@
+import orjson
+from sqlalchemy.orm import sessionmaker
+
+from app.snapshots import archive_session
+
+
+def export(client, name, **params):
+    response = client.get(f"/export/{name}", params=params)
+    response.raise_for_status()
+    return [orjson.loads(line) for line in response.content.splitlines()]
+
+
+def test_archived_sessions_stay_in_exports_and_analytics(engine, client, create_session):
+    session_ids = [create_session(2, completed=1) for _ in range(3)]
+    exercise = client.get(f"/sessions/{session_ids[1]}").json()["exercises"][-1]
+    for observation in exercise["observations"][::2]:
+        client.put(f"/exercises/{exercise['id']}/observations/{observation['id']}",
+                   json={"is_checked": True}).raise_for_status()
+
+    before = {
+        name: export(client, name) for name in ("observations", "reports")
+    }
+    analytics = client.get("/analytics/cohort").json()
+    assert any(row["is_checked"] for row in before["observations"])
+
+    with sessionmaker(bind=engine)() as db:
+        assert archive_session(db, session_ids[1])
+        db.commit()
+
+    for name, rows in before.items():
+        assert export(client, name) == rows
+        assert export(client, name, include_archived=False) == [
+            row for row in rows if row["session_id"] != session_ids[1]
+        ]
+        assert export(client, name, student="Student B") == [
+            row for row in rows if row["student_name"] == "Student B"
+        ]
+    assert client.get("/analytics/cohort").json() == analytics
+    assert client.get("/analytics/cohort", params={"include_archived": False}).json()["sessions"] == 2
@@ -0,0 +1,86 @@
+import csv
+import io
+from datetime import datetime
+
+import orjson
+import pytest
+from sqlalchemy import func, select, update
+
+from app.database import DBObservation, DBSession
+from app.export import EXPORT_BATCH_SIZE, OBSERVATION_FIELDS
+
+DATES = [datetime(2024, 3, 1), datetime(2024, 1, 1), datetime(2024, 3, 1), datetime(2024, 2, 1)]
+
+
+@pytest.fixture
+def sessions(engine, client, create_session):
+    """Four sessions of a few thousand observations, dated out of id order, one date shared."""
+    session_ids = [create_session(3, completed=1) for _ in DATES]
+    with engine.begin() as connection:
+        for session_id, date in zip(session_ids, DATES):
+            connection.execute(update(DBSession).where(DBSession.id == session_id).values(date=date))
+    for session_id in session_ids[::2]:
+        exercise = client.get(f"/sessions/{session_id}").json()["exercises"][-1]
+        client.patch(f"/sessions/{session_id}/observations", json={"changes": [
+            {"observation_id": observation["id"], "is_checked": True}
+            for observation in exercise["observations"][::3]
+        ]}).raise_for_status()
+    return session_ids
+
+
+def export(client, export_format="ndjson", **params):
+    response = client.get("/export/observations", params={"format": export_format, **params})
+    assert response.status_code == 200
+    if export_format == "ndjson":
+        return [orjson.loads(line) for line in response.content.splitlines()]
+    reader = csv.reader(io.StringIO(response.content.decode()))
+    assert next(reader) == list(OBSERVATION_FIELDS)
+    return list(reader)
+
+
+def as_csv(row) -> list:
+    return ["" if value is None else str(value) for value in (row[field] for field in OBSERVATION_FIELDS)]
+
+
+def test_observations_stream_in_order(engine, client, sessions):
+    rows = export(client)
+
+    with engine.connect() as connection:
+        total = connection.execute(select(func.count()).select_from(DBObservation)).scalar()
+        checked = connection.execute(select(func.count()).where(DBObservation.is_checked.is_(True))).scalar()
+    assert len(rows) == total > 2 * EXPORT_BATCH_SIZE
+    assert len({row["observation_id"] for row in rows}) == total
+    assert sum(row["is_checked"] for row in rows) == checked > 0
+
+    # Session date, then id on equal dates, then exercise and observation
+    assert [row["session_id"] for row in rows[::len(rows) // 4]] == [sessions[1], sessions[3], sessions[0], sessions[2]]
+    keys = [(row["session_date"], row["session_id"], row["exercise_id"], row["observation_id"]) for row in rows]
+    assert keys == sorted(keys)
+
+    assert export(client, "csv") == [as_csv(row) for row in rows]
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_observation_filters(client, sessions, export_format):
+    rows = export(client)
+    date = OBSERVATION_FIELDS.index("session_date")
+    student = OBSERVATION_FIELDS.index("student_name")
+
+    def expected(keep):
+        kept = [row for row in rows if keep(row)]
+        return kept if export_format == "ndjson" else [as_csv(row) for row in kept]
+
+    filtered = export(client, export_format, date_from="2024-02-01T00:00:00", date_to="2024-03-01T00:00:00")
+    assert filtered == expected(lambda row: row["session_id"] == sessions[3])
+
+    filtered = export(client, export_format, date_from="2024-03-01T00:00:00")
+    assert filtered == expected(lambda row: row["session_id"] in (sessions[0], sessions[2]))
+
+    filtered = export(client, export_format, student="Student B", date_to="2024-03-01T00:00:00")
+    assert filtered == expected(lambda row: row["student_name"] == "Student B" and row["session_date"] < "2024-03-01")
+    assert filtered
+    if export_format == "csv":
+        assert {row[student] for row in filtered} == {"Student B"}
+        assert all(row[date] < "2024-03-01" for row in filtered)
+
+    assert export(client, export_format, student="Nobody") == []
@@ -0,0 +1,91 @@
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import main, metrics as metrics_module
+from app.metrics import Metrics, instrument
+
+
+@pytest.fixture
+def fresh_metrics(monkeypatch):
+    fresh = Metrics()
+    monkeypatch.setattr(metrics_module, "metrics", fresh)
+    monkeypatch.setattr(main, "metrics", fresh)
+    return fresh
+
+
+def samples(text):
+    """{(name, labels): value} of the Prometheus exposition."""
+    return {
+        (name, labels): float(value)
+        for name, labels, value in re.findall(r"^(\w+)\{(.*)\} (\S+)$", text, re.MULTILINE)
+    }
+
+
+def test_metrics_report_latency_statuses_and_sql_per_route(client, create_session, statements, fresh_metrics):
+    session_id = create_session(1)
+    statements.clear()
+    client.get(f"/sessions/{session_id}").raise_for_status()
+    client.get(f"/sessions/{session_id}").raise_for_status()
+    # Not found, in the live tables nor in the archive
+    assert client.get("/sessions/999999").status_code == 404
+    session_queries = len(statements)
+    assert client.get("/no/such/path").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    values = samples(response.text)
+    route = 'method="GET",route="/sessions/{session_id}"'
+    assert values[("http_request_duration_seconds_count", route)] == 3
+    assert values[("http_request_duration_seconds_bucket", route + ',le="+Inf"')] == 3
+    buckets = [value for (name, labels), value in values.items()
+               if name == "http_request_duration_seconds_bucket" and labels.startswith(route)]
+    assert buckets == sorted(buckets)
+    assert values[("http_responses_total", route + ',status="200"')] == 2
+    assert values[("http_responses_total", route + ',status="404"')] == 1
+    assert values[("http_responses_total", 'method="GET",route="unmatched",status="404"')] == 1
+    assert values[("db_queries_total", route)] == session_queries
+    assert values[("db_query_seconds_total", route)] > 0
+    assert re.search(r"^report_cache_entries \d+$", response.text, re.MULTILINE)
+
+
+def test_metrics_disabled_adds_no_middleware(monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_ENABLED", False)
+    app = FastAPI()
+    instrument(app)
+    assert app.user_middleware == []
+
+
+class BusyProfile:
+    """A profiler that cannot be enabled, as when another one is active on Python 3.12+."""
+
+    disabled = 0
+
+    def enable(self):
+        raise ValueError("Another profiling tool is already active")
+
+    def disable(self):
+        BusyProfile.disabled += 1
+
+
+def test_sampled_requests_run_unprofiled_when_the_profiler_is_busy(monkeypatch, fresh_metrics):
+    monkeypatch.setattr(metrics_module, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(metrics_module.cProfile, "Profile", BusyProfile)
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_endpoint():
+        return {"ok": True}
+
+    @app.get("/async")
+    async def async_endpoint():
+        return {"ok": True}
+
+    instrument(app)
+    client = TestClient(app)
+    assert client.get("/sync").json() == {"ok": True}
+    assert client.get("/async").json() == {"ok": True}
+    assert BusyProfile.disabled == 0
+    assert fresh_metrics.responses == {("GET", "/sync", 200): 1, ("GET", "/async", 200): 1}
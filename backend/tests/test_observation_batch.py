@@ -0,0 +1,86 @@
+from collections import Counter
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.aggregates import rebuild_scores
+from app.database import DBCompetenceScore
+
+
+def scores(engine):
+    with sessionmaker(bind=engine)() as db:
+        return {
+            (row.student_id, row.competence): (row.checked, row.total)
+            for row in db.execute(select(DBCompetenceScore)).scalars()
+        }
+
+
+def patch(client, session_id, changes):
+    return client.patch(f"/sessions/{session_id}/observations", json={"changes": [
+        {"observation_id": observation_id, "is_checked": is_checked} for observation_id, is_checked in changes
+    ]})
+
+
+def test_batch_applies_deltas_with_one_version_bump(engine, client, create_session):
+    session_id = create_session(1)
+    session = client.get(f"/sessions/{session_id}").json()
+    observations = [obs for exercise in session["exercises"] for obs in exercise["observations"]]
+    initial = scores(engine)
+
+    first, second, third = observations[0]["id"], observations[1]["id"], observations[-1]["id"]
+    # The later change to the same observation wins
+    response = patch(client, session_id, [(first, True), (second, True), (third, True), (second, False)])
+    response.raise_for_status()
+    result = response.json()
+    assert result["version"] == session["version"] + 1
+    assert [(obs["id"], obs["is_checked"]) for obs in result["observations"]] == sorted([(first, True), (third, True)])
+
+    # competence_scores moved by exactly the toggled observations, as a rebuild would count them
+    checked = Counter()
+    for obs in observations:
+        if obs["id"] in (first, third) and obs["competence"]:
+            checked[obs["competence"]] += 1
+    updated = scores(engine)
+    assert sum(c for c, _ in updated.values()) - sum(c for c, _ in initial.values()) == sum(checked.values())
+    with sessionmaker(bind=engine)() as db:
+        rebuild_scores(db)
+        db.commit()
+    assert scores(engine) == updated
+
+    # Nothing changes state: no version bump
+    response = patch(client, session_id, [(first, True)])
+    assert response.json() == {"session_id": session_id, "version": result["version"], "observations": []}
+
+
+def test_batch_rejects_unknown_and_foreign_observations(client, create_session):
+    session_id = create_session(1)
+    other = create_session(1)
+    foreign = client.get(f"/sessions/{other}").json()["exercises"][0]["observations"][0]["id"]
+    own = client.get(f"/sessions/{session_id}").json()["exercises"][0]["observations"][0]["id"]
+    version = client.get(f"/sessions/{session_id}").json()["version"]
+
+    response = patch(client, session_id, [(own, True), (foreign, True), (10 ** 9, True)])
+    assert response.status_code == 404
+    assert str(foreign) in response.json()["detail"] and str(10 ** 9) in response.json()["detail"]
+    assert patch(client, 10 ** 9, [(own, True)]).status_code == 404
+    # Rejected as a whole
+    session = client.get(f"/sessions/{session_id}").json()
+    assert session["version"] == version
+    assert not session["exercises"][0]["observations"][0]["is_checked"]
+
+
+def test_batch_touching_a_completed_exercise_is_rejected(client, create_session):
+    session_id = create_session(2, completed=1)
+    session = client.get(f"/sessions/{session_id}").json()
+    done = next(exercise for exercise in session["exercises"] if exercise["is_completed"])
+    open_ = next(exercise for exercise in session["exercises"] if not exercise["is_completed"])
+    frozen, free = done["observations"][0]["id"], open_["observations"][0]["id"]
+
+    response = patch(client, session_id, [(free, True), (frozen, True)])
+    assert response.status_code == 409
+    assert str(frozen) in response.json()["detail"]
+    # Rejected as a whole, the open exercise included
+    version = session["version"]
+    session = client.get(f"/sessions/{session_id}").json()
+    assert session["version"] == version
+    assert not any(obs["is_checked"] for exercise in session["exercises"] for obs in exercise["observations"])
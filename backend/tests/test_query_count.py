@@ -0,0 +1,30 @@
+import pytest
+
+# One query per level: session, students, exercises, observations
+MAX_SESSION_QUERIES = 4
+
+
+def count_queries(client, statements, url, **params):
+    statements.clear()
+    response = client.get(url, params=params)
+    response.raise_for_status()
+    return len(statements)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_get_session_query_count_is_bounded(client, statements, create_session, compact):
+    counts = []
+    for exercises in (1, 4, 12):
+        session_id = create_session(exercises, completed=exercises // 2)
+        counts.append(count_queries(client, statements, f"/sessions/{session_id}", compact=compact))
+    assert max(counts) <= MAX_SESSION_QUERIES, counts
+    # No query per exercise or per observation
+    assert len(set(counts)) == 1, counts
+
+
+def test_report_query_count_does_not_grow_with_exercises(client, statements, create_session):
+    counts = []
+    for exercises in (1, 4, 12):
+        session_id = create_session(exercises, completed=exercises // 2)
+        counts.append(count_queries(client, statements, f"/sessions/{session_id}/report/", safety_scores="{}"))
+    assert len(set(counts)) == 1, counts
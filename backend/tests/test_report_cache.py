@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from app.report_cache import report_cache
+
+SAFETY = json.dumps({"Student A": 4})
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    report_cache.clear()
+    yield
+    report_cache.clear()
+
+
+def report(client, session_id, **headers):
+    return client.get(f"/sessions/{session_id}/report/", params={"safety_scores": SAFETY}, headers=headers)
+
+
+def test_second_report_is_served_from_the_cache(client, create_session):
+    session_id = create_session(1)
+    first, second = report(client, session_id), report(client, session_id)
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert first.headers["ETag"] and first.headers["ETag"] == second.headers["ETag"]
+    stats = client.get("/metrics/report-cache").json()
+    assert (stats["misses"], stats["hits"], stats["size"]) == (1, 1, 1)
+
+
+def test_if_none_match_answers_304_until_the_session_changes(client, create_session):
+    session_id = create_session(1)
+    etag = report(client, session_id).headers["ETag"]
+
+    response = report(client, session_id, **{"If-None-Match": etag})
+    assert response.status_code == 304 and not response.content
+    assert response.headers["ETag"] == etag
+    assert report(client, session_id, **{"If-None-Match": f'"other", {etag}'}).status_code == 304
+    assert client.get("/metrics/report-cache").json()["not_modified"] == 2
+
+    exercise = client.get(f"/sessions/{session_id}").json()["exercises"][0]
+    observation = exercise["observations"][0]
+    client.put(f"/exercises/{exercise['id']}/observations/{observation['id']}",
+               json={"is_checked": True}).raise_for_status()
+    response = report(client, session_id, **{"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("write", ["toggle", "complete"])
+def test_writes_invalidate_the_cached_report(client, create_session, write):
+    session_id = create_session(1)
+    exercise = client.get(f"/sessions/{session_id}").json()["exercises"][0]
+    before = report(client, session_id)
+
+    if write == "toggle":
+        # Check every observation of the first student, so the grades change
+        client.patch(f"/sessions/{session_id}/observations", json={"changes": [
+            {"observation_id": observation["id"], "is_checked": True} for observation in exercise["observations"]
+        ]}).raise_for_status()
+    else:
+        client.put(f"/exercises/{exercise['id']}/complete").raise_for_status()
+    after = report(client, session_id)
+
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert client.get("/metrics/report-cache").json()["misses"] == 2
+    if write == "toggle":
+        assert after.json() != before.json()
+
+
+def test_equivalent_safety_scores_share_an_entry(client, create_session):
+    session_id = create_session(1)
+    # Students outside the session are ignored and missing ones default to 5
+    for scores in ({"Student A": 4}, {"Student A": 4, "Student B": 5, "Nobody": 1}):
+        client.get(f"/sessions/{session_id}/report/", params={"safety_scores": json.dumps(scores)}).raise_for_status()
+    stats = client.get("/metrics/report-cache").json()
+    assert (stats["misses"], stats["hits"]) == (1, 1)
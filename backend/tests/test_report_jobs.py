@@ -0,0 +1,93 @@
+import os
+import time
+
+import orjson
+import pytest
+
+from app import main
+from app.report_jobs import REPORT_JOB_STALE_MINUTES, ReportJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    queue = ReportJobQueue(str(tmp_path / "jobs"), workers=1, chunk_size=2)
+    monkeypatch.setattr(main, "report_jobs", queue)
+    yield queue
+    queue.shutdown()
+
+
+def wait(client, job_id):
+    deadline = time.monotonic() + 60
+    while True:
+        job = client.get(f"/reports/jobs/{job_id}").json()
+        if job["status"] != "running" or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_job_lines_follow_the_requested_order(client, create_session, queue):
+    sessions = [create_session(1, completed=1) for _ in range(3)]
+    requested = [sessions[2], 999999, sessions[0], sessions[1], sessions[2]]
+
+    job = client.post("/reports/jobs", json={
+        "sessions": [{"session_id": session_id, "safety_scores": {"Student A": 4}} for session_id in requested]
+    })
+    assert job.status_code == 202
+    job = job.json()
+    assert (job["status"], job["sessions"]) == ("running", 5)
+
+    job = wait(client, job["id"])
+    assert (job["status"], job["completed"], job["failed"]) == ("done", 5, 1)
+    assert job["finished_at"] is not None
+
+    result = client.get(f"/reports/jobs/{job['id']}/result")
+    assert result.status_code == 200
+    lines = [orjson.loads(line) for line in result.content.splitlines()]
+    assert [line["session_id"] for line in lines] == requested
+    assert lines[1] == {"session_id": 999999, "error": "Session not found"}
+    for session_id, line in zip(requested, lines):
+        if session_id != 999999:
+            assert line["report"] == client.get(
+                f"/sessions/{session_id}/report", params={"safety_scores": '{"Student A": 4}'}
+            ).json()
+    # Only the merged result is left next to the state
+    assert sorted(os.listdir(os.path.join(queue.directory, job["id"]))) == ["job.json", "result.ndjson"]
+
+
+def test_failed_chunk_keeps_the_other_chunks(engine, client, create_session, queue):
+    session_id = create_session(1)
+    database_url = engine.url.render_as_string(hide_password=False)
+    # The second chunk cannot be sent to the worker process
+    job = queue.submit(database_url, [(session_id, {}), (session_id, {}), (session_id, {"Student A": lambda: 4})])
+
+    job = wait(client, job["id"])
+    assert (job["status"], job["completed"], job["failed"]) == ("done", 3, 1)
+    lines = [orjson.loads(line) for line in client.get(f"/reports/jobs/{job['id']}/result").content.splitlines()]
+    assert [line["session_id"] for line in lines] == [session_id] * 3
+    assert "report" in lines[0] and "report" in lines[1]
+    assert lines[2] == {"session_id": session_id, "error": "Report worker failed"}
+
+
+def test_stalled_job_is_reported_failed(client, queue):
+    job_id = "0" * 32
+    directory = os.path.join(queue.directory, job_id)
+    os.makedirs(directory)
+    path = os.path.join(directory, "job.json")
+    with open(path, "wb") as state:
+        state.write(orjson.dumps({
+            "id": job_id, "status": "running", "sessions": 4, "completed": 2, "failed": 0,
+            "created_at": "2024-01-01T00:00:00", "finished_at": None
+        }))
+
+    assert client.get(f"/reports/jobs/{job_id}").json()["status"] == "running"
+    assert client.get(f"/reports/jobs/{job_id}/result").status_code == 409
+
+    stale = time.time() - REPORT_JOB_STALE_MINUTES * 60 - 1
+    os.utime(path, (stale, stale))
+    job = client.get(f"/reports/jobs/{job_id}").json()
+    assert (job["status"], job["completed"]) == ("failed", 2)
+    assert job["finished_at"] is not None
+    # Every API worker now sees the failure
+    with open(path, "rb") as state:
+        assert orjson.loads(state.read())["status"] == "failed"
+    assert client.get(f"/reports/jobs/{job_id}/result").status_code == 404
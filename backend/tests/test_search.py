@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app import search
+from app.database import DBObservation
+
+
+@pytest.mark.parametrize("limit", [1, 5, 50])
+def test_search_pages_cover_every_match_once(engine, client, create_session, monkeypatch, limit):
+    # Small windows, so that a page spans several statements
+    monkeypatch.setattr(search, "FIRST_WINDOW", 1)
+    monkeypatch.setattr(search, "MAX_WINDOW", 2)
+    create_session(2)
+    with sessionmaker(bind=engine)() as db:
+        total = db.scalar(select(func.count(DBObservation.id)))
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/search/observations", params={
+            "student": "Student", "limit": limit, **({"cursor": cursor} if cursor else {})
+        })
+        response.raise_for_status()
+        seen += [hit["id"] for hit in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(set(seen))
+    assert total and len(seen) == total
@@ -0,0 +1,74 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import main
+from app.session_events import SessionHub
+
+
+@pytest.fixture(autouse=True)
+def hub(monkeypatch):
+    # The hub binds to the event loop of its first subscriber, and each
+    # TestClient connection runs its own loop
+    monkeypatch.setattr(main, "session_hub", SessionHub())
+
+
+def toggle(client, exercise, observation, is_checked=True):
+    return client.put(f"/exercises/{exercise['id']}/observations/{observation['id']}",
+                      json={"is_checked": is_checked})
+
+
+def test_committed_write_pushes_its_delta(client, create_session):
+    session_id = create_session(1)
+    session = client.get(f"/sessions/{session_id}").json()
+    exercise = session["exercises"][0]
+    observation = exercise["observations"][0]
+
+    with client.websocket_connect(f"/sessions/{session_id}/ws") as websocket:
+        assert websocket.receive_json() == {"type": "subscribed", "session_id": session_id, "version": session["version"]}
+        toggle(client, exercise, observation).raise_for_status()
+        assert websocket.receive_json() == {
+            "session_id": session_id,
+            "type": "observations",
+            "version": session["version"] + 1,
+            "observations": [{"id": observation["id"], "exercise_id": exercise["id"], "is_checked": True}]
+        }
+        client.put(f"/exercises/{exercise['id']}/complete").raise_for_status()
+        assert websocket.receive_json() == {
+            "session_id": session_id,
+            "type": "exercise_completed",
+            "version": session["version"] + 2,
+            "exercise_id": exercise["id"]
+        }
+
+
+def test_rolled_back_writes_push_nothing(client, create_session):
+    session_id = create_session(2, completed=1)
+    session = client.get(f"/sessions/{session_id}").json()
+    done = next(exercise for exercise in session["exercises"] if exercise["is_completed"])
+    open_ = next(exercise for exercise in session["exercises"] if not exercise["is_completed"])
+    failing = TestClient(main.app, raise_server_exceptions=False)
+
+    def fail(db):
+        raise RuntimeError("commit failed")
+
+    with client.websocket_connect(f"/sessions/{session_id}/ws") as websocket:
+        websocket.receive_json()
+        # Frozen exercise, a batch that changes nothing and a failed commit
+        assert toggle(client, done, done["observations"][0]).status_code == 409
+        client.patch(f"/sessions/{session_id}/observations", json={"changes": [
+            {"observation_id": open_["observations"][0]["id"], "is_checked": False}
+        ]}).raise_for_status()
+        event.listen(Session, "before_commit", fail)
+        try:
+            assert toggle(failing, open_, open_["observations"][1]).status_code == 500
+        finally:
+            event.remove(Session, "before_commit", fail)
+
+        # The next message is the next committed write, at the next version
+        toggle(client, open_, open_["observations"][2]).raise_for_status()
+        message = websocket.receive_json()
+        assert message["version"] == session["version"] + 1
+        assert [obs["id"] for obs in message["observations"]] == [open_["observations"][2]["id"]]
+    assert client.get(f"/sessions/{session_id}").json()["version"] == session["version"] + 1
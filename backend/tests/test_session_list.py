@@ -0,0 +1,83 @@
+import base64
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DBSession
+from app.snapshots import archive_session
+
+
+def set_dates(engine, dates):
+    with sessionmaker(bind=engine)() as db:
+        for session_id, date in dates.items():
+            db.execute(update(DBSession).where(DBSession.id == session_id).values(date=date))
+        db.commit()
+
+
+def pages(client, **params):
+    """Every page of the session list, following X-Next-Cursor."""
+    result, cursor = [], None
+    while True:
+        response = client.get("/sessions/", params={**params, **({"cursor": cursor} if cursor else {})})
+        response.raise_for_status()
+        result.append([session["id"] for session in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return result
+
+
+@pytest.mark.parametrize("summary", [False, True])
+def test_pages_break_date_ties_on_id(engine, client, create_session, summary):
+    ids = [create_session(0) for _ in range(7)]
+    # Three sessions share a date, two others another one
+    same, other = datetime(2024, 5, 1, 9), datetime(2024, 5, 2, 9)
+    set_dates(engine, {ids[0]: same, ids[1]: other, ids[2]: same, ids[3]: other, ids[4]: same,
+                       ids[5]: datetime(2024, 4, 1), ids[6]: datetime(2024, 6, 1)})
+
+    expected = [ids[6], ids[3], ids[1], ids[4], ids[2], ids[0], ids[5]]
+    for limit in (1, 2, 3, 7):
+        result = pages(client, limit=limit, summary=summary)
+        assert [session_id for page in result for session_id in page] == expected
+        assert all(len(page) == limit for page in result[:-1])
+
+
+def test_cursor_combines_with_the_student_filter(engine, client, create_session):
+    martin = [create_session(0, students=["Martin", "Durand"]) for _ in range(4)]
+    create_session(0, students=["Durand"])
+    date = datetime(2024, 1, 1)
+    set_dates(engine, {session_id: date for session_id in martin})
+
+    result = pages(client, limit=1, student="Martin")
+    assert [session_id for page in result for session_id in page] == sorted(martin, reverse=True)
+    assert len(result) == 4
+    assert pages(client, limit=2, student="Nobody") == [[]]
+
+
+def test_stale_cursor_continues_after_its_session(engine, client, create_session):
+    ids = [create_session(0) for _ in range(4)]
+    first = client.get("/sessions/", params={"limit": 2})
+    assert [session["id"] for session in first.json()] == [ids[3], ids[2]]
+
+    # The session the cursor points at is archived before the next page is asked for
+    with sessionmaker(bind=engine)() as db:
+        archive_session(db, ids[2])
+        db.commit()
+    response = client.get("/sessions/", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [session["id"] for session in response.json()] == [ids[1], ids[0]]
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(b'["2024-01-01T00:00:00"]').decode(),
+    base64.urlsafe_b64encode(b'["yesterday", 3]').decode(),
+    base64.urlsafe_b64encode(b'[null, 3]').decode(),
+    base64.urlsafe_b64encode(b'["2024-01-01T00:00:00", "x"]').decode(),
+])
+def test_invalid_cursor_is_rejected(client, cursor):
+    response = client.get("/sessions/", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
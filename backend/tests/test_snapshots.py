@@ -0,0 +1,47 @@
+import orjson
+import pytest
+from sqlalchemy import event, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DBExercise, DBExerciseSnapshot
+from app.snapshots import check_snapshots, freeze_exercises
+
+
+def complete_before_toggle(engine, exercise_id):
+    """Complete the exercise from another connection just before the toggle's UPDATE runs."""
+    Session = sessionmaker(bind=engine)
+    done = []
+
+    def complete(conn, cursor, statement, *args):
+        if statement.startswith("UPDATE observations") and not done:
+            done.append(exercise_id)
+            with Session() as db:
+                db.execute(update(DBExercise).where(DBExercise.id == exercise_id).values(is_completed=True))
+                freeze_exercises(db, [exercise_id])
+                db.commit()
+
+    event.listen(engine, "before_cursor_execute", complete)
+    return done
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_toggle_racing_a_completion_is_rejected(engine, client, create_session, batch):
+    session_id = create_session(1)
+    exercise = client.get(f"/sessions/{session_id}").json()["exercises"][0]
+    observation = exercise["observations"][0]
+
+    completed = complete_before_toggle(engine, exercise["id"])
+    if batch:
+        response = client.patch(f"/sessions/{session_id}/observations", json={
+            "changes": [{"observation_id": observation["id"], "is_checked": True}]
+        })
+    else:
+        response = client.put(f"/exercises/{exercise['id']}/observations/{observation['id']}",
+                              json={"is_checked": True})
+
+    assert completed and response.status_code == 409
+    with sessionmaker(bind=engine)() as db:
+        assert check_snapshots(db) == []
+        snapshot = db.get(DBExerciseSnapshot, exercise["id"])
+        assert not any(row[3] for row in orjson.loads(snapshot.observations))
+    assert not client.get(f"/sessions/{session_id}").json()["exercises"][0]["observations"][0]["is_checked"]
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.taxonomy import TAXONOMY, TaxonomyError, load_taxonomy
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def taxonomy(*competences, version=1):
+    return {"version": version, "competences": [
+        {"code": code, "observations": [{"code": ob_code, "text": text} for ob_code, text in observations]}
+        for code, observations in competences
+    ]}
+
+
+def write(tmp_path, content) -> str:
+    path = tmp_path / "taxonomy.json"
+    path.write_text(content if isinstance(content, str) else json.dumps(content), encoding="utf-8")
+    return str(path)
+
+
+def import_taxonomy(path: str) -> subprocess.CompletedProcess:
+    """Import the registry in a fresh interpreter, as the API does at startup."""
+    return subprocess.run(
+        [sys.executable, "-c", "from app.taxonomy import TAXONOMY; print(len(TAXONOMY.obs), *TAXONOMY.competences)"],
+        cwd=BACKEND, env={**os.environ, "OB_TAXONOMY_FILE": path}, capture_output=True, text=True
+    )
+
+
+def test_bundled_file_is_valid():
+    assert TAXONOMY.version == 1
+    assert [ob.id for ob in TAXONOMY.obs] == list(range(len(TAXONOMY.obs)))
+    for ob in TAXONOMY.obs:
+        assert TAXONOMY.by_code[(ob.competence, ob.code)] is ob
+        assert TAXONOMY.lookup(ob.text, ob.competence) is ob
+
+
+def test_file_from_environment_replaces_the_bundled_one(tmp_path):
+    path = write(tmp_path, taxonomy(("AAA", [("OB 1.1", "First"), ("OB 1.2", "Second")]), ("BBB", [("OB 2.1", "Third")])))
+    loaded = import_taxonomy(path)
+    assert loaded.returncode == 0, loaded.stderr
+    assert loaded.stdout.split() == ["3", "AAA", "BBB"]
+
+
+@pytest.mark.parametrize("content, error", [
+    ("{\"version\": 1, \"competences\": [", "cannot read OB taxonomy"),
+    ("[]", "taxonomy must be a JSON object"),
+    (taxonomy(("AAA", [("OB 1.1", "First")]), version=2), "unsupported taxonomy version 2"),
+    ({"version": 1, "competences": []}, "taxonomy must list at least one competence"),
+    (taxonomy(("AAA", [("OB 1.1", "First"), ("OB 1.1", "Second")])), "AAA: duplicate OB code OB 1.1"),
+    (taxonomy(("AAA", [("OB 1.1", "First"), ("OB 1.2", "First")])), "AAA: duplicate text for OB 1.2"),
+    (taxonomy(("AAA", [("OB 1.1", "First")]), ("AAA", [("OB 1.2", "Second")])), "duplicate competence AAA"),
+    (taxonomy(("", [("OB 1.1", "First")])), "competence without a code"),
+    ({"version": 1, "competences": ["AAA"]}, "competence without a code: 'AAA'"),
+    (taxonomy(("AAA", [])), "AAA: no observations"),
+    (taxonomy(("AAA", [("OB 1.1", "  ")])), "AAA: observation needs a code and a text"),
+])
+def test_invalid_file_is_refused(tmp_path, content, error):
+    path = write(tmp_path, content)
+    with pytest.raises(TaxonomyError, match=error):
+        load_taxonomy(path)
+
+
+def test_every_error_is_reported(tmp_path):
+    path = write(tmp_path, taxonomy(
+        ("AAA", [("OB 1.1", "First"), ("OB 1.1", "Second")]),
+        ("BBB", []),
+        ("AAA", [("OB 3.1", "Third")])
+    ))
+    with pytest.raises(TaxonomyError) as raised:
+        load_taxonomy(path)
+    assert str(raised.value).splitlines() == [
+        "invalid OB taxonomy:",
+        "  AAA: duplicate OB code OB 1.1",
+        "  BBB: no observations",
+        "  duplicate competence AAA",
+    ]
+
+
+@pytest.mark.parametrize("content", [
+    "not json",
+    taxonomy(("AAA", [("OB 1.1", "First"), ("OB 1.1", "Second")])),
+])
+def test_invalid_file_from_environment_stops_startup(tmp_path, content):
+    path = write(tmp_path, content)
+    loaded = import_taxonomy(path)
+    assert loaded.returncode != 0
+    assert "TaxonomyError" in loaded.stderr
+    assert loaded.stdout == ""
+
+
+def test_missing_file_from_environment_stops_startup(tmp_path):
+    loaded = import_taxonomy(str(tmp_path / "missing.json"))
+    assert loaded.returncode != 0
+    assert f"cannot read OB taxonomy {tmp_path / 'missing.json'}" in loaded.stderr
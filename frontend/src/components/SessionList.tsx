@@ -11,6 +11,7 @@ import {
   Td,
   Link,
   Text,
+  Button,
   useToast,
 } from '@chakra-ui/react';
 import axios from 'axios';
@@ -21,15 +22,24 @@ interface Session {
   students: { name: string }[];
 }
 
+// Sessions per page; the API returns the cursor of the next page in X-Next-Cursor
+const PAGE_SIZE = 50;
+
 const SessionList: React.FC = () => {
   const [sessions, setSessions] = useState<Session[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoading, setIsLoading] = useState(false);
   const toast = useToast();
   const API_URL = process.env.REACT_APP_API_URL;
 
-  const fetchSessions = useCallback(async () => {
+  const fetchSessions = useCallback(async (cursor?: string) => {
+    setIsLoading(true);
     try {
-      const response = await axios.get(`${API_URL}/sessions/`);
-      setSessions(response.data);
+      const response = await axios.get<Session[]>(`${API_URL}/sessions/`, {
+        params: { limit: PAGE_SIZE, ...(cursor ? { cursor } : {}) },
+      });
+      setSessions((previous) => (cursor ? [...previous, ...response.data] : response.data));
+      setNextCursor(response.headers['x-next-cursor'] ?? null);
     } catch (error) {
       toast({
         title: 'Erreur',
@@ -38,8 +48,10 @@ const SessionList: React.FC = () => {
         duration: 3000,
         isClosable: true,
       });
+    } finally {
+      setIsLoading(false);
     }
-  }, [toast]);
+  }, [toast, API_URL]);
 
   useEffect(() => {
     fetchSessions();
@@ -83,6 +95,11 @@ const SessionList: React.FC = () => {
           ))}
         </Tbody>
       </Table>
+      {nextCursor && (
+        <Button mt={4} onClick={() => fetchSessions(nextCursor)} isLoading={isLoading}>
+          Charger plus
+        </Button>
+      )}
     </Box>
   );
 };
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useParams } from 'react-router-dom';
 import {
   Box,
@@ -67,9 +67,29 @@ interface Session {
   id: number;
   date: Date;
   students: StudentData[];
+  version: number;
   exercises: Exercise[];
 }
 
+interface ObservationDelta {
+  id: number;
+  is_checked: boolean;
+}
+
+interface ObservationBatchResponse {
+  session_id: number;
+  version: number;
+  observations: ObservationDelta[];
+}
+
+// Messages pushed on /sessions/{id}/ws, each with the session version it produced
+type SessionEvent =
+  | { type: 'subscribed'; version: number }
+  | { type: 'observations'; version: number; observations: ObservationDelta[] }
+  | { type: 'exercise_created'; version: number; exercise: Exercise }
+  | { type: 'exercise_completed'; version: number; exercise_id: number }
+  | { type: 'resync' };
+
 interface Report {
   [studentName: string]: {
     report: {
@@ -87,6 +107,48 @@ interface Report {
 
 const COMPETENCES = ['PRO', 'COM', 'FPA', 'FPM', 'KNO', 'LTW', 'PSD', 'SAW', 'WLM'];
 
+// Checkbox toggles made within this window are sent as a single batch
+const TOGGLE_FLUSH_DELAY_MS = 150;
+const RECONNECT_DELAY_MS = 2000;
+
+const applyObservationDelta = (session: Session, deltas: ObservationDelta[]): Session => {
+  const changes = new Map(deltas.map(delta => [delta.id, delta.is_checked]));
+  return {
+    ...session,
+    exercises: session.exercises.map(exercise =>
+      exercise.observations.some(obs => changes.has(obs.id))
+        ? {
+            ...exercise,
+            observations: exercise.observations.map(obs =>
+              changes.has(obs.id) ? { ...obs, is_checked: changes.get(obs.id) as boolean } : obs
+            ),
+          }
+        : exercise
+    ),
+  };
+};
+
+const applySessionEvent = (session: Session, event: SessionEvent): Session => {
+  switch (event.type) {
+    case 'observations':
+      return { ...applyObservationDelta(session, event.observations), version: event.version };
+    case 'exercise_created':
+      return session.exercises.some(exercise => exercise.id === event.exercise.id)
+        ? { ...session, version: event.version }
+        : { ...session, version: event.version, exercises: [...session.exercises, event.exercise] };
+    case 'exercise_completed':
+      return {
+        ...session,
+        version: event.version,
+        exercises: session.exercises.map(exercise =>
+          exercise.id === event.exercise_id ? { ...exercise, is_completed: true } : exercise
+        ),
+      };
+    default:
+      return session;
+  }
+};
+
 const SessionView: React.FC = () => {
   const { id } = useParams<{ id: string }>();
   const [session, setSession] = useState<Session | null>(null);
@@ -96,6 +158,10 @@ const SessionView: React.FC = () => {
   const [selectedStudentForExercise, setSelectedStudentForExercise] = useState<string>('');
   const [selectedCompetencesForExercise, setSelectedCompetencesForExercise] = useState<string[]>([]);
   const [activeStudent, setActiveStudent] = useState<string | null>(null);
+  const pendingChanges = useRef<Map<number, boolean>>(new Map());
+  const flushTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
+  // Latest session version applied, null until the session is loaded
+  const sessionVersion = useRef<number | null>(null);
 
   const toast = useToast();
   const { isOpen: isReportOpen, onOpen: onReportOpen, onClose: onReportClose } = useDisclosure();
@@ -108,14 +174,19 @@ const SessionView: React.FC = () => {
     try {
       const response = await axios.get(`${API_URL}/sessions/${id}`);
       const sessionData: Session = response.data;
+      sessionVersion.current = sessionData.version;
       setSession(sessionData);
       if (sessionData.students.length > 0) {
-        setActiveStudent(sessionData.students[0].name);
-        const initialSafetyScores: { [key: string]: number } = {};
-        sessionData.students.forEach(student => {
-          initialSafetyScores[student.name] = 1;
+        const names = sessionData.students.map(student => student.name);
+        // Reloads triggered by other clients keep the student being graded
+        setActiveStudent(prev => (prev && names.includes(prev) ? prev : names[0]));
+        setSafetyScores(prev => {
+          const scores: { [key: string]: number } = {};
+          names.forEach(name => {
+            scores[name] = prev[name] ?? 1;
+          });
+          return scores;
         });
-        setSafetyScores(initialSafetyScores);
       }
     } catch (error) {
       toast({
@@ -132,6 +203,57 @@ const SessionView: React.FC = () => {
     fetchSession();
   }, [fetchSession]);
 
+  // Follow changes made by other clients
+  useEffect(() => {
+    if (!API_URL) {
+      return;
+    }
+    let socket: WebSocket | null = null;
+    let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+
+    const connect = () => {
+      socket = new WebSocket(`${API_URL.replace(/^http/, 'ws')}/sessions/${id}/ws`);
+      socket.onmessage = (message) => {
+        const event: SessionEvent = JSON.parse(message.data);
+        const current = sessionVersion.current;
+        if (event.type === 'resync') {
+          fetchSession();
+          return;
+        }
+        if (current === null || event.version <= current) {
+          // Not loaded yet, or already applied (e.g. our own write)
+          return;
+        }
+        if (event.type === 'subscribed' || event.version > current + 1) {
+          // Missed deltas while disconnected or out of order
+          fetchSession();
+          return;
+        }
+        if (event.type === 'observations') {
+          // Local toggles not sent yet are newer than the pushed state
+          event.observations = event.observations.filter(obs => !pendingChanges.current.has(obs.id));
+        }
+        sessionVersion.current = event.version;
+        setSession(prev => prev && applySessionEvent(prev, event));
+      };
+      socket.onclose = () => {
+        if (!closed) {
+          reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+        }
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      if (reconnectTimer !== null) {
+        clearTimeout(reconnectTimer);
+      }
+      socket?.close();
+    };
+  }, [id, API_URL, fetchSession]);
+
   const createExercise = async () => {
     if (!exerciseName.trim()) {
       toast({
@@ -195,12 +317,33 @@ const SessionView: React.FC = () => {
     }
   };
 
-  const toggleObservation = async (exerciseId: number, observationId: number, isChecked: boolean) => {
+  const flushObservationChanges = useCallback(async () => {
+    flushTimer.current = null;
+    const changes = Array.from(pendingChanges.current, ([observation_id, is_checked]) => ({ observation_id, is_checked }));
+    pendingChanges.current.clear();
+    if (changes.length === 0) {
+      return;
+    }
+
     try {
-      await axios.put(`${API_URL}/exercises/${exerciseId}/observations/${observationId}`, {
-        is_checked: isChecked
+      const response = await axios.patch<ObservationBatchResponse>(`${API_URL}/sessions/${id}/observations`, {
+        changes
+      });
+      const { version, observations } = response.data;
+      const current = sessionVersion.current;
+      if (current === null || version > current + 1) {
+        // Another client wrote in between: advancing past its version would
+        // drop its delta when it arrives, so reload as the WebSocket path does
+        fetchSession();
+        return;
+      }
+      // Toggles queued while this batch was in flight are newer than the server delta
+      const deltas = observations.filter(obs => !pendingChanges.current.has(obs.id));
+      sessionVersion.current = Math.max(current, version);
+      setSession(prev => prev && {
+        ...applyObservationDelta(prev, deltas),
+        version: Math.max(prev.version, version),
       });
-      fetchSession();
     } catch (error) {
       toast({
         title: 'Error',
@@ -209,6 +352,25 @@ const SessionView: React.FC = () => {
         duration: 3000,
         isClosable: true,
       });
+      fetchSession();
+    }
+  }, [id, toast, API_URL, fetchSession]);
+
+  useEffect(() => {
+    return () => {
+      if (flushTimer.current !== null) {
+        clearTimeout(flushTimer.current);
+        flushObservationChanges();
+      }
+    };
+  }, [flushObservationChanges]);
+
+  const toggleObservation = (observationId: number, isChecked: boolean) => {
+    // Apply locally right away, then send the batched changes
+    setSession(prev => prev && applyObservationDelta(prev, [{ id: observationId, is_checked: isChecked }]));
+    pendingChanges.current.set(observationId, isChecked);
+    if (flushTimer.current === null) {
+      flushTimer.current = setTimeout(flushObservationChanges, TOGGLE_FLUSH_DELAY_MS);
     }
   };
 
@@ -406,7 +568,8 @@ const SessionView: React.FC = () => {
                             <Td>
                               <Checkbox
                                 isChecked={observation.is_checked}
-                                onChange={(e) => toggleObservation(exercise.id, observation.id, e.target.checked)}
+                                isDisabled={exercise.is_completed}
+                                onChange={(e) => toggleObservation(observation.id, e.target.checked)}
                               />
                             </Td>
                             <Td>{observation.text}</Td>